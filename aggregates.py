@@ -0,0 +1,85 @@
+import json
+import os
+from locking import atomic_write, file_lock
+
+AGGREGATES_FILE = "aggregates.json"
+
+_instances = {}
+
+def open_aggregates(path=AGGREGATES_FILE):
+    # Dùng chung một đối tượng cho mỗi file để database.py và gui.Database không ghi đè nhau
+    key = os.path.abspath(path)
+    if key not in _instances:
+        _instances[key] = Aggregates(path)
+    return _instances[key]
+
+def drift(stored, actual, tolerance=1e-6):
+    """Trả về các trường lệch giữa tổng cộng dồn và tổng tính lại"""
+    result = {}
+    for field in set(stored) | set(actual):
+        a, b = stored.get(field, 0), actual.get(field, 0)
+        if abs(a - b) > tolerance * max(1, abs(a), abs(b)):
+            result[field] = {"stored": a, "actual": b}
+    return result
+
+class Aggregates:
+    """Tổng cộng dồn của từng bảng, gắn với chữ ký (mtime, kích thước) của file dữ liệu"""
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._stamp = None
+
+    def _load(self):
+        # Đọc lại khi tiến trình khác đã ghi file
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if self._data is None or stamp != self._stamp:
+            try:
+                with open(self.path, 'r') as f:
+                    self._data = json.load(f)
+            except (FileNotFoundError, PermissionError, ValueError):
+                self._data = {}
+            self._stamp = stamp
+        return self._data
+
+    def _save(self):
+        with atomic_write(self.path) as f:
+            json.dump(self._data, f)
+        st = os.stat(self.path)
+        self._stamp = (st.st_mtime_ns, st.st_size)
+
+    def get(self, table, signature):
+        entry = self._load().get(table)
+        if entry is not None and entry["signature"] == _jsonable(signature):
+            return dict(entry["totals"])
+        return None
+
+    def put(self, table, signature, totals):
+        with file_lock(self.path):
+            self._load()[table] = {"signature": _jsonable(signature), "totals": dict(totals)}
+            self._save()
+
+    def apply(self, table, before, after, delta):
+        """Cộng delta nếu tổng đang lưu khớp với file trước khi ghi, nếu không thì bỏ để tính lại"""
+        with file_lock(self.path):
+            data = self._load()
+            entry = data.get(table)
+            if entry is None:
+                return
+            if entry["signature"] != _jsonable(before):
+                del data[table]
+            else:
+                for field, value in delta.items():
+                    entry["totals"][field] = entry["totals"].get(field, 0) + value
+                entry["signature"] = _jsonable(after)
+            self._save()
+
+def _jsonable(signature):
+    # Chữ ký là tuple lồng nhau; JSON chỉ lưu được list
+    if isinstance(signature, (list, tuple)):
+        return [_jsonable(item) for item in signature]
+    return signature
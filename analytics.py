@@ -0,0 +1,108 @@
+import numpy as np
+
+# Ngày không đọc được (NaT) được lưu bằng giá trị này và bị bỏ qua khi gom nhóm
+MISSING = np.iinfo(np.int64).min
+
+def _epoch_minutes(dates):
+    # Ngày lưu dạng "YYYY-MM-DD HH:MM[:SS]": cắt còn 16 ký tự rồi để NumPy đổi một lượt
+    text = np.array([d if isinstance(d, str) else "" for d in dates], dtype="U16")
+    try:
+        minutes = text.astype("datetime64[m]")
+    except ValueError:
+        minutes = np.array([_parse_one(d) for d in text], dtype="datetime64[m]")
+    return minutes.astype(np.int64)
+
+def _parse_one(text):
+    try:
+        return np.datetime64(text, "m")
+    except ValueError:
+        return np.datetime64("NaT")
+
+class Columns:
+    """Dữ liệu dạng cột: thời điểm (phút từ 1970), số tiền và mã nhãn (khách hàng hoặc loại)"""
+
+    def __init__(self, minutes, amounts, codes, labels):
+        self.minutes = minutes
+        self.amounts = amounts
+        self.codes = codes
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @classmethod
+    def from_records(cls, records, normalize=None):
+        """records: các bộ (ngày, nhãn, số tiền); normalize chuẩn hóa nhãn trước khi mã hóa"""
+        dates, codes, amounts = [], [], []
+        label_codes = {}
+        labels = []
+        for date, label, amount in records:
+            if normalize is not None:
+                label = normalize(label)
+            code = label_codes.get(label)
+            if code is None:
+                code = label_codes[label] = len(labels)
+                labels.append(label)
+            dates.append(date)
+            codes.append(code)
+            amounts.append(amount if isinstance(amount, (int, float)) else 0)
+        return cls(_epoch_minutes(dates), np.array(amounts, dtype=np.float64),
+                   np.array(codes, dtype=np.int32), labels)
+
+def _sum_by(keys, amounts):
+    # bincount trên khóa đã dời về 0: nhanh hơn sắp xếp/unique với khóa liền nhau như ngày, tháng
+    valid = keys != MISSING
+    keys, amounts = keys[valid], amounts[valid]
+    if not len(keys):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    first = keys.min()
+    sums = np.bincount(keys - first, weights=amounts)
+    counts = np.bincount(keys - first)
+    present = np.nonzero(counts)[0]
+    return present + first, sums[present]
+
+def _days(minutes):
+    # MISSING chính là NaT của datetime64 nên đổi đơn vị vẫn giữ nguyên dấu hiệu thiếu ngày
+    return minutes.astype("datetime64[m]").astype("datetime64[D]").astype(np.int64)
+
+def _months(minutes):
+    return minutes.astype("datetime64[m]").astype("datetime64[M]").astype(np.int64)
+
+def revenue_by_day(columns):
+    days, sums = _sum_by(_days(columns.minutes), columns.amounts)
+    labels = days.astype("datetime64[D]").astype(str)
+    return list(zip(labels.tolist(), sums.tolist()))
+
+def revenue_by_month(columns):
+    months, sums = _sum_by(_months(columns.minutes), columns.amounts)
+    labels = months.astype("datetime64[M]").astype(str)
+    return list(zip(labels.tolist(), sums.tolist()))
+
+def revenue_by_customer(columns, top=None):
+    """(khách hàng, tổng tiền, số hóa đơn) theo tổng tiền giảm dần"""
+    sums = np.bincount(columns.codes, weights=columns.amounts, minlength=len(columns.labels))
+    counts = np.bincount(columns.codes, minlength=len(columns.labels))
+    order = np.argsort(-sums, kind="stable")
+    if top is not None:
+        order = order[:top]
+    return [(columns.labels[i], float(sums[i]), int(counts[i])) for i in order]
+
+def cash_flow_by_month(columns):
+    """(tháng, tổng thu, tổng chi) cho giao dịch; nhãn đã được chuẩn hóa về chữ thường"""
+    months = _months(columns.minutes)
+    valid = months != MISSING
+    months, codes, amounts = months[valid], columns.codes[valid], columns.amounts[valid]
+    if not len(months):
+        return []
+    first = months.min()
+    span = int(months.max() - first) + 1
+    width = len(columns.labels)
+    # Gom theo cặp (tháng, loại) trong một lần bincount rồi tách thành bảng tháng x loại
+    table = np.bincount((months - first) * width + codes, weights=amounts,
+                        minlength=span * width).reshape(span, width)
+    counts = np.bincount(months - first, minlength=span)
+    income = table[:, columns.labels.index("thu")] if "thu" in columns.labels else np.zeros(span)
+    expense = table[:, columns.labels.index("chi")] if "chi" in columns.labels else np.zeros(span)
+    present = np.nonzero(counts)[0]
+    labels = (present + first).astype("datetime64[M]").astype(str)
+    return list(zip(labels.tolist(), income[present].tolist(), expense[present].tolist()))
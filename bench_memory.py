@@ -0,0 +1,87 @@
+"""Đo bộ nhớ mỗi dòng khi giữ cả bảng trong bộ nhớ: dict (gui.Database cũ), tuple (database.py cũ)
+và bản ghi __slots__ của records.py.
+
+    python bench_memory.py --rows 100000
+    python bench_memory.py --rows 1000000 --out bo_nho.json
+
+Dữ liệu JSON sinh bởi datagen.py trong thư mục tạm. Mỗi cách được nạp bằng json.load với
+object_hook tương ứng; số byte đo bằng tracemalloc (phần còn giữ lại sau khi nạp xong).
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from records import Invoice, Product, Transaction
+
+TABLES = (
+    ("invoices", "invoices.json", Invoice),
+    ("transactions", "transactions.json", Transaction),
+    ("products", "inventory.json", Product),
+)
+
+def _layouts(record_type):
+    return (
+        ("dict", None),
+        ("tuple", lambda data: tuple(data.values())),
+        ("record", record_type.from_dict),
+    )
+
+def measure(path, object_hook):
+    """(số dòng, byte còn giữ, giây nạp) khi nạp file với object_hook"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = json.load(f, object_hook=object_hook)
+        seconds = time.perf_counter() - start
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return len(rows), size, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="số hóa đơn và giao dịch (sản phẩm = 1%)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="ghi kết quả JSON")
+    args = parser.parse_args()
+
+    import datagen
+    folder = tempfile.mkdtemp(prefix="misa-memory-")
+    results = {}
+    try:
+        datagen.write_json(folder, args.rows, args.seed)
+        for table, filename, record_type in TABLES:
+            results[table] = {}
+            for layout, object_hook in _layouts(record_type):
+                count, size, seconds = measure(os.path.join(folder, filename), object_hook)
+                results[table][layout] = {"rows": count, "bytes_per_row": round(size / max(count, 1), 1),
+                                          "load_seconds": round(seconds, 3)}
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    for table, layouts in results.items():
+        print(f"{table} ({layouts['dict']['rows']:,} dòng)")
+        baseline = layouts["dict"]["bytes_per_row"]
+        for layout, result in layouts.items():
+            print(f"  {layout:<7} {result['bytes_per_row']:>8,.1f} byte/dòng "
+                  f"({result['bytes_per_row'] / baseline:.0%} so với dict), nạp {result['load_seconds']:.2f}s")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
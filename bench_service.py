@@ -0,0 +1,132 @@
+"""Đo tải dataservice.py: nhiều máy khách gửi lệnh đọc/ghi qua localhost, báo thông lượng và độ trễ.
+
+    python bench_service.py --clients 8 --requests 2000 --pipeline 16 --rows 10000
+    python bench_service.py --address 127.0.0.1:8765 --writes 0.2
+
+Không có --address thì tự chạy dịch vụ trên dữ liệu sinh bởi datagen.py trong thư mục tạm.
+Mỗi máy khách là một luồng với kết nối riêng, giữ tối đa --pipeline lệnh chưa có trả lời.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from dataservice import DatabaseClient
+
+def _requests(rng, writes):
+    if rng.random() < writes:
+        if rng.random() < 0.5:
+            return "add_invoices_bulk", ([{"customer": "Khách bench", "total": rng.randint(1, 500) * 1000}],)
+        return "add_transactions_bulk", ([{"type": rng.choice(("Thu", "Chi")), "amount": 125000,
+                                           "description": "Bench"}],)
+    return rng.choice((
+        ("get_sales_summary", ()),
+        ("get_accounting_summary", ()),
+        ("search_invoices", ("nguyen",)),
+        ("query_invoices", (rng.randrange(0, 1000), 200, "date", True)),
+        ("query_transactions", (0, 200, "amount", False, "Chi")),
+    ))
+
+def _client(address, count, pipeline, writes, seed, latencies, errors):
+    rng = random.Random(seed)
+    client = DatabaseClient(address, subscribe=False)
+    window = deque()
+    try:
+        for _ in range(count):
+            if len(window) >= pipeline:
+                _wait(window.popleft(), latencies, errors)
+            method, args = _requests(rng, writes)
+            window.append((time.perf_counter(), client.call_async(method, *args)))
+        while window:
+            _wait(window.popleft(), latencies, errors)
+    finally:
+        client.close()
+
+def _wait(item, latencies, errors):
+    start, future = item
+    try:
+        future.result()
+    except Exception:
+        errors.append(1)
+    latencies.append((time.perf_counter() - start) * 1000)
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+def _start_service(rows):
+    import datagen
+    folder = tempfile.mkdtemp(prefix="misa-service-")
+    datagen.generate(folder, rows, ("json",))
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "dataservice.py"), "--port", "0", "--data", folder],
+                            stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line:
+        proc.kill()
+        raise RuntimeError("Không khởi động được dataservice.py")
+    return proc, folder, line.rsplit(" ", 1)[-1].strip()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--address", help="dịch vụ đang chạy (host:cổng)")
+    parser.add_argument("--rows", type=int, default=10000, help="số dòng dữ liệu mẫu khi tự chạy dịch vụ")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="số lệnh của mỗi máy khách")
+    parser.add_argument("--pipeline", type=int, default=16, help="số lệnh chưa có trả lời tối đa")
+    parser.add_argument("--writes", type=float, default=0.1, help="tỉ lệ lệnh ghi")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="ghi kết quả JSON")
+    args = parser.parse_args()
+
+    proc = folder = None
+    address = args.address
+    if address is None:
+        proc, folder, address = _start_service(args.rows)
+    try:
+        # Lệnh đầu tiên nạp dữ liệu vào bộ nhớ của dịch vụ, không tính vào kết quả
+        warm = DatabaseClient(address, subscribe=False)
+        warm.get_invoices()
+        warm.get_transactions()
+        warm.close()
+
+        latencies, errors = [], []
+        threads = [threading.Thread(target=_client, args=(address, args.requests, args.pipeline, args.writes,
+                                                          args.seed + i, latencies, errors))
+                   for i in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(folder, ignore_errors=True)
+
+    result = {"clients": args.clients, "pipeline": args.pipeline, "writes": args.writes,
+              "requests": len(latencies), "errors": len(errors), "seconds": round(elapsed, 3),
+              "requests_per_second": round(len(latencies) / elapsed, 1),
+              "p50_ms": round(_percentile(latencies, 50), 3), "p95_ms": round(_percentile(latencies, 95), 3),
+              "p99_ms": round(_percentile(latencies, 99), 3)}
+    print(f"{result['requests']:,} lệnh từ {args.clients} máy khách (pipeline {args.pipeline}) trong "
+          f"{elapsed:.2f}s: {result['requests_per_second']:,.0f} lệnh/s, lỗi {result['errors']}")
+    print(f"  độ trễ p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Đo thời gian khởi động: tới lúc hiện cửa sổ đăng nhập và tới lúc tab đầu tiên có dữ liệu.
+
+    python bench_startup.py --runs 5 --data thu_muc_du_lieu
+
+Mỗi lần đo chạy trong một tiến trình Python mới (khởi động lạnh, chưa import gì).
+Thời gian khởi động của chính trình thông dịch không được tính.
+
+Không có màn hình (máy chủ CI, SSH) hoặc với --headless: không mở cửa sổ Tk, chỉ đo thời gian
+import, init_files và các truy vấn mà tab đầu tiên và tab thống kê gọi khi mở.
+"""
+import time
+
+_started = time.perf_counter()
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+METRICS = ("login_window", "init_files", "app_window", "first_tab", "statistics_tab")
+HEADLESS_METRICS = ("import", "init_files", "first_tab", "statistics_tab")
+
+def _elapsed():
+    return round((time.perf_counter() - _started) * 1000, 1)
+
+def _wait(root, done, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Quá thời gian chờ giao diện tải dữ liệu")
+        root.update()
+        time.sleep(0.001)
+
+def child(data):
+    os.chdir(data)
+    sys.path.insert(0, HERE)
+    result = {}
+    import login
+    import main
+
+    init = main.start_init()
+    window = login.create_login_window(lambda: None, wait=init.join)
+    window.update()
+    result["login_window"] = _elapsed()
+    init.join()
+    result["init_files"] = _elapsed()
+    window.destroy()
+
+    root, app = main.create_app()
+    root.update()
+    result["app_window"] = _elapsed()
+    _wait(root, lambda: hasattr(app, "invoice_pager") and not app.invoice_pager.loading)
+    result["first_tab"] = _elapsed()
+    app.tabs.select(app.stats_tab)
+    _wait(root, lambda: hasattr(app, "stats_text") and app.stats_text.get("1.0", "end").strip())
+    result["statistics_tab"] = _elapsed()
+    app.close()
+    print(json.dumps(result))
+
+def headless_child(data):
+    os.chdir(data)
+    sys.path.insert(0, HERE)
+    result = {}
+    import login
+    import main
+    result["import"] = _elapsed()
+    main.init_files()
+    result["init_files"] = _elapsed()
+
+    import gui
+    # Cùng truy vấn với PagedTreeview của tab hóa đơn và load_statistics
+    gui.database.query_invoices(0, 200, "id", False)
+    result["first_tab"] = _elapsed()
+    gui.database.get_inventory_summary()
+    gui.database.get_sales_summary()
+    gui.database.get_accounting_summary()
+    gui.MisaApp.build_reports(gui.MisaApp)
+    result["statistics_tab"] = _elapsed()
+    print(json.dumps(result))
+
+def has_display():
+    if sys.platform == "win32" or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--data", default=".", help="thư mục chứa file dữ liệu")
+    parser.add_argument("--json", help="ghi kết quả ra file JSON")
+    parser.add_argument("--headless", action="store_true", help="không mở cửa sổ Tk")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    headless = args.headless or not has_display()
+    if args.child:
+        (headless_child if headless else child)(args.data)
+        return 0
+
+    if headless and not args.headless:
+        print("Không có màn hình: đo ở chế độ --headless")
+    metrics = HEADLESS_METRICS if headless else METRICS
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--data", args.data]
+    if headless:
+        command.append("--headless")
+    runs = []
+    for _ in range(args.runs):
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "Lỗi không rõ")
+            return 1
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    report = {}
+    for metric in metrics:
+        values = [run[metric] for run in runs]
+        report[metric] = {"median_ms": statistics.median(values), "min_ms": min(values), "max_ms": max(values)}
+        print(f"{metric:<16} trung vị {report[metric]['median_ms']:>8.1f} ms   "
+              f"(min {report[metric]['min_ms']:.1f}, max {report[metric]['max_ms']:.1f})")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"runs": runs, "summary": report}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Đo hiệu năng lớp lưu trữ không cần giao diện: mọi hàm công khai, nhiều kích thước dữ liệu.
+
+    python bench_storage.py --sizes 1000,10000,100000 --backends xlsx,json,journal,binary,sqlite --out ket_qua.json
+    python bench_storage.py --sizes 1000,10000 --compare ket_qua.json
+
+Mỗi (backend, kích thước) chạy trong một tiến trình riêng trên bản sao dữ liệu sinh bởi datagen.py.
+Báo cáo độ trễ p50/p95/p99 (ms), lần gọi đầu (cache lạnh) và RSS đỉnh của từng thao tác.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+BACKENDS = ("xlsx", "json", "journal", "binary", "sqlite")
+FORMATS = {"xlsx": "xlsx", "json": "json", "journal": "json", "binary": "json", "sqlite": "sqlite"}
+WRITES = {"add_product", "add_invoice", "add_transaction", "update_product", "delete_product"}
+
+def _reset_peak():
+    # Linux cho phép đặt lại VmHWM để đo RSS đỉnh riêng cho từng thao tác
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _operations(backend, size, rng):
+    """(tên, hàm) cho mọi hàm công khai của backend; ID ngẫu nhiên lấy trong dữ liệu đã sinh"""
+    products = max(10, size // 100)
+    if backend == "xlsx":
+        import database as db
+        # sales.xlsx/accounting.xlsx do datagen sinh ra được tách thành phân vùng trước khi đo
+        db.create_files()
+        for key in db.PARTITIONED:
+            db.split_partitions(key)
+        add_product = lambda: db.add_product("Sản phẩm bench", 10, 15000, "Bench")
+        update_product = lambda: db.update_product(rng.randint(1, products), "Sản phẩm sửa", 5, 20000, "Bench")
+        extra = []
+    else:
+        if backend == "sqlite":
+            from sqlite_store import SqliteDatabase
+            db = SqliteDatabase()
+        else:
+            from gui import Database
+            db = Database(journal=backend in ("journal", "binary"), binary=backend == "binary")
+            # Bảng nhị phân được tạo từ transactions.json ở lần mở đầu tiên
+            db.create_files()
+        add_product = lambda: db.add_product("Sản phẩm bench", 10, 15000)
+        update_product = lambda: db.update_product(rng.randint(1, products), quantity=5)
+        extra = [
+            ("query_invoices", lambda: db.query_invoices(0, 200, "date", True)),
+            ("query_invoices_filtered", lambda: db.query_invoices(0, 200, "total", True, keyword="nguyen",
+                                                                  start_date="2024-01-01", end_date="2024-06-30")),
+            ("query_transactions", lambda: db.query_transactions(0, 200, "amount", False, t_type="Chi")),
+        ]
+    return [
+        ("get_products", db.get_products),
+        ("get_invoices", db.get_invoices),
+        ("get_transactions", db.get_transactions),
+        ("search_products", lambda: db.search_products("but")),
+        ("search_invoices_keyword", lambda: db.search_invoices("nguyen van")),
+        ("search_invoices_range", lambda: db.search_invoices("", "2024-03-01", "2024-03-31")),
+        ("search_transactions", lambda: db.search_transactions("Chi", "tien", "2024-01-01", "2024-12-31")),
+        ("get_inventory_summary", db.get_inventory_summary),
+        ("get_sales_summary", db.get_sales_summary),
+        ("get_accounting_summary", db.get_accounting_summary),
+    ] + extra + [
+        ("add_product", add_product),
+        ("add_invoice", lambda: db.add_invoice("Khách bench", 125000)),
+        ("add_transaction", lambda: db.add_transaction("Thu", 125000, "Bench")),
+        ("update_product", update_product),
+        ("delete_product", lambda: db.delete_product(rng.randint(1, products))),
+    ]
+
+def _percentile(values, p):
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def run_case(backend, size, folder, repeat, write_repeat, seed):
+    os.chdir(folder)
+    rng = random.Random(seed)
+    results = []
+    for name, fn in _operations(backend, size, rng):
+        per_op_peak = _reset_peak()
+        start = time.perf_counter()
+        fn()
+        cold = (time.perf_counter() - start) * 1000
+        timings = []
+        for _ in range(write_repeat if name in WRITES else repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append({
+            "backend": backend, "size": size, "op": name, "calls": len(timings) + 1,
+            "cold_ms": round(cold, 3),
+            "p50_ms": round(_percentile(timings, 50), 3),
+            "p95_ms": round(_percentile(timings, 95), 3),
+            "p99_ms": round(_percentile(timings, 99), 3),
+            "max_ms": round(max(timings), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            # Không đặt lại được RSS đỉnh thì đây là đỉnh của cả tiến trình tới thời điểm này
+            "peak_rss_mb": round(_peak_rss_mb() or 0, 1), "peak_rss_per_op": per_op_peak,
+        })
+    print(json.dumps(results))
+
+def compare(baseline_file, results, threshold):
+    with open(baseline_file) as f:
+        baseline = {(r["backend"], r["size"], r["op"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n{'backend':<8} {'size':>8} {'op':<26} {'p50 cũ':>10} {'p50 mới':>10} {'tỉ lệ':>7}")
+    for r in results:
+        old = baseline.get((r["backend"], r["size"], r["op"]))
+        if old is None or not old["p50_ms"]:
+            continue
+        ratio = r["p50_ms"] / old["p50_ms"]
+        flag = "  CHẬM HƠN" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{r['backend']:<8} {r['size']:>8} {r['op']:<26} {old['p50_ms']:>10.2f} {r['p50_ms']:>10.2f} "
+              f"{ratio:>6.2f}x{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=20, help="số lần gọi mỗi thao tác đọc")
+    parser.add_argument("--write-repeat", type=int, default=5, help="số lần gọi mỗi thao tác ghi")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="ghi kết quả JSON để so sánh giữa các lần chạy")
+    parser.add_argument("--compare", help="file JSON kết quả cũ")
+    parser.add_argument("--threshold", type=float, default=1.2, help="tỉ lệ p50 coi là chậm đi")
+    parser.add_argument("--case", nargs=3, metavar=("BACKEND", "SIZE", "FOLDER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.case:
+        backend, size, folder = args.case
+        run_case(backend, int(size), folder, args.repeat, args.write_repeat, args.seed)
+        return 0
+
+    import datagen
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = args.backends.split(",")
+    root = tempfile.mkdtemp(prefix="misa-bench-")
+    results = []
+    try:
+        for size in sizes:
+            source = os.path.join(root, f"data-{size}")
+            formats = sorted({FORMATS[backend] for backend in backends})
+            print(f"Sinh {size} dòng ({', '.join(formats)})...", flush=True)
+            datagen.generate(source, size, formats, args.seed)
+            for backend in backends:
+                work = os.path.join(root, f"{backend}-{size}")
+                shutil.copytree(source, work)
+                proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", backend, str(size), work,
+                                       "--repeat", str(args.repeat), "--write-repeat", str(args.write_repeat),
+                                       "--seed", str(args.seed)], capture_output=True, text=True)
+                if proc.returncode != 0:
+                    print(f"{backend} {size}: lỗi\n{proc.stderr}")
+                    continue
+                case = json.loads(proc.stdout.strip().splitlines()[-1])
+                results.extend(case)
+                print(f"\n{backend} - {size} dòng")
+                print(f"  {'op':<26} {'lạnh':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'RSS MB':>8}")
+                for r in case:
+                    print(f"  {r['op']:<26} {r['cold_ms']:>10.2f} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} "
+                          f"{r['p99_ms']:>10.2f} {r['peak_rss_mb']:>8.1f}")
+                shutil.rmtree(work, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.out:
+        meta = {"python": platform.python_version(), "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"), "repeat": args.repeat, "write_repeat": args.write_repeat}
+        with open(args.out, 'w') as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    if args.compare:
+        return 1 if compare(args.compare, results, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
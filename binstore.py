@@ -0,0 +1,469 @@
+"""Bảng giao dịch nhị phân: bản ghi độ dài cố định đọc qua mmap, mô tả nằm trong vùng chuỗi dùng chung.
+
+    python binstore.py import transactions.json transactions.bin
+    python binstore.py export transactions.bin transactions.json
+
+transactions.bin         = phần đầu HEADER_SIZE byte (magic, phiên bản, độ dài bản ghi, số loại)
+                           + các bản ghi RECORD: id, thời điểm (giây), mã loại, số tiền, vị trí mô tả
+transactions.bin.strings = các chuỗi UTF-8 kèm độ dài; mô tả trùng nhau chỉ lưu một lần
+transactions.bin.types   = danh sách tên loại (JSON), mã loại là vị trí trong danh sách
+
+Phiên bản 1 để danh sách loại trong phần đầu nên giới hạn bởi HEADER_SIZE; file phiên bản 1
+vẫn đọc được và được chuyển sang phiên bản 2 ở lần ghi thêm loại mới.
+
+Bản ghi được nối thêm theo ID tăng dần nên tìm theo ID bằng tìm kiếm nhị phân, quét tuần tự
+chỉ cần struct.iter_unpack, không phải phân tích JSON hay dựng dict cho từng dòng.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from indexes import fold
+from locking import atomic_write, file_lock
+import profiling
+from records import Transaction, to_json
+
+MAGIC = b"MISB"
+VERSION = 2
+HEADER_SIZE = 256
+HEADER = struct.Struct("<4sHHH")
+RECORD = struct.Struct("<qqBdI")
+ID = struct.Struct("<q")
+LENGTH = struct.Struct("<I")
+# Mã loại là một byte không dấu
+MAX_TYPES = 256
+
+# Ngày không đọc được
+MISSING = -(2 ** 63)
+EPOCH = datetime(1970, 1, 1)
+
+def to_seconds(value):
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return MISSING
+    if not isinstance(value, datetime):
+        return MISSING
+    return (value.replace(tzinfo=None) - EPOCH) // timedelta(seconds=1)
+
+@lru_cache(maxsize=4096)
+def _day(days):
+    return (EPOCH + timedelta(days=days)).strftime("%Y-%m-%d")
+
+def format_seconds(seconds):
+    if seconds == MISSING:
+        return ""
+    # Ngày lặp lại giữa các dòng: chỉ định dạng mỗi ngày một lần, phần giờ tính bằng divmod
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, rest = divmod(rest, 60)
+    return f"{_day(days)} {hours:02d}:{minutes:02d}:{rest:02d}"
+
+def _check_types(types):
+    if len(types) > MAX_TYPES:
+        raise ValueError(f"Bảng nhị phân chỉ chứa được {MAX_TYPES} loại giao dịch khác nhau (đang có {len(types)})")
+
+def _bound(text):
+    # Cận lọc từ indexes.date_bounds: "YYYY-MM-DD" hoặc "YYYY-MM-DD 23:59:59"
+    if text is None:
+        return None
+    seconds = to_seconds(text)
+    return seconds if seconds != MISSING else None
+
+class BinaryTable:
+    def __init__(self, path):
+        self.path = path
+        self.heap_path = path + ".strings"
+        self.types_path = path + ".types"
+        self._lock = threading.RLock()
+        self._signature = None
+        self._map = None
+        self._heap = None
+        self._types = []
+        self._count = 0
+        self._texts = {}      # vị trí trong vùng chuỗi -> chuỗi
+        self._folded = {}     # vị trí -> chuỗi đã bỏ dấu (tìm kiếm, sắp xếp)
+        self._offsets = None  # chuỗi -> vị trí, chỉ dựng khi ghi
+        self._heap_end = 0
+        self._query_results = {}
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def create(self, records=()):
+        """Tạo bảng mới (ghi đè) từ các bản ghi dạng dict, sắp theo ID"""
+        records = sorted(records, key=lambda record: record["id"])
+        with self._lock, file_lock(self.path):
+            types, codes = [], {}
+            offsets, heap = {}, bytearray()
+            packed = bytearray()
+            for record in records:
+                type_name = str(record.get("type") or "")
+                code = codes.get(type_name)
+                if code is None:
+                    code = codes[type_name] = len(types)
+                    types.append(type_name)
+                    _check_types(types)
+                text = str(record.get("description") or "")
+                offset = offsets.get(text)
+                if offset is None:
+                    offset = offsets[text] = len(heap)
+                    data = text.encode("utf-8")
+                    heap += LENGTH.pack(len(data)) + data
+                amount = record.get("amount")
+                packed += RECORD.pack(record["id"], to_seconds(record.get("date")), code,
+                                      amount if isinstance(amount, (int, float)) else 0, offset)
+            header = self._header(types)
+            # Vùng chuỗi và loại trước: bảng mới không bao giờ trỏ tới chuỗi hay loại chưa có
+            with atomic_write(self.heap_path, 'wb') as f:
+                f.write(heap)
+            self._write_types(types)
+            with atomic_write(self.path, 'wb') as f:
+                f.write(header)
+                f.write(packed)
+                profiling.count_written(len(header) + len(packed) + len(heap))
+            self._signature = None
+            self._reset()
+
+    def _header(self, types):
+        _check_types(types)
+        return HEADER.pack(MAGIC, VERSION, RECORD.size, len(types)).ljust(HEADER_SIZE, b"\0")
+
+    def _write_types(self, types):
+        with atomic_write(self.types_path, 'w', encoding='utf-8') as f:
+            json.dump(types, f, ensure_ascii=False)
+
+    def _read_types(self, header, version, count):
+        if version == 1:
+            return json.loads(header[HEADER.size:HEADER.size + count].decode("utf-8"))
+        with open(self.types_path, 'r', encoding='utf-8') as f:
+            types = json.load(f)
+        # File loại có thể có thêm loại của lần ghi bị ngắt, không bao giờ thiếu
+        if len(types) < count:
+            raise ValueError(f"{self.types_path} thiếu loại giao dịch")
+        return types
+
+    def _reset(self):
+        self._texts, self._folded, self._offsets, self._heap_end = {}, {}, None, 0
+
+    def _stat(self):
+        signature = []
+        for path in (self.path, self.heap_path):
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return signature
+
+    def signature(self):
+        try:
+            return self._stat()
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        """Ánh xạ lại file khi nó đổi (tiến trình khác vừa ghi thêm)"""
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        old = self._signature
+        # Chỉ bỏ tham chiếu: mmap tự đóng khi vòng quét cuối cùng còn dùng nó kết thúc
+        self._map = self._heap = None
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            magic, version, record_size, count = HEADER.unpack_from(header)
+            if magic != MAGIC or version not in (1, VERSION) or record_size != RECORD.size:
+                raise ValueError(f"{self.path} không phải bảng giao dịch nhị phân hợp lệ")
+            self._types = self._read_types(header, version, count)
+            # Bản ghi cuối ghi dở (chưa đủ độ dài) bị bỏ qua
+            self._count = (signature[0][1] - HEADER_SIZE) // RECORD.size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if signature[1][1]:
+            with open(self.heap_path, 'rb') as f:
+                self._heap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if old is None or old[1][2] != signature[1][2] or old[1][1] > signature[1][1]:
+            # Vùng chuỗi bị thay (tạo lại bảng): vị trí cũ không còn đúng
+            self._reset()
+        self._signature = signature
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def _text(self, offset):
+        text = self._texts.get(offset)
+        if text is None:
+            length, = LENGTH.unpack_from(self._heap, offset)
+            start = offset + LENGTH.size
+            text = self._texts[offset] = self._heap[start:start + length].decode("utf-8")
+        return text
+
+    def _fold(self, offset):
+        folded = self._folded.get(offset)
+        if folded is None:
+            folded = self._folded[offset] = fold(self._text(offset))
+        return folded
+
+    def _row(self, values):
+        record_id, seconds, code, amount, offset = values
+        return (record_id, format_seconds(seconds), self._types[code], amount, self._text(offset))
+
+    def _scan(self):
+        """Các bộ (id, giây, mã loại, số tiền, vị trí mô tả) của mọi bản ghi, theo thứ tự ID"""
+        self._refresh()
+        end = HEADER_SIZE + self._count * RECORD.size
+        profiling.count_rows(self._count)
+        profiling.count_read(end - HEADER_SIZE)
+        if not self._count:
+            return iter(())
+        return RECORD.iter_unpack(memoryview(self._map)[HEADER_SIZE:end])
+
+    def last_id(self):
+        with self._lock:
+            self._refresh()
+            if not self._count:
+                return 0
+            return ID.unpack_from(self._map, HEADER_SIZE + (self._count - 1) * RECORD.size)[0]
+
+    def get(self, record_id):
+        """Bản ghi theo ID (tìm kiếm nhị phân trên cột ID), None nếu không có"""
+        with self._lock:
+            self._refresh()
+            lo, hi = 0, self._count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                position = HEADER_SIZE + mid * RECORD.size
+                current = ID.unpack_from(self._map, position)[0]
+                if current == record_id:
+                    return Transaction(*self._row(RECORD.unpack_from(self._map, position)))
+                if current < record_id:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return None
+
+    def after(self, record_id=None, limit=100, descending=False):
+        """Tối đa limit dòng ngay sau record_id theo ID (trước nó nếu descending), None là từ đầu/cuối.
+        Vị trí bắt đầu tìm bằng tìm kiếm nhị phân nên không phụ thuộc số dòng"""
+        with self._lock:
+            self._refresh()
+            start = self._count if descending else 0
+            if record_id is not None:
+                lo, hi = 0, self._count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    current = ID.unpack_from(self._map, HEADER_SIZE + mid * RECORD.size)[0]
+                    if current < record_id or (current == record_id and not descending):
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                start = lo
+            if descending:
+                positions = range(start - 1, max(start - limit, 0) - 1, -1)
+            else:
+                positions = range(start, min(start + limit, self._count))
+            return [self._row(RECORD.unpack_from(self._map, HEADER_SIZE + i * RECORD.size)) for i in positions]
+
+    def records(self):
+        with self._lock:
+            return [Transaction(*self._row(values)) for values in self._scan()]
+
+    def _filtered(self, t_type="", keyword="", lower=None, upper=None):
+        rows = self._scan()
+        if t_type:
+            t_type = t_type.lower()
+            codes = {code for code, name in enumerate(self._types) if name.lower() == t_type}
+            rows = (values for values in rows if values[2] in codes)
+        lower, upper = _bound(lower), _bound(upper)
+        if lower is not None or upper is not None:
+            lower = MISSING + 1 if lower is None else lower
+            upper = -MISSING - 1 if upper is None else upper
+            rows = (values for values in rows if lower <= values[1] <= upper)
+        if keyword:
+            # Mô tả lặp lại nhiều: mỗi chuỗi khác nhau chỉ bỏ dấu và so khớp một lần
+            query, matches = fold(keyword), {}
+            def matching(offset):
+                found = matches.get(offset)
+                if found is None:
+                    found = matches[offset] = query in self._fold(offset)
+                return found
+            rows = (values for values in rows if matching(values[4]))
+        return rows
+
+    def search(self, t_type="", keyword="", lower=None, upper=None):
+        """Các dòng (id, ngày, loại, số tiền, mô tả) khớp bộ lọc; lower/upper lấy từ date_bounds"""
+        with self._lock:
+            return [self._row(values) for values in self._filtered(t_type, keyword, lower, upper)]
+
+    def stream(self, t_type="", keyword="", lower=None, upper=None):
+        """(số dòng khớp, iterator các dòng): đếm bằng một lượt quét, dòng chỉ được giải mã khi duyệt tới"""
+        with self._lock:
+            total = sum(1 for _ in self._filtered(t_type, keyword, lower, upper))
+            return total, map(self._row, self._filtered(t_type, keyword, lower, upper))
+
+    def query(self, offset=0, limit=100, sort_by="id", descending=False,
+              t_type="", keyword="", lower=None, upper=None):
+        """(tổng số dòng khớp, các dòng của trang): chỉ các dòng trong trang mới được giải mã"""
+        key = (sort_by, descending, t_type.lower(), keyword, lower, upper)
+        with self._lock:
+            self._refresh()
+            cached = self._query_results.get(key)
+            if cached is not None and cached[0] == self._signature:
+                rows = cached[1]
+            else:
+                rows = list(self._filtered(t_type, keyword, lower, upper))
+                if sort_by != "id" or descending:
+                    rows.sort(key=self._sort_key(sort_by), reverse=descending)
+                # Giữ vài kết quả gần nhất để cuộn qua các trang không phải lọc/sắp xếp lại
+                if len(self._query_results) >= 8:
+                    self._query_results.pop(next(iter(self._query_results)))
+                self._query_results[key] = (self._signature, rows)
+            return len(rows), [self._row(values) for values in rows[offset:offset + limit]]
+
+    def _sort_key(self, sort_by):
+        if sort_by == "id":
+            return lambda values: values[0]
+        if sort_by == "date":
+            # Ngày trống xếp cuối như pagination.sort_value
+            return lambda values: (values[1] == MISSING, values[1])
+        if sort_by == "type":
+            folded = [fold(name) for name in self._types]
+            return lambda values: folded[values[2]]
+        if sort_by == "amount":
+            return lambda values: values[3]
+        if sort_by == "description":
+            return lambda values: self._fold(values[4])
+        raise ValueError(f"Không sắp xếp được theo cột {sort_by}")
+
+    def totals(self):
+        """Tổng thu/chi, cộng theo mã loại"""
+        with self._lock:
+            sums = {}
+            for values in self._scan():
+                sums[values[2]] = sums.get(values[2], 0) + values[3]
+            totals = {"income": 0, "expense": 0}
+            for code, amount in sums.items():
+                field = {"thu": "income", "chi": "expense"}.get(self._types[code].lower())
+                if field is not None:
+                    totals[field] += amount
+            return totals
+
+    def columns(self, normalize=None):
+        """analytics.Columns (ngày, loại, số tiền) đọc thẳng từ vùng nhớ bằng numpy, không qua dict"""
+        import numpy as np
+        from analytics import Columns
+        with self._lock:
+            self._refresh()
+            dtype = np.dtype([("id", "<i8"), ("seconds", "<i8"), ("code", "u1"), ("amount", "<f8"), ("text", "<u4")])
+            records = np.frombuffer(self._map, dtype=dtype, count=self._count, offset=HEADER_SIZE)
+            labels, label_codes = [], []
+            for name in self._types:
+                label = normalize(name) if normalize is not None else name
+                if label not in labels:
+                    labels.append(label)
+                label_codes.append(labels.index(label))
+            seconds = records["seconds"]
+            # MISSING trùng với NaT của analytics nên giữ nguyên khi đổi sang phút
+            minutes = np.where(seconds == MISSING, seconds, seconds // 60)
+            codes = np.array(label_codes, dtype=np.int32)[records["code"]]
+            return Columns(minutes, records["amount"].copy(), codes, labels)
+
+    def append(self, records):
+        """Nối thêm các bản ghi (ID phải lớn hơn ID cuối cùng)"""
+        if not records:
+            return
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            last = self.last_id()
+            for record in records:
+                if record["id"] <= last:
+                    raise ValueError(f"ID {record['id']} không lớn hơn ID cuối cùng {last}")
+                last = record["id"]
+            types = list(self._types)
+            heap = bytearray()
+            offsets, added = self._string_offsets(), {}
+            packed = bytearray()
+            for record in records:
+                type_name = str(record.get("type") or "")
+                if type_name not in types:
+                    types.append(type_name)
+                    _check_types(types)
+                text = str(record.get("description") or "")
+                offset = offsets.get(text, added.get(text))
+                if offset is None:
+                    offset = added[text] = self._heap_end + len(heap)
+                    data = text.encode("utf-8")
+                    heap += LENGTH.pack(len(data)) + data
+                amount = record.get("amount")
+                packed += RECORD.pack(record["id"], to_seconds(record.get("date")), types.index(type_name),
+                                      amount if isinstance(amount, (int, float)) else 0, offset)
+            leftover = self._signature[1][1] - self._heap_end
+            if len(heap) < leftover:
+                # Chuỗi dở dài hơn phần ghi mới: thêm một chuỗi đệm phủ hết để vùng chuỗi vẫn đọc tuần tự được
+                filler = max(leftover - len(heap) - LENGTH.size, 0)
+                heap += LENGTH.pack(filler) + b"\0" * filler
+            # Thứ tự ghi: chuỗi, loại mới (file loại rồi phần đầu), rồi bản ghi;
+            # dừng giữa chừng chỉ để lại phần thừa vô hại, lần ghi sau ghi đè lên
+            if heap:
+                self._write_at(self.heap_path, self._heap_end, heap)
+                offsets.update(added)
+                self._heap_end += len(heap)
+            if types != self._types:
+                header = self._header(types)
+                self._write_types(types)
+                with open(self.path, 'r+b') as f:
+                    f.write(header)
+            # Phần dư ngắn hơn một bản ghi nên luôn bị bản ghi đầu tiên ghi đè hết
+            self._write_at(self.path, HEADER_SIZE + self._count * RECORD.size, packed)
+            profiling.count_written(len(heap) + len(packed))
+
+    def _write_at(self, path, position, data):
+        # Ghi đè từ position thay vì cắt bỏ phần dư của lần ghi bị ngắt: file không bao giờ ngắn lại
+        # nên vùng mmap mà các vòng quét (stream) đang duyệt luôn còn nằm trong file
+        with open(path, 'r+b') as f:
+            f.seek(position)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _string_offsets(self):
+        """Ánh xạ chuỗi -> vị trí để dùng lại chuỗi đã có; chỉ đọc phần vùng chuỗi mới thêm"""
+        if self._offsets is None:
+            self._offsets, self._heap_end = {}, 0
+        size = self._signature[1][1]
+        position = self._heap_end
+        while position + LENGTH.size <= size:
+            length, = LENGTH.unpack_from(self._heap, position)
+            end = position + LENGTH.size + length
+            if end > size:
+                break
+            self._offsets.setdefault(self._heap[position + LENGTH.size:end].decode("utf-8"), position)
+            position = end
+        self._heap_end = position
+        return self._offsets
+
+def import_json(json_file, path):
+    with open(json_file, 'r') as f:
+        records = json.load(f)
+    table = BinaryTable(path)
+    table.create(records)
+    return len(records)
+
+def export_json(path, json_file):
+    records = BinaryTable(path).records()
+    with atomic_write(json_file) as f:
+        json.dump(records, f, indent=2, default=to_json)
+    return len(records)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Cách dùng: python binstore.py import transactions.json transactions.bin\n"
+              "           python binstore.py export transactions.bin transactions.json")
+        sys.exit(1)
+    command, source, target = sys.argv[1:]
+    count = (import_json if command == "import" else export_json)(source, target)
+    print(f"Đã chuyển {count} giao dịch từ {source} sang {target}")
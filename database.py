@@ -1,6 +1,16 @@
-import openpyxl 
 import os
+import sys
+from aggregates import open_aggregates, drift
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import chain
+from indexes import DateIndex, NgramIndex, date_bounds, date_key, fold
+from locking import file_lock, replace, retry, temp_path
+import pagination
+from partitions import month_of, open_manifest, partition_file
+import profiling
+from records import Invoice, Product, Transaction
+from sequences import open_sequences
 
 FILES = {
     "warehouse": "warehouse.xlsx",
@@ -8,183 +18,705 @@ FILES = {
     "accounting": "accounting.xlsx"
 }
 
+HEADERS = {
+    "warehouse": ["ID", "Product Name", "Quantity", "Unit Price", "Supplier"],
+    "sales": ["Invoice ID", "Date", "Customer", "Total"],
+    "accounting": ["Transaction ID", "Date", "Type", "Amount", "Description"]
+}
+
+# Mỗi dòng đọc ra là một bản ghi __slots__ (records.py), dùng chung với gui.Database
+RECORDS = {
+    "warehouse": Product,
+    "sales": Invoice,
+    "accounting": Transaction
+}
+
+# Hóa đơn và giao dịch được chia theo tháng (sales_2025-04.xlsx, ...), danh sách phân vùng
+# nằm trong partitions.json. Ghi chỉ mở phân vùng của tháng đó, lọc theo ngày chỉ mở các
+# phân vùng giao với khoảng ngày. FILES vẫn là tên gốc, dùng làm khóa của sequence và manifest.
+# Còn file một sheet cũ thì vẫn đọc/ghi file đó cho tới khi chạy python database.py --split.
+PARTITIONED = ("sales", "accounting")
+
+def _manifest():
+    return open_manifest()
+
+def _files(key, lower=None, upper=None):
+    if key not in PARTITIONED or os.path.exists(FILES[key]):
+        return [FILES[key]]
+    # Phân vùng đã ghi nhận nhưng chưa kịp tạo file (lần ghi bị ngắt) coi như trống
+    return [file for file in _manifest().files(FILES[key], lower, upper) if os.path.exists(file)]
+
+BACKEND = os.environ.get("MISA_BACKEND", "xlsx")
+
+# Cache dữ liệu đã đọc của từng file, hết hạn khi mtime/kích thước thay đổi.
+# File lớn hơn CACHE_MAX_BYTES không được cache mà đọc dạng luồng mỗi lần.
+CACHE_MAX_BYTES = int(os.environ.get("MISA_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+
+_cache = {}
+_cache_stats = {"hits": 0, "misses": 0, "streamed": 0}
+
+def _signature(file):
+    try:
+        st = os.stat(file)
+    except FileNotFoundError:
+        return None
+    # Có cả inode: file được thay bằng os.replace luôn có inode mới
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def _open_workbook(file, read_only=False):
+    import openpyxl
+    profiling.count_read(os.path.getsize(file))
+    return retry(openpyxl.load_workbook, file, read_only=read_only)
+
+def _stream(key, file):
+    # Chế độ read_only đọc từng dòng từ file XML, bộ nhớ không phụ thuộc số dòng
+    wb = _open_workbook(file, read_only=True)
+    try:
+        profiling.count_rows(max(0, (wb.active.max_row or 1) - 1))
+        yield from map(RECORDS[key].from_row, wb.active.iter_rows(min_row=2, values_only=True))
+    finally:
+        wb.close()
+
+def _rows(key, file):
+    """Danh sách dòng đã cache, hoặc None nếu file quá lớn để giữ trong bộ nhớ"""
+    signature = _signature(file)
+    entry = _cache.get(file)
+    if entry is not None and entry["signature"] == signature:
+        _cache_stats["hits"] += 1
+        return entry["rows"]
+    if signature is not None and signature[1] > CACHE_MAX_BYTES:
+        _cache.pop(file, None)
+        _cache_stats["streamed"] += 1
+        return None
+    _cache_stats["misses"] += 1
+    rows = list(_stream(key, file))
+    _cache[file] = {"signature": signature, "rows": rows, "date_index": None, "text_index": None,
+                    "id_index": None, "sorted": {}}
+    return rows
+
+def _iter_file(key, file):
+    rows = _rows(key, file)
+    if rows is not None:
+        profiling.count_rows(len(rows))
+    # Dòng đã xóa (tombstone) là dòng trống, chờ compact() dọn
+    return (row for row in (rows if rows is not None else _stream(key, file)) if row.id is not None)
+
+def _iter_rows(key):
+    return chain.from_iterable(_iter_file(key, file) for file in _files(key))
+
+# Trường dùng cho chỉ mục ngày và chỉ mục tìm kiếm không dấu của từng file
+_DATE_FIELD = {"sales": "date", "accounting": "date"}
+_TEXT_FIELD = {"warehouse": "name", "sales": "customer", "accounting": "description"}
+
+def _index(key, file, kind, rows):
+    entry = _cache[file]
+    if entry[kind] is None:
+        if kind == "date_index":
+            entry[kind] = DateIndex(row.date for row in rows)
+        elif kind == "id_index":
+            entry[kind] = {row.id: position for position, row in enumerate(rows) if row.id is not None}
+        else:
+            field = _TEXT_FIELD[key]
+            entry[kind] = NgramIndex(getattr(row, field) for row in rows)
+    return entry[kind]
+
+def _scan(key, file, keyword="", lower=None, upper=None):
+    # Lọc trên luồng dòng cho file không cache, cùng điều kiện với chỉ mục
+    query = fold(keyword) if keyword else ""
+    text_field = _TEXT_FIELD[key]
+    for row in _stream(key, file):
+        if row.id is None:
+            continue
+        if lower is not None or upper is not None:
+            date = date_key(row.date)
+            if date is None or (lower is not None and date < lower) or (upper is not None and date > upper):
+                continue
+        text = getattr(row, text_field)
+        if query and (text is None or query not in fold(text)):
+            continue
+        yield row
+
+def _matching(key, keyword="", lower=None, upper=None):
+    # Chỉ mở các phân vùng có tháng giao với khoảng ngày
+    result = []
+    for file in _files(key, lower, upper):
+        result.extend(_matching_file(key, file, keyword, lower, upper))
+    return result
+
+def _matching_file(key, file, keyword, lower, upper):
+    rows = _rows(key, file)
+    if rows is None:
+        return _scan(key, file, keyword, lower, upper)
+    positions = _matching_positions(key, file, rows, keyword, lower, upper)
+    profiling.count_rows(len(rows) if positions is None else len(positions))
+    if positions is None:
+        return [row for row in rows if row.id is not None]
+    return [rows[i] for i in positions if rows[i].id is not None]
+
+def _matching_positions(key, file, rows, keyword, lower, upper):
+    # Lọc ngày bằng bisect trước, sau đó kiểm tra keyword trên tập con; None là mọi dòng
+    positions = None
+    if lower is not None or upper is not None:
+        positions = _index(key, file, "date_index", rows).positions(lower, upper)
+    if keyword:
+        text_index = _index(key, file, "text_index", rows)
+        if positions is None:
+            positions = text_index.search(keyword)
+        else:
+            positions = text_index.filter(positions, keyword)
+    return positions
+
+def _sorted(key, file, rows, sort_by):
+    # Các dòng (trừ dòng đã xóa) xếp theo (cột, id) cho page_*: dựng một lần cho mỗi phiên bản
+    # của file, các trang sau chỉ bisect tới cursor. Ghi vào file thì bỏ, lần sau dựng lại.
+    orders = _cache[file]["sorted"]
+    if sort_by not in orders:
+        orders[sort_by] = sorted((row for row in rows if row.id is not None), key=pagination.sort_key(sort_by))
+    return orders[sort_by]
+
+def _write_through(key, file, before, appended=(), updated=None, appended_at=None):
+    # Chỉ cập nhật tại chỗ khi cache khớp với file trước lúc ghi
+    entry = _cache.get(file)
+    if entry is None:
+        return
+    rows = entry["rows"]
+    # openpyxl bỏ các dòng trống ở cuối sheet khi mở lại: vị trí dòng mới có thể lệch với cache
+    if entry["signature"] != before or (appended_at is not None and appended_at != len(rows)):
+        del _cache[file]
+        return
+    for row in appended:
+        if entry["date_index"] is not None:
+            entry["date_index"].add(row.date, len(rows))
+        if entry["text_index"] is not None:
+            entry["text_index"].add(len(rows), getattr(row, _TEXT_FIELD[key]))
+        if entry["id_index"] is not None:
+            entry["id_index"][row.id] = len(rows)
+        rows.append(row)
+    if updated is not None:
+        position, row = updated
+        old = rows[position]
+        rows[position] = row
+        if row.id is None:
+            # Tombstone: vị trí các dòng khác giữ nguyên nên chỉ mục vẫn dùng được
+            if entry["text_index"] is not None:
+                entry["text_index"].remove(position)
+            if entry["id_index"] is not None:
+                entry["id_index"].pop(old.id, None)
+        elif entry["text_index"] is not None:
+            entry["text_index"].update(position, getattr(row, _TEXT_FIELD[key]))
+    entry["sorted"] = {}
+    entry["signature"] = _signature(file)
+
+# Tổng cộng dồn cho tab thống kê, lưu trong aggregates.json.
+# Mở khi dùng tới (theo thư mục hiện tại), import module không đọc hay tạo file nào
+def _aggregates():
+    return open_aggregates()
+
+_EMPTY_TOTALS = {
+    "warehouse": ("quantity", "value"),
+    "sales": ("total",),
+    "accounting": ("income", "expense")
+}
+
+def _row_totals(key, row):
+    if key == "warehouse":
+        quantity, unit_price = row.quantity, row.price
+        if isinstance(quantity, (int, float)) and isinstance(unit_price, (int, float)):
+            return {"quantity": quantity, "value": quantity * unit_price}
+    elif key == "sales":
+        if isinstance(row.total, (int, float)):
+            return {"total": row.total}
+    elif key == "accounting":
+        trans_type, amount = row.type, row.amount
+        if isinstance(amount, (int, float)) and isinstance(trans_type, str):
+            if trans_type.lower() == "thu":
+                return {"income": amount}
+            if trans_type.lower() == "chi":
+                return {"expense": amount}
+    return {}
+
+def _sum_totals(key, rows):
+    totals = dict.fromkeys(_EMPTY_TOTALS[key], 0)
+    for row in rows:
+        for field, value in _row_totals(key, row).items():
+            totals[field] += value
+    return totals
+
+def _file_totals(key, file):
+    signature = _signature(file)
+    totals = _aggregates().get(file, signature)
+    if totals is None:
+        totals = _sum_totals(key, _iter_file(key, file))
+        _aggregates().put(file, signature, totals)
+    return totals
+
+def _totals(key):
+    # Mỗi phân vùng có tổng riêng: thống kê chỉ đọc aggregates.json, không mở phân vùng cũ
+    totals = dict.fromkeys(_EMPTY_TOTALS[key], 0)
+    for file in _files(key):
+        for field, value in _file_totals(key, file).items():
+            totals[field] += value
+    return totals
+
+def _update_totals(key, file, before, added=(), removed=()):
+    delta = _sum_totals(key, added)
+    for field, value in _sum_totals(key, removed).items():
+        delta[field] -= value
+    _aggregates().apply(file, before, _signature(file), delta)
+
+def _verify_file(key, file, repair):
+    signature = _signature(file)
+    stored = _aggregates().get(file, signature)
+    actual = _sum_totals(key, _stream(key, file))
+    if stored is None:
+        result = {"status": "missing", "actual": actual}
+    else:
+        differences = drift(stored, actual)
+        result = {"status": "drift" if differences else "ok", "drift": differences}
+    if repair and result["status"] != "ok":
+        _aggregates().put(file, signature, actual)
+    return result
+
+def verify_summaries(repair=False):
+    # Tính lại từ file (bỏ qua cache) và báo các tổng bị lệch
+    report = {}
+    for key in FILES:
+        if key not in PARTITIONED:
+            report[key] = _verify_file(key, FILES[key], repair)
+            continue
+        partitions = {file: _verify_file(key, file, repair) for file in _files(key)}
+        problems = [result["status"] for result in partitions.values() if result["status"] != "ok"]
+        report[key] = {"status": "drift" if "drift" in problems else (problems[0] if problems else "ok"),
+                       "partitions": {file: result for file, result in partitions.items() if result["status"] != "ok"}}
+    return report
+
+# ID cấp theo sequence lưu trong sequences.json, không phụ thuộc dòng cuối của sheet.
+# Mở khi dùng tới như _aggregates()
+def _sequences():
+    return open_sequences()
+
+def _last_id(ws):
+    # Chỉ dùng khi chưa có sequence: bỏ qua các tombstone ở cuối sheet
+    for row in range(ws.max_row, 1, -1):
+        value = ws.cell(row=row, column=1).value
+        if isinstance(value, int):
+            return value
+    return 0
+
+def _find(key, ws, record_id):
+    """Vị trí (tính từ 0, không kể dòng tiêu đề) của ID trong sheet đang mở"""
+    rows = _rows(key, FILES[key])
+    if rows is not None:
+        position = _index(key, FILES[key], "id_index", rows).get(record_id)
+        # Kiểm tra lại trên sheet phòng khi cache lệch vị trí
+        if position is not None and ws.cell(row=position + 2, column=1).value == record_id:
+            return position
+    for position, (value,) in enumerate(ws.iter_rows(min_row=2, max_col=1, values_only=True)):
+        if value == record_id:
+            return position
+    return None
+
+# Tombstone được dọn khi chiếm quá tỉ lệ này (và ít nhất COMPACT_MIN_TOMBSTONES dòng)
+COMPACT_RATIO = 0.25
+COMPACT_MIN_TOMBSTONES = 100
+
+def _tombstones(key):
+    entry = _cache.get(FILES[key])
+    if entry is None or entry["id_index"] is None:
+        return 0
+    return len(entry["rows"]) - len(entry["id_index"])
+
+def _save(wb, file):
+    # Lưu ra file tạm rồi thay thế nguyên tử: máy khác đang đọc không thấy file ghi dở
+    tmp = temp_path(file)
+    try:
+        wb.save(tmp)
+        profiling.count_written(os.path.getsize(tmp))
+        replace(tmp, file)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def compact(key="warehouse"):
+    """Ghi lại file không còn các dòng đã xóa; tổng cộng dồn không đổi"""
+    for file in _files(key):
+        _compact_file(file)
+
+def _compact_file(file):
+    import openpyxl
+    with file_lock(file):
+        before = _signature(file)
+        wb = _open_workbook(file, read_only=True)
+        rows = list(wb.active.iter_rows(values_only=True))
+        wb.close()
+        compacted = openpyxl.Workbook()
+        ws = compacted.active
+        ws.append(rows[0])
+        for row in rows[1:]:
+            if row[0] is not None:
+                ws.append(row)
+        _save(compacted, file)
+        _cache.pop(file, None)
+        _aggregates().apply(file, before, _signature(file), {})
+
+def cache_stats():
+    return dict(_cache_stats, entries=len(_cache))
+
+def clear_cache():
+    _cache.clear()
+    _cache_stats["hits"] = _cache_stats["misses"] = 0
+
+# Ghi hàng loạt: cấp ID một lượt và chỉ lưu file một lần
+_batch = None
+
+def _product_row(record_id, record, now):
+    name, quantity, price, supplier = record
+    return Product(record_id, name, quantity, price, supplier)
+
+def _invoice_row(record_id, record, now):
+    customer, total_amount, *date = record
+    return Invoice(record_id, date[0] if date else now, customer, total_amount)
+
+def _transaction_row(record_id, record, now):
+    transaction_type, amount, description, *date = record
+    return Transaction(record_id, date[0] if date else now, transaction_type, amount, description)
+
+_ROW_BUILDERS = {
+    "warehouse": _product_row,
+    "sales": _invoice_row,
+    "accounting": _transaction_row
+}
+
+def _append_rows(key, records):
+    records = list(records)
+    if not records:
+        return []
+    file = FILES[key]
+    if key in PARTITIONED and not os.path.exists(file):
+        return _append_partitioned(key, records)
+    with file_lock(file):
+        # Máy khác có thể vừa tách file cũ thành phân vùng trong lúc chờ khóa
+        if key not in PARTITIONED or os.path.exists(file):
+            before = _signature(file)
+            wb = _open_workbook(file)
+            ws = wb.active
+            next_id = _sequences().allocate(file, len(records), floor=lambda: _last_id(ws))
+            now = datetime.now().strftime("%Y-%m-%d %H:%M")
+            build = _ROW_BUILDERS[key]
+            rows = [build(next_id + i, record, now) for i, record in enumerate(records)]
+            appended_at = ws.max_row - 1
+            for row in rows:
+                ws.append(tuple(row))
+            _save(wb, file)
+            _write_through(key, file, before, appended=rows, appended_at=appended_at)
+            _update_totals(key, file, before, added=rows)
+            return [row.id for row in rows]
+    return _append_partitioned(key, records)
+
+def _append_partitioned(key, records):
+    # Sequence có khóa riêng nên cấp ID trước rồi mới khóa từng phân vùng được ghi
+    next_id = _sequences().allocate(FILES[key], len(records),
+                                  floor=lambda: max((row.id for row in _iter_rows(key) if isinstance(row.id, int)), default=0))
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    build = _ROW_BUILDERS[key]
+    rows = [build(next_id + i, record, now) for i, record in enumerate(records)]
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(month_of(row.date), []).append(row)
+    files = _manifest().register(FILES[key], {month: partition_file(FILES[key], month) for month in by_month})
+    for month, month_rows in by_month.items():
+        _append_to_partition(key, files[month], month_rows)
+    return [row.id for row in rows]
+
+def _append_to_partition(key, file, rows):
+    with file_lock(file):
+        before = _signature(file)
+        if before is None:
+            # Phân vùng mới: tổng được tính luôn từ các dòng vừa ghi
+            _save_new(key, file, rows)
+            _aggregates().put(file, _signature(file), _sum_totals(key, rows))
+            return
+        wb = _open_workbook(file)
+        ws = wb.active
+        appended_at = ws.max_row - 1
+        for row in rows:
+            ws.append(tuple(row))
+        _save(wb, file)
+        _write_through(key, file, before, appended=rows, appended_at=appended_at)
+        _update_totals(key, file, before, added=rows)
+
+def _save_new(key, file, rows):
+    import openpyxl
+    # write_only: tách file cũ thành phân vùng không phải giữ cả sheet trong bộ nhớ
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADERS[key])
+    for row in rows:
+        ws.append(tuple(row))
+    _save(wb, file)
+
+def _add(key, record):
+    if _batch is not None:
+        _batch.setdefault(key, []).append(record)
+    else:
+        _append_rows(key, [record])
+
+@contextmanager
+def batch():
+    # Gom các lệnh add_* bên trong khối with thành một lần lưu cho mỗi file
+    global _batch
+    if _batch is not None:
+        yield
+        return
+    _batch = {}
+    try:
+        yield
+        pending = _batch
+    finally:
+        _batch = None
+    for key, records in pending.items():
+        _append_rows(key, records)
+
+def add_products_bulk(records):
+    return _append_rows("warehouse", records)
+
+def add_invoices_bulk(records):
+    return _append_rows("sales", records)
+
+def add_transactions_bulk(records):
+    return _append_rows("accounting", records)
+
 def create_files():
     for key, file in FILES.items():
-        if not os.path.exists(file):
+        if key in PARTITIONED:
+            # Phân vùng được tạo khi có dòng đầu tiên của tháng; file một sheet cũ giữ nguyên
+            # cho tới khi tách bằng python database.py --split
+            continue
+        if os.path.exists(file):
+            continue
+        with file_lock(file):
+            # Máy khác có thể vừa tạo file trong lúc chờ khóa
+            if os.path.exists(file):
+                continue
+            # Chỉ nạp openpyxl khi thật sự phải tạo file
+            import openpyxl
             wb = openpyxl.Workbook()
-            ws = wb.active
-            if key == "warehouse":
-                ws.append(["ID", "Product Name", "Quantity", "Unit Price", "Supplier"])
-            elif key == "sales":
-                ws.append(["Invoice ID", "Date", "Customer", "Total"])
-            elif key == "accounting":
-                ws.append(["Transaction ID", "Date", "Type", "Amount", "Description"])
-            wb.save(file)
+            wb.active.append(HEADERS[key])
+            _save(wb, file)
+
+def split_partitions(key):
+    """Tách file một sheet cũ (sales.xlsx, accounting.xlsx) thành các phân vùng theo tháng.
+
+    Chỉ chạy khi được gọi (python database.py --split), không bao giờ từ đường đọc/ghi.
+    File cũ được đổi tên thành .bak sau khi manifest đã ghi nhận mọi phân vùng; bị ngắt giữa
+    chừng thì lần sau tách lại, dòng có ID đã nằm trong phân vùng không bị thêm lần nữa.
+    Trả về số dòng đã chuyển.
+    """
+    file = FILES[key]
+    with file_lock(file):
+        if not os.path.exists(file):
+            return 0
+        by_month = {}
+        for row in _stream(key, file):
+            if row.id is not None:
+                by_month.setdefault(month_of(row.date), []).append(row)
+        known = _manifest().months(file)
+        files = {month: partition_file(file, month) for month in by_month}
+        count = 0
+        for month, rows in by_month.items():
+            target = files[month]
+            if month in known and os.path.exists(target):
+                ids = {row.id for row in _iter_file(key, target)}
+                rows = [row for row in rows if row.id not in ids]
+                if rows:
+                    _append_to_partition(key, target, rows)
+            else:
+                # Chưa ghi nhận thì file (nếu có) là phần còn lại của lần tách bị ngắt: ghi đè
+                with file_lock(target):
+                    _save_new(key, target, rows)
+                    _aggregates().put(target, _signature(target), _sum_totals(key, rows))
+                    _cache.pop(target, None)
+            count += len(rows)
+        _manifest().register(file, files)
+        # Khởi tạo sequence từ file cũ (nếu chưa có) để lần ghi đầu không phải quét mọi phân vùng
+        last_id = max((row.id for rows in by_month.values() for row in rows if isinstance(row.id, int)), default=0)
+        _sequences().allocate(file, 0, floor=lambda: last_id)
+        replace(file, file + ".bak")
+        _cache.pop(file, None)
+        return count
 
 def add_product(name, quantity, price, supplier):
-    wb = openpyxl.load_workbook(FILES["warehouse"])
-    ws = wb.active
-    next_id = 1
-    if ws.max_row > 1:
-        last_id = ws.cell(row=ws.max_row, column=1).value
-        if isinstance(last_id, int):
-            next_id = last_id + 1
-    ws.append([next_id, name, quantity, price, supplier])
-    wb.save(FILES["warehouse"])
+    _add("warehouse", (name, quantity, price, supplier))
+
+def iter_products():
+    return _iter_rows("warehouse")
 
 def get_products():
-    wb = openpyxl.load_workbook(FILES["warehouse"])
-    ws = wb.active
-    data = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        data.append(row)
-    return data
+    return list(iter_products())
 
 def update_product(product_id, name, quantity, price, supplier):
-    wb = openpyxl.load_workbook(FILES["warehouse"])
-    ws = wb.active
-    for row in ws.iter_rows(min_row=2):
-        if row[0].value == product_id:
-            row[1].value = name
-            row[2].value = quantity
-            row[3].value = price
-            row[4].value = supplier
-            break
-    wb.save(FILES["warehouse"])
+    with file_lock(FILES["warehouse"]):
+        before = _signature(FILES["warehouse"])
+        wb = _open_workbook(FILES["warehouse"])
+        ws = wb.active
+        index = _find("warehouse", ws, product_id)
+        if index is None:
+            return
+        row = ws[index + 2]
+        old = Product.from_row([cell.value for cell in row[:5]])
+        row[1].value = name
+        row[2].value = quantity
+        row[3].value = price
+        row[4].value = supplier
+        _save(wb, FILES["warehouse"])
+
+        new = Product(product_id, name, quantity, price, supplier)
+        _write_through("warehouse", FILES["warehouse"], before, updated=(index, new))
+        _update_totals("warehouse", FILES["warehouse"], before, added=[new], removed=[old])
 
 def delete_product(product_id):
-    wb = openpyxl.load_workbook(FILES["warehouse"])
-    ws = wb.active
-    for i, row in enumerate(ws.iter_rows(min_row=2), start=2):
-        if row[0].value == product_id:
-            ws.delete_rows(i)
-            break
-    wb.save(FILES["warehouse"])
+    with file_lock(FILES["warehouse"]):
+        before = _signature(FILES["warehouse"])
+        wb = _open_workbook(FILES["warehouse"])
+        ws = wb.active
+        index = _find("warehouse", ws, product_id)
+        if index is None:
+            return
+        # Xóa bằng tombstone (để trống dòng) thay vì delete_rows dịch cả sheet
+        row = ws[index + 2]
+        old = Product.from_row([cell.value for cell in row[:5]])
+        for cell in row:
+            cell.value = None
+        _save(wb, FILES["warehouse"])
+
+        _write_through("warehouse", FILES["warehouse"], before, updated=(index, Product(None, None, None, None)))
+        _update_totals("warehouse", FILES["warehouse"], before, removed=[old])
+        tombstones = _tombstones("warehouse")
+        if tombstones >= COMPACT_MIN_TOMBSTONES and tombstones > COMPACT_RATIO * len(_cache[FILES["warehouse"]]["rows"]):
+            compact("warehouse")
 
 def search_products(keyword):
-    all_data = get_products()
-    return [row for row in all_data if keyword.lower() in str(row[1]).lower()]
+    return _matching("warehouse", keyword)
 
 def add_invoice(customer, total_amount):
-    wb = openpyxl.load_workbook(FILES["sales"])
-    ws = wb.active
-    next_id = 1
-    if ws.max_row > 1:
-        last_id = ws.cell(row=ws.max_row, column=1).value
-        if isinstance(last_id, int):
-            next_id = last_id + 1
-    date = datetime.now().strftime("%Y-%m-%d %H:%M")
-    ws.append([next_id, date, customer, total_amount])
-    wb.save(FILES["sales"])
+    _add("sales", (customer, total_amount))
+
+def iter_invoices():
+    return _iter_rows("sales")
 
 def get_invoices():
-    wb = openpyxl.load_workbook(FILES["sales"])
-    ws = wb.active
-    return [row for row in ws.iter_rows(min_row=2, values_only=True)]
+    return list(iter_invoices())
 
 def add_transaction(transaction_type, amount, description):
-    wb = openpyxl.load_workbook(FILES["accounting"])
-    ws = wb.active
-    next_id = 1
-    if ws.max_row > 1:
-        last_id = ws.cell(row=ws.max_row, column=1).value
-        if isinstance(last_id, int):
-            next_id = last_id + 1
-    date = datetime.now().strftime("%Y-%m-%d %H:%M")
-    ws.append([next_id, date, transaction_type, amount, description])
-    wb.save(FILES["accounting"])
+    _add("accounting", (transaction_type, amount, description))
+
+def iter_transactions():
+    return _iter_rows("accounting")
 
 def get_transactions():
-    wb = openpyxl.load_workbook(FILES["accounting"])
-    ws = wb.active
-    return [row for row in ws.iter_rows(min_row=2, values_only=True)]
+    return list(iter_transactions())
 
 def get_inventory_summary():
-    wb = openpyxl.load_workbook(FILES["warehouse"])
-    ws = wb.active
-    total_quantity = 0
-    total_value = 0
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        quantity = row[2]
-        unit_price = row[3]
-        if isinstance(quantity, (int, float)) and isinstance(unit_price, (int, float)):
-            total_quantity += quantity
-            total_value += quantity * unit_price
-    return total_quantity, total_value
+    totals = _totals("warehouse")
+    return totals["quantity"], totals["value"]
 
 def get_sales_summary():
-    wb = openpyxl.load_workbook(FILES["sales"])
-    ws = wb.active
-    total_sales = 0
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        amount = row[3]
-        if isinstance(amount, (int, float)):
-            total_sales += amount
-    return total_sales
+    return _totals("sales")["total"]
 
 def get_accounting_summary():
-    wb = openpyxl.load_workbook(FILES["accounting"])
-    ws = wb.active
-    total_income = 0
-    total_expense = 0
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        trans_type = row[2]
-        amount = row[3]
-        if isinstance(amount, (int, float)):
-            if trans_type.lower() == "thu":
-                total_income += amount
-            elif trans_type.lower() == "chi":
-                total_expense += amount
-    return total_income, total_expense
+    totals = _totals("accounting")
+    return totals["income"], totals["expense"]
+
 def search_invoices(keyword="", start_date="", end_date=""):
-    wb = openpyxl.load_workbook(FILES["sales"])
-    ws = wb.active
-    results = []
-
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        invoice_id, date_str, customer, total = row
-        if keyword.lower() in str(customer).lower():
-            results.append(row)
-        elif start_date and end_date:
-            try:
-                from datetime import datetime
-                invoice_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-                end = datetime.strptime(end_date, "%Y-%m-%d")
-                if start <= invoice_date <= end:
-                    results.append(row)
-            except:
-                continue
-    return results
+    lower, upper = date_bounds(start_date, end_date)
+    return _matching("sales", keyword, lower, upper)
 
 def search_transactions(trans_type="", keyword="", start_date="", end_date=""):
-    wb = openpyxl.load_workbook(FILES["accounting"])
-    ws = wb.active
-    results = []
+    lower, upper = date_bounds(start_date, end_date)
+    rows = _matching("accounting", keyword, lower, upper)
+    if trans_type:
+        rows = [row for row in rows if str(row.type).lower() == trans_type.lower()]
+    return rows
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        trans_id, date_str, t_type, amount, desc = row
-        if trans_type and t_type.lower() != trans_type.lower():
-            continue
-        if keyword.lower() in str(desc).lower():
-            results.append(row)
-        elif start_date and end_date:
-            try:
-                from datetime import datetime
-                trans_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-                end = datetime.strptime(end_date, "%Y-%m-%d")
-                if start <= trans_date <= end:
-                    results.append(row)
-            except:
-                continue
-    return results
+# Phân trang theo keyset (pagination.py): trả về (các dòng của trang, cursor của trang sau hoặc None).
+# Mỗi phân vùng giữ sẵn thứ tự các dòng theo cột sắp xếp (_sorted) nên trang nào cũng chỉ bisect
+# tới cursor rồi lấy limit + 1 dòng, các phân vùng được ghép bằng heapq.merge. File quá lớn để
+# cache (CACHE_MAX_BYTES) không có thứ tự sẵn: mỗi trang đọc lại cả file đó dạng luồng.
+def page_products(limit=50, cursor=None, sort_by="id", descending=False, keyword=""):
+    return _page("warehouse", limit, cursor, sort_by, descending, keyword)
+
+def page_invoices(limit=50, cursor=None, sort_by="id", descending=False, keyword="", start_date="", end_date=""):
+    lower, upper = date_bounds(start_date, end_date)
+    return _page("sales", limit, cursor, sort_by, descending, keyword, lower, upper)
+
+def page_transactions(limit=50, cursor=None, sort_by="id", descending=False,
+                      trans_type="", keyword="", start_date="", end_date=""):
+    lower, upper = date_bounds(start_date, end_date)
+    return _page("accounting", limit, cursor, sort_by, descending, keyword, lower, upper, trans_type)
+
+def _page(key, limit, cursor, sort_by, descending, keyword="", lower=None, upper=None, trans_type=""):
+    pagination.validate(sort_by, RECORDS[key].FIELDS, limit)
+    runs = [_file_page(key, file, limit, cursor, sort_by, descending, keyword, lower, upper, trans_type)
+            for file in _files(key, lower, upper)]
+    return pagination.merge_page(runs, sort_by, limit, descending)
+
+def _file_page(key, file, limit, cursor, sort_by, descending, keyword, lower, upper, trans_type):
+    # limit + 1 dòng đầu tiên sau cursor của một file (phân vùng), theo thứ tự trang
+    keep = None
+    if trans_type:
+        trans_type = trans_type.lower()
+        keep = lambda row: str(row.type).lower() == trans_type
+    rows = _rows(key, file)
+    if rows is None:
+        matching = _scan(key, file, keyword, lower, upper)
+        return pagination.scan(matching if keep is None else filter(keep, matching), sort_by, limit, cursor, descending)
+    positions = _matching_positions(key, file, rows, keyword, lower, upper)
+    if positions is None:
+        ordered = _sorted(key, file, rows, sort_by)
+    elif len(positions) * 8 < len(rows):
+        # Ít dòng khớp: xếp riêng tập con rẻ hơn duyệt thứ tự của cả file
+        ordered = sorted((rows[i] for i in positions if rows[i].id is not None), key=pagination.sort_key(sort_by))
+    else:
+        ids = {rows[i].id for i in positions}
+        ordered = _sorted(key, file, rows, sort_by)
+        keep = (lambda row: row.id in ids) if keep is None else (lambda row, same_type=keep: row.id in ids and same_type(row))
+    return pagination.after(ordered, sort_by, limit, cursor, descending, keep)
 
 def init_user_file():
     file = "users.xlsx"
     if not os.path.exists(file):
+        import openpyxl
         wb = openpyxl.Workbook()
         ws = wb.active
         ws.append(["Username", "Password"])
         ws.append(["admin", "admin"])
-        wb.save(file)
\ No newline at end of file
+        wb.save(file)
+
+if BACKEND == "sqlite":
+    from sqlite_store import (
+        create_files, add_product, get_products, update_product, delete_product,
+        search_products, add_invoice, get_invoices, add_transaction, get_transactions,
+        iter_products, iter_invoices, iter_transactions,
+        get_inventory_summary, get_sales_summary, get_accounting_summary,
+        search_invoices, search_transactions, add_products_bulk, add_invoices_bulk,
+        add_transactions_bulk, batch, verify_summaries, page_products, page_invoices, page_transactions,
+    )
+
+# Đo hiệu năng (MISA_PROFILE=1): bọc các hàm công khai, kể cả khi dùng backend SQLite
+profiling.instrument(sys.modules[__name__], sources=(__name__, "sqlite_store"))
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Bảo trì file Excel của database.py")
+    parser.add_argument("--split", action="store_true",
+                        help="tách sales.xlsx/accounting.xlsx một sheet thành các phân vùng theo tháng")
+    args = parser.parse_args()
+    if not args.split:
+        parser.print_help()
+        return 1
+    for key in PARTITIONED:
+        print(f"{FILES[key]}: đã chuyển {split_partitions(key)} dòng sang phân vùng")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Sinh dữ liệu mẫu (kho, bán hàng, kế toán) từ 1 nghìn tới 1 triệu dòng.
+
+    python datagen.py --rows 100000 --format both --out du_lieu_mau
+
+--format xlsx: warehouse/sales/accounting.xlsx theo định dạng của database.py
+--format json: inventory/invoices/transactions.json theo định dạng của gui.Database
+--format sqlite: misa.db của sqlite_store
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+HO = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô", "Dương"]
+DEM = ["Văn", "Thị", "Hữu", "Đức", "Minh", "Ngọc", "Thanh", "Quốc", "Gia", "Hoài"]
+TEN = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hùng", "Khánh", "Lan", "Linh", "Long",
+       "Mai", "Nam", "Phúc", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Tuấn", "Việt", "Yến"]
+CONG_TY = ["Công ty TNHH {}", "Cửa hàng {}", "Đại lý {}", "Siêu thị {}", "Nhà sách {}"]
+SAN_PHAM = ["Bút bi", "Vở kẻ ngang", "Giấy A4", "Thước kẻ", "Bìa hồ sơ", "Mực in", "Băng keo", "Kéo",
+            "Ghim bấm", "Máy tính bỏ túi", "Sổ tay", "Bút dạ quang", "Hộp bút", "Balo", "Đèn bàn"]
+NHA_CUNG_CAP = ["Thiên Long", "Hồng Hà", "Double A", "Deli", "Casio", "Campus", "Plus"]
+THU = ["Thu tiền bán hàng", "Khách trả nợ", "Thu tiền đặt cọc", "Lãi tiền gửi"]
+CHI = ["Chi nhập hàng", "Trả lương nhân viên", "Tiền điện", "Tiền thuê mặt bằng", "Chi vận chuyển",
+       "Mua văn phòng phẩm"]
+
+def _customers(rng, count):
+    names = set()
+    while len(names) < count:
+        person = f"{rng.choice(HO)} {rng.choice(DEM)} {rng.choice(TEN)}"
+        names.add(rng.choice(CONG_TY).format(person) if rng.random() < 0.2 else person)
+    return sorted(names)
+
+def _dates(rng, count, years):
+    # Ngày tăng dần, trải đều trên `years` năm gần nhất, như dữ liệu nhập hằng ngày
+    end = datetime(2025, 12, 31, 21, 0)
+    start = end - timedelta(days=365 * years)
+    step = (end - start).total_seconds() / max(count, 1)
+    for i in range(count):
+        moment = start + timedelta(seconds=i * step + rng.random() * step)
+        yield moment.strftime("%Y-%m-%d %H:%M")
+
+def products(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"{rng.choice(SAN_PHAM)} {rng.choice(NHA_CUNG_CAP)} #{i + 1}"
+        yield {"name": name, "quantity": rng.randint(0, 500),
+               "price": rng.randrange(5000, 2000000, 500), "supplier": rng.choice(NHA_CUNG_CAP)}
+
+def invoices(count, seed=0, years=3):
+    rng = random.Random(seed + 1)
+    customers = _customers(rng, max(10, min(count // 20, 5000)))
+    # Một số khách hàng mua nhiều hơn hẳn (phân bố lệch như thực tế)
+    weights = [1 / (rank + 1) for rank in range(len(customers))]
+    picks = rng.choices(customers, weights, k=count)
+    for date, customer in zip(_dates(rng, count, years), picks):
+        yield {"date": date, "customer": customer,
+               "total": float(round(rng.lognormvariate(13, 1), -3))}
+
+def transactions(count, seed=0, years=3):
+    rng = random.Random(seed + 2)
+    for date in _dates(rng, count, years):
+        if rng.random() < 0.55:
+            yield {"date": date, "type": "Thu", "amount": float(round(rng.lognormvariate(13.5, 1), -3)),
+                   "description": rng.choice(THU)}
+        else:
+            yield {"date": date, "type": "Chi", "amount": float(round(rng.lognormvariate(13, 1), -3)),
+                   "description": rng.choice(CHI)}
+
+def sizes(rows):
+    """Số dòng của từng bảng: kho nhỏ hơn nhiều so với hóa đơn và giao dịch"""
+    return {"products": max(10, rows // 100), "invoices": rows, "transactions": rows}
+
+def write_xlsx(folder, rows, seed=0):
+    import openpyxl
+    counts = sizes(rows)
+    tables = [
+        ("warehouse.xlsx", ["ID", "Product Name", "Quantity", "Unit Price", "Supplier"],
+         ((p["name"], p["quantity"], p["price"], p["supplier"]) for p in products(counts["products"], seed))),
+        ("sales.xlsx", ["Invoice ID", "Date", "Customer", "Total"],
+         ((inv["date"], inv["customer"], inv["total"]) for inv in invoices(counts["invoices"], seed))),
+        ("accounting.xlsx", ["Transaction ID", "Date", "Type", "Amount", "Description"],
+         ((t["date"], t["type"], t["amount"], t["description"]) for t in transactions(counts["transactions"], seed))),
+    ]
+    for filename, header, records in tables:
+        # write_only ghi thẳng ra file, không giữ cả sheet trong bộ nhớ
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(header)
+        for record_id, record in enumerate(records, start=1):
+            ws.append((record_id,) + record)
+        wb.save(os.path.join(folder, filename))
+
+def _dump(path, records):
+    # Ghi từng bản ghi để không dựng cả danh sách 1 triệu dict trong bộ nhớ
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for record_id, record in enumerate(records, start=1):
+            if record_id > 1:
+                f.write(",\n")
+            f.write(json.dumps(dict(id=record_id, **record), ensure_ascii=False))
+        f.write("]")
+
+def write_json(folder, rows, seed=0):
+    counts = sizes(rows)
+    _dump(os.path.join(folder, "inventory.json"),
+          ({"name": p["name"], "quantity": p["quantity"], "price": p["price"]}
+           for p in products(counts["products"], seed)))
+    _dump(os.path.join(folder, "invoices.json"), invoices(counts["invoices"], seed))
+    _dump(os.path.join(folder, "transactions.json"), transactions(counts["transactions"], seed))
+
+def write_sqlite(folder, rows, seed=0, chunk=50000):
+    from sqlite_store import SqliteDatabase, close
+    counts = sizes(rows)
+    db_file = os.path.join(folder, "misa.db")
+    db = SqliteDatabase(db_file)
+    for bulk, records in ((db.add_products_bulk, products(counts["products"], seed)),
+                          (db.add_invoices_bulk, invoices(counts["invoices"], seed)),
+                          (db.add_transactions_bulk, transactions(counts["transactions"], seed))):
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= chunk:
+                bulk(batch)
+                batch = []
+        bulk(batch)
+    close(db_file)
+
+WRITERS = {"xlsx": write_xlsx, "json": write_json, "sqlite": write_sqlite}
+
+def generate(folder, rows, formats=("xlsx", "json"), seed=0):
+    os.makedirs(folder, exist_ok=True)
+    for name in formats:
+        WRITERS[name](folder, rows, seed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="số hóa đơn và số giao dịch")
+    parser.add_argument("--format", choices=("xlsx", "json", "sqlite", "both", "all"), default="both")
+    parser.add_argument("--out", default="du_lieu_mau")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    formats = {"both": ("xlsx", "json"), "all": ("xlsx", "json", "sqlite")}.get(args.format, (args.format,))
+    generate(args.out, args.rows, formats, args.seed)
+    print(f"Đã sinh {args.rows} dòng ({', '.join(formats)}) vào {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
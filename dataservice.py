@@ -0,0 +1,352 @@
+"""Dịch vụ dữ liệu chạy nền: một tiến trình giữ dữ liệu trong bộ nhớ, các máy bán hàng kết nối tới.
+
+    python dataservice.py --port 8765 --data thu_muc_du_lieu
+    MISA_BACKEND=service MISA_SERVICE=127.0.0.1:8765 python main.py
+
+Chỉ nghe trên localhost (không có xác thực nên địa chỉ khác bị từ chối). Giao thức: mỗi dòng một mảng JSON.
+    yêu cầu:  [số thứ tự, tên thao tác, [tham số], {tham số tên}]
+    trả lời:  [số thứ tự, 0, kết quả] hoặc [số thứ tự, 1, [tên lỗi, nội dung]]
+    sự kiện:  [0, 2, {table, kind, records, old}] gửi tới kết nối đã "subscribe"
+Máy khách gửi tiếp yêu cầu mà không chờ trả lời (pipelining); các yêu cầu của cùng một kết nối
+được xử lý và trả lời theo đúng thứ tự gửi.
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from events import ChangeBus
+import profiling
+from records import to_json
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+OK, ERROR, EVENT = 0, 1, 2
+
+# Thao tác của gui.Database được gọi thẳng qua kết nối
+REMOTE = (
+    "create_files", "get_invoices", "search_invoices", "add_invoices_bulk",
+    "get_transactions", "search_transactions", "add_transactions_bulk",
+    "get_products", "search_products", "add_products_bulk", "update_product", "delete_product",
+    "query_invoices", "query_transactions", "page_invoices", "page_transactions", "page_products",
+    "get_inventory_summary", "get_sales_summary", "get_accounting_summary",
+    "verify_summaries", "cache_stats",
+)
+COLUMNS = ("sales_columns", "accounting_columns")
+
+# Một yêu cầu add_*_bulk lớn nằm trên một dòng
+LINE_LIMIT = 256 * 1024 * 1024
+
+def _encode(message):
+    # Bản ghi (records.py) được gửi đi dưới dạng object JSON như dict trước đây
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":"), default=to_json) + "\n").encode("utf-8")
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def is_loopback(host):
+    """True nếu mọi địa chỉ của host đều là loopback (127.0.0.0/8, ::1)"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split("%")[0]).is_loopback
+                                   for address in addresses)
+
+class RemoteError(Exception):
+    """Lỗi xảy ra trong dịch vụ khi thực hiện thao tác; kind là tên lớp lỗi gốc"""
+
+    def __init__(self, kind, message):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+
+class DataService:
+    """Giữ một gui.Database và phục vụ các kết nối; thao tác chạy trên thread pool để không chặn vòng lặp"""
+
+    def __init__(self, db, workers=4):
+        self.db = db
+        self.requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="misa-service")
+        self._subscribers = set()
+        self._loop = None
+        db.events.subscribe(self._on_change)
+
+    async def start(self, host="127.0.0.1", port=8765):
+        if not is_loopback(host):
+            raise ValueError(f"Dịch vụ dữ liệu chỉ nghe trên localhost, không nhận {host}")
+        self._loop = asyncio.get_running_loop()
+        return await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+
+    def _run(self, request_id, method, args, kwargs):
+        # Chạy trên thread pool: cả việc mã hóa JSON kết quả lớn cũng không chặn vòng lặp
+        try:
+            result = getattr(self.db, method)(*args, **kwargs)
+            if method in COLUMNS:
+                result = {"minutes": result.minutes.tolist(), "amounts": result.amounts.tolist(),
+                          "codes": result.codes.tolist(), "labels": result.labels}
+            return _encode([request_id, OK, result])
+        except Exception as error:
+            return _encode([request_id, ERROR, [type(error).__name__, str(error)]])
+
+    async def _handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request_id, method, args, kwargs = json.loads(line)
+                except ValueError:
+                    writer.write(_encode([0, ERROR, ["ValueError", "Yêu cầu không hợp lệ"]]))
+                    continue
+                self.requests += 1
+                if method == "subscribe":
+                    self._subscribers.add(writer)
+                    response = _encode([request_id, OK, None])
+                elif method in REMOTE or method in COLUMNS:
+                    response = await self._loop.run_in_executor(
+                        self._executor, partial(self._run, request_id, method, args, kwargs))
+                else:
+                    response = _encode([request_id, ERROR, ["AttributeError", f"Không có thao tác {method}"]])
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # ValueError: dòng dài quá LINE_LIMIT
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            writer.close()
+
+    def _on_change(self, event):
+        # Gọi trên luồng đang ghi; sự kiện được gửi trước câu trả lời của lệnh ghi đó
+        if not self._subscribers or self._loop is None:
+            return
+        message = _encode([0, EVENT, {"table": event.table, "kind": event.kind,
+                                      "records": event.records, "old": event.old}])
+        self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _broadcast(self, message):
+        for writer in list(self._subscribers):
+            if writer.is_closing():
+                self._subscribers.discard(writer)
+            else:
+                writer.write(message)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+class DatabaseClient:
+    """Dùng thay gui.Database khi dữ liệu nằm trong dataservice (MISA_BACKEND=service).
+
+    Giữ một kết nối TCP tới dịch vụ, tự kết nối lại sau khi mất kết nối. call_async gửi yêu cầu
+    và trả về Future ngay, nên có thể gửi nhiều lệnh liền rồi mới đợi kết quả.
+    Sự kiện thay đổi do máy khác ghi cũng được phát qua self.events.
+    """
+
+    def __init__(self, address=None, subscribe=True, timeout=10.0):
+        self.address = parse_address(address or os.environ.get("MISA_SERVICE", DEFAULT_ADDRESS))
+        self.subscribe = subscribe
+        self.timeout = timeout
+        self.events = ChangeBus()
+        self._batch = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._next_id = 0
+        self._sock = None
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        threading.Thread(target=self._read, args=(sock,), daemon=True, name="misa-client").start()
+        if self.subscribe:
+            self._send(sock, [self._register()[0], "subscribe", (), {}])
+
+    def _register(self):
+        # Gọi khi đang giữ self._lock
+        self._next_id += 1
+        future = self._pending[self._next_id] = Future()
+        return self._next_id, future
+
+    def _send(self, sock, message):
+        # Không giữ self._lock khi gửi: sendall có thể chờ dịch vụ, dịch vụ chờ luồng đọc nhận câu trả lời
+        with self._send_lock:
+            sock.sendall(_encode(message))
+
+    def call_async(self, method, *args, **kwargs):
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            sock = self._sock
+            request_id, future = self._register()
+        try:
+            self._send(sock, [request_id, method, args, kwargs])
+            return future
+        except OSError:
+            pass
+        # Câu trả lời không bao giờ tới: báo lỗi cho mọi lệnh đang chờ của kết nối này
+        self._disconnected(sock)
+        raise ConnectionError(f"Mất kết nối tới dịch vụ dữ liệu {self.address[0]}:{self.address[1]}")
+
+    def call(self, method, *args, **kwargs):
+        return self.call_async(method, *args, **kwargs).result()
+
+    def _read(self, sock):
+        try:
+            with sock.makefile("rb") as f:
+                for line in f:
+                    request_id, status, payload = json.loads(line)
+                    if status == EVENT:
+                        self.events.publish(payload["table"], payload["kind"], payload["records"], payload["old"])
+                        continue
+                    with self._lock:
+                        future = self._pending.pop(request_id, None)
+                    if future is None:
+                        continue
+                    if status == OK:
+                        future.set_result(payload)
+                    else:
+                        future.set_exception(RemoteError(*payload))
+        except (OSError, ValueError):
+            pass
+        self._disconnected(sock)
+
+    def _disconnected(self, sock):
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            pending, self._pending = self._pending, {}
+        sock.close()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Mất kết nối tới dịch vụ dữ liệu"))
+
+    def close(self):
+        with self._lock:
+            sock = self._sock
+        if sock is not None:
+            self._disconnected(sock)
+
+    # Thêm từng dòng: gom theo batch() như gui.Database
+    def _add(self, bulk, record):
+        if self._batch is not None:
+            self._batch.setdefault(bulk, []).append(record)
+            return None
+        return bulk([record])[0]
+
+    @contextmanager
+    def batch(self):
+        if self._batch is not None:
+            yield
+            return
+        self._batch = {}
+        try:
+            yield
+            pending = self._batch
+        finally:
+            self._batch = None
+        for bulk, records in pending.items():
+            bulk(records)
+
+    def add_invoice(self, customer, total):
+        self._add(self.add_invoices_bulk, {"customer": customer, "total": total})
+
+    def add_transaction(self, t_type, amount, description):
+        self._add(self.add_transactions_bulk, {"type": t_type, "amount": amount, "description": description})
+
+    def add_product(self, name, quantity, price):
+        return self._add(self.add_products_bulk, {"name": name, "quantity": quantity, "price": price})
+
+    # Xuất theo luồng: lấy từng trang theo id thay vì nhận cả bảng trong một câu trả lời
+    def stream_invoices(self, keyword="", start_date="", end_date=""):
+        return self._stream("query_invoices", {"keyword": keyword, "start_date": start_date, "end_date": end_date})
+
+    def stream_transactions(self, t_type="", keyword="", start_date="", end_date=""):
+        return self._stream("query_transactions", {"t_type": t_type, "keyword": keyword,
+                                                   "start_date": start_date, "end_date": end_date})
+
+    def _stream(self, method, filters, page=5000):
+        total, first = self.call(method, 0, page, "id", False, **filters)
+
+        def rows():
+            offset, rows = 0, first
+            while rows:
+                yield from map(tuple, rows)
+                offset += len(rows)
+                if offset >= total:
+                    return
+                rows = self.call(method, offset, page, "id", False, **filters)[1]
+        return total, rows()
+
+    def sales_columns(self):
+        return self._columns("sales_columns")
+
+    def accounting_columns(self):
+        return self._columns("accounting_columns")
+
+    def _columns(self, method):
+        import numpy as np
+        from analytics import Columns
+        data = self.call(method)
+        return Columns(np.array(data["minutes"], dtype=np.int64), np.array(data["amounts"], dtype=np.float64),
+                       np.array(data["codes"], dtype=np.int32), data["labels"])
+
+def _remote(name):
+    def call(self, *args, **kwargs):
+        return self.call(name, *args, **kwargs)
+    call.__name__ = call.__qualname__ = name
+    return call
+
+for _name in REMOTE:
+    setattr(DatabaseClient, _name, _remote(_name))
+
+profiling.instrument(DatabaseClient)
+
+async def serve(db, host, port, workers=4, ready=None):
+    service = DataService(db, workers)
+    server = await service.start(host, port)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[:2])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="mặc định chỉ nhận kết nối từ chính máy này")
+    parser.add_argument("--port", type=int, default=8765, help="0: chọn cổng trống")
+    parser.add_argument("--data", default=".", help="thư mục dữ liệu")
+    parser.add_argument("--binary", action="store_true", help="giao dịch lưu trong transactions.bin")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    if not is_loopback(args.host):
+        parser.error(f"--host phải là địa chỉ loopback (127.0.0.1, ::1, localhost), không phải {args.host}")
+
+    os.chdir(args.data)
+    from gui import Database
+    db = Database(journal=True, binary=args.binary)
+    db.create_files()
+    ready = lambda address: print(f"Đang phục vụ tại {address[0]}:{address[1]}", flush=True)
+    try:
+        asyncio.run(serve(db, args.host, args.port, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
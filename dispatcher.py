@@ -0,0 +1,99 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+class Dispatcher:
+    """Chạy các lệnh đọc/ghi dữ liệu trên luồng nền, trả kết quả về luồng Tk qua root.after.
+
+    - Lệnh đọc chạy song song trên một thread pool.
+    - Lệnh ghi chạy trên một luồng duy nhất nên luôn theo đúng thứ tự gửi.
+    - Lệnh đọc có key: lệnh mới hủy lệnh cũ cùng key, kết quả cũ bị bỏ qua.
+    """
+
+    def __init__(self, root, workers=4, poll_ms=30, on_busy=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self._readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="misa-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="misa-write")
+        self._results = queue.Queue()
+        self._calls = queue.Queue()
+        self._latest = {}
+        self._pending = 0
+        self._closed = False
+        self._poll()
+
+    def read(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        return self._submit(self._readers, fn, args, kwargs, on_done, on_error, key)
+
+    def write(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        return self._submit(self._writer, fn, args, kwargs, on_done, on_error, None)
+
+    def post(self, fn, *args):
+        """Gọi fn(*args) trên luồng Tk; gọi được từ bất kỳ luồng nào (vd. callback sự kiện thay đổi)"""
+        self._calls.put((fn, args))
+
+    def pending(self, key):
+        """Còn lệnh đọc với key này chưa trả kết quả"""
+        return key in self._latest
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def _submit(self, executor, fn, args, kwargs, on_done, on_error, key):
+        token = object()
+        if key is not None and key in self._latest:
+            # Lệnh cũ chưa chạy thì hủy luôn, đang chạy thì bỏ kết quả khi xong
+            self._latest[key][1].cancel()
+        future = executor.submit(fn, *args, **kwargs)
+        if key is not None:
+            self._latest[key] = (token, future)
+        self._set_pending(self._pending + 1)
+        future.add_done_callback(lambda f: self._results.put((f, token, key, on_done, on_error)))
+        return future
+
+    def _set_pending(self, pending):
+        was_busy = self.busy
+        self._pending = pending
+        if self.on_busy is not None and was_busy != self.busy:
+            self.on_busy(self.busy)
+
+    def _poll(self):
+        while True:
+            try:
+                fn, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as error:
+                self.root.report_callback_exception(type(error), error, error.__traceback__)
+        while True:
+            try:
+                future, token, key, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._set_pending(self._pending - 1)
+            if key is not None:
+                latest = self._latest.get(key)
+                if latest is None or latest[0] is not token:
+                    continue
+                del self._latest[key]
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    self.root.report_callback_exception(type(error), error, error.__traceback__)
+            elif on_done is not None:
+                on_done(future.result())
+        if not self._closed:
+            self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        """Bỏ các lệnh đọc đang chờ, đợi các lệnh ghi đã gửi chạy xong"""
+        self._closed = True
+        self._readers.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(wait=True)
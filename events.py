@@ -0,0 +1,58 @@
+import threading
+import traceback
+
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+
+class ChangeEvent:
+    """Một lần ghi vào bảng: kind là INSERTED/UPDATED/DELETED, records là các bản ghi (records.py) sau khi ghi
+    (với DELETED là bản ghi vừa xóa), old là các bản ghi trước khi sửa (chỉ với UPDATED)."""
+
+    __slots__ = ("table", "kind", "records", "old")
+
+    def __init__(self, table, kind, records, old=None):
+        self.table = table
+        self.kind = kind
+        self.records = records
+        self.old = old
+
+    def __repr__(self):
+        return f"ChangeEvent({self.table!r}, {self.kind!r}, {len(self.records)} bản ghi)"
+
+class ChangeBus:
+    """Nơi lớp lưu trữ phát sự kiện thay đổi và giao diện đăng ký nhận.
+
+    Callback được gọi ngay trên luồng vừa ghi (thường là luồng ghi của dispatcher), nên phải
+    làm rất ít việc; giao diện chuyển tiếp sang luồng Tk bằng Dispatcher.post.
+    Chỉ thấy các lần ghi của tiến trình này, không thấy máy khác ghi vào file dùng chung.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback, table=None):
+        """Đăng ký callback(event) cho một bảng (hoặc mọi bảng khi table là None); trả về hàm hủy đăng ký"""
+        entry = (table, callback)
+        with self._lock:
+            self._subscribers = self._subscribers + [entry]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [item for item in self._subscribers if item is not entry]
+        return unsubscribe
+
+    def publish(self, table, kind, records, old=None):
+        records = list(records)
+        if not records:
+            return
+        event = ChangeEvent(table, kind, records, old)
+        # Danh sách được thay mới khi đăng ký nên duyệt không cần giữ khóa
+        for wanted, callback in self._subscribers:
+            if wanted is None or wanted == table:
+                try:
+                    callback(event)
+                except Exception:
+                    # Lỗi ở nơi nhận không được làm hỏng lần ghi đã xong
+                    traceback.print_exc()
@@ -0,0 +1,109 @@
+"""Xuất hóa đơn / giao dịch ra xlsx hoặc CSV theo luồng, không giữ cả bảng trong bộ nhớ.
+
+    python export.py transactions so_cai_2024.xlsx --from 2024-01-01 --to 2024-12-31 --type Chi
+    python export.py invoices hoa_don.csv --keyword "nguyen"
+
+Dòng được lấy từ stream_invoices/stream_transactions của database (gui.Database, SqliteDatabase)
+và ghi từng khối CHUNK dòng: xlsx dùng workbook write_only của openpyxl, CSV ghi UTF-8 có BOM
+để Excel đọc đúng tiếng Việt.
+"""
+import argparse
+import csv
+import os
+import sys
+from itertools import islice
+from locking import atomic_write, replace, temp_path
+
+CHUNK = 5000
+# Excel giới hạn 1.048.576 dòng mỗi sheet (kể cả dòng tiêu đề)
+SHEET_ROWS = 1048575
+
+HEADERS = {
+    "invoices": ["ID", "Ngày", "Khách hàng", "Tổng tiền"],
+    "transactions": ["ID", "Ngày", "Loại", "Số tiền", "Mô tả"],
+}
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_csv(path, header, rows, total=None, progress=None, chunk=CHUNK):
+    done = 0
+    with atomic_write(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for block in _chunks(rows, chunk):
+            writer.writerows(block)
+            done += len(block)
+            if progress is not None:
+                progress(done, total)
+    return done
+
+def write_xlsx(path, header, rows, total=None, progress=None, chunk=CHUNK):
+    import openpyxl
+    # write_only ghi dòng ra file tạm ngay khi append, bộ nhớ không tăng theo số dòng
+    wb = openpyxl.Workbook(write_only=True)
+    ws = None
+    done = 0
+    for block in _chunks(rows, chunk):
+        for row in block:
+            if ws is None or done % SHEET_ROWS == 0:
+                ws = wb.create_sheet(f"Trang {done // SHEET_ROWS + 1}")
+                ws.append(header)
+            ws.append(row)
+            done += 1
+        if progress is not None:
+            progress(done, total)
+    if ws is None:
+        wb.create_sheet("Trang 1").append(header)
+    tmp = temp_path(path)
+    try:
+        wb.save(tmp)
+        replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return done
+
+def export(db, kind, path, filters=None, progress=None, chunk=CHUNK):
+    """Xuất kind ("invoices" hoặc "transactions") theo bộ lọc như query_*; trả về số dòng đã ghi.
+
+    progress(số dòng đã ghi, tổng số dòng) được gọi sau mỗi khối, trên luồng đang xuất.
+    """
+    filters = filters or {}
+    if kind == "invoices":
+        total, rows = db.stream_invoices(**filters)
+    elif kind == "transactions":
+        total, rows = db.stream_transactions(**filters)
+    else:
+        raise ValueError(f"Không xuất được {kind}")
+    writer = write_xlsx if path.lower().endswith(".xlsx") else write_csv
+    if progress is not None:
+        progress(0, total)
+    return writer(path, HEADERS[kind], rows, total, progress, chunk)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(HEADERS))
+    parser.add_argument("path", help="file .xlsx hoặc .csv")
+    parser.add_argument("--from", dest="start_date", default="")
+    parser.add_argument("--to", dest="end_date", default="")
+    parser.add_argument("--keyword", default="")
+    parser.add_argument("--type", dest="t_type", default="", help="Thu/Chi (chỉ với transactions)")
+    args = parser.parse_args()
+
+    from gui import database
+    filters = {"keyword": args.keyword, "start_date": args.start_date, "end_date": args.end_date}
+    if args.kind == "transactions":
+        filters["t_type"] = args.t_type
+    count = export(database, args.kind, args.path, filters,
+                   progress=lambda done, total: print(f"\r{done:,}/{total:,} dòng", end="", flush=True))
+    print(f"\nĐã xuất {count:,} dòng vào {args.path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,135 +1,769 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from tkinter.font import Font
 import json
 import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
 from datetime import datetime
+from aggregates import open_aggregates, drift
+from binstore import BinaryTable
+from events import ChangeBus, DELETED, INSERTED, UPDATED
+from indexes import DateIndex, NgramIndex, date_bounds, fold
+from locking import LockTimeout, atomic_write, file_lock, replace, retry, temp_path
+from paged_treeview import PagedTreeview
+import pagination
+from querycache import QueryCache
+from records import Invoice, Product, Transaction, to_json
+import export
+import profiling
+from sequences import open_sequences
+from dispatcher import Dispatcher
 
 # Module database
 class Database:
-    def __init__(self):
+    # Tombstone sản phẩm được dọn khi chiếm quá tỉ lệ này (và ít nhất COMPACT_MIN_TOMBSTONES dòng)
+    COMPACT_RATIO = 0.25
+    COMPACT_MIN_TOMBSTONES = 100
+    
+    def __init__(self, journal=False, compact_threshold=1024 * 1024, binary=False):
         self.invoices_file = "invoices.json"
         self.transactions_file = "transactions.json"
         self.inventory_file = "inventory.json"
+        # Chế độ journal: mỗi lần ghi chỉ nối thêm một dòng JSONL
+        self.journal = journal
+        # Chế độ nhị phân: giao dịch nằm trong transactions.bin (binstore), đọc qua mmap
+        self.binary = BinaryTable("transactions.bin") if binary else None
+        if self.binary is not None:
+            self.transactions_file = self.binary.path
+        # Mỗi dòng là một bản ghi __slots__ (records.py) thay cho dict
+        self._record_types = {self.invoices_file: Invoice, "transactions.json": Transaction,
+                              self.transactions_file: Transaction, self.inventory_file: Product}
+        self.compact_threshold = compact_threshold
+        self._tables = {}
+        self._compacting = set()
+        self._lock = threading.RLock()
+        self._batch = None
+        self._aggregates = open_aggregates()
+        self._sequences = open_sequences()
+        self._cache = QueryCache()
+        # Sự kiện thay đổi (products/invoices/transactions) cho giao diện cập nhật từng dòng
+        self.events = ChangeBus()
         
     def create_files(self):
         """Tạo file JSON nếu chưa tồn tại"""
         for file in [self.invoices_file, self.transactions_file, self.inventory_file]:
             if not os.path.exists(file):
-                with open(file, 'w') as f:
-                    json.dump([], f)
+                with file_lock(file):
+                    if self._is_binary(file) and not os.path.exists(file):
+                        # Lần đầu dùng bảng nhị phân: chuyển giao dịch JSON (kể cả journal) sang
+                        self.binary.create(self._replay("transactions.json"))
+                    elif not os.path.exists(file):
+                        self._write_data(file, [])
+    
+    # Ghi hàng loạt: trong khối batch() các lệnh add_* được gom lại và lưu một lần
+    @contextmanager
+    def batch(self):
+        with self._lock:
+            if self._batch is not None:
+                yield
+                return
+            self._batch = {}
+            try:
+                yield
+                pending = self._batch
+            finally:
+                self._batch = None
+            for bulk, records in pending.items():
+                bulk(records)
+    
+    def _add(self, bulk, record):
+        with self._lock:
+            if self._batch is not None:
+                # ID chỉ được cấp khi cả lô được lưu
+                self._batch.setdefault(bulk, []).append(record)
+                return None
+            return bulk([record])[0]
     
     # Các hàm xử lý hóa đơn
     def add_invoice(self, customer, total):
-        invoices = self._read_data(self.invoices_file)
-        invoice_id = len(invoices) + 1
-        new_invoice = {
-            "id": invoice_id,
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "customer": customer,
-            "total": total
-        }
-        invoices.append(new_invoice)
-        self._write_data(self.invoices_file, invoices)
+        self._add(self.add_invoices_bulk, {"customer": customer, "total": total})
+    
+    def add_invoices_bulk(self, records):
+        with self._locked(self.invoices_file):
+            invoices = self._load_rows(self.invoices_file)
+            before = self._signature(self.invoices_file)
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            first_id = self._next_id(self.invoices_file, len(records))
+            new_invoices = [Invoice(first_id + i, record.get("date") or now, record["customer"], record["total"])
+                            for i, record in enumerate(records)]
+            self._append_rows(self.invoices_file, invoices, new_invoices)
+            self._written(self.invoices_file, before, added=new_invoices)
+            return [inv.id for inv in new_invoices]
     
     def get_invoices(self):
-        return self._read_data(self.invoices_file)
+        return list(self._load_rows(self.invoices_file))
     
     def search_invoices(self, keyword="", start_date="", end_date=""):
-        invoices = self.get_invoices()
-        results = []
+        lower, upper = date_bounds(start_date, end_date)
         
-        for inv in invoices:
-            # Kiểm tra keyword
-            keyword_match = not keyword or keyword.lower() in inv["customer"].lower()
-            
-            # Kiểm tra ngày
-            date_match = True
-            if start_date:
-                date_match &= inv["date"] >= start_date
-            if end_date:
-                date_match &= inv["date"] <= end_date + " 23:59:59"
-            
-            if keyword_match and date_match:
-                results.append((inv["id"], inv["date"], inv["customer"], inv["total"]))
+        def search():
+            invoices = self._matching(self.invoices_file, keyword, lower, upper)
+            return [(inv.id, inv.date, inv.customer, inv.total) for inv in invoices]
         
-        return results
+        return list(self._cached(self.invoices_file, ("search", fold(keyword), lower, upper), search))
     
     # Các hàm xử lý giao dịch
     def add_transaction(self, t_type, amount, description):
-        transactions = self._read_data(self.transactions_file)
-        trans_id = len(transactions) + 1
-        new_trans = {
-            "id": trans_id,
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "type": t_type,
-            "amount": amount,
-            "description": description
-        }
-        transactions.append(new_trans)
-        self._write_data(self.transactions_file, transactions)
+        self._add(self.add_transactions_bulk, {"type": t_type, "amount": amount, "description": description})
+    
+    def add_transactions_bulk(self, records):
+        with self._locked(self.transactions_file):
+            # Bảng nhị phân ghi thẳng xuống file, không cần nạp các dòng cũ
+            transactions = None if self.binary is not None else self._load_rows(self.transactions_file)
+            before = self._signature(self.transactions_file)
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            first_id = self._next_id(self.transactions_file, len(records))
+            new_transactions = [Transaction(first_id + i, record.get("date") or now, record["type"],
+                                            record["amount"], record["description"])
+                                for i, record in enumerate(records)]
+            self._append_rows(self.transactions_file, transactions, new_transactions)
+            self._written(self.transactions_file, before, added=new_transactions)
+            return [trans.id for trans in new_transactions]
     
     def get_transactions(self):
-        return self._read_data(self.transactions_file)
+        if self.binary is not None:
+            return self.binary.records()
+        return list(self._load_rows(self.transactions_file))
     
     def search_transactions(self, t_type="", keyword="", start_date="", end_date=""):
-        transactions = self.get_transactions()
+        lower, upper = date_bounds(start_date, end_date)
+        t_type = t_type.lower()
+        key = ("search", t_type, fold(keyword), lower, upper)
+        return list(self._cached(self.transactions_file, key,
+                                 lambda: self._search_transactions(t_type, keyword, lower, upper)))
+    
+    def _search_transactions(self, t_type, keyword, lower, upper):
+        if self.binary is not None:
+            return self.binary.search(t_type, keyword, lower, upper)
         results = []
         
-        for trans in transactions:
+        for trans in self._matching(self.transactions_file, keyword, lower, upper):
             # Kiểm tra loại giao dịch
-            type_match = not t_type or trans["type"].lower() == t_type.lower()
-            
-            # Kiểm tra keyword
-            keyword_match = not keyword or keyword.lower() in trans["description"].lower()
-            
-            # Kiểm tra ngày
-            date_match = True
-            if start_date:
-                date_match &= trans["date"] >= start_date
-            if end_date:
-                date_match &= trans["date"] <= end_date + " 23:59:59"
-            
-            if type_match and keyword_match and date_match:
+            if not t_type or trans.type.lower() == t_type:
                 results.append((
-                    trans["id"], 
-                    trans["date"], 
-                    trans["type"], 
-                    trans["amount"], 
-                    trans["description"]
+                    trans.id, 
+                    trans.date, 
+                    trans.type, 
+                    trans.amount, 
+                    trans.description
                 ))
         
         return results
     
-    # Các hàm thống kê
+    # Các hàm xử lý sản phẩm
+    def get_products(self):
+        return [p for p in self._load_rows(self.inventory_file) if not p.deleted]
+    
+    def add_product(self, name, quantity, price):
+        return self._add(self.add_products_bulk, {"name": name, "quantity": quantity, "price": price})
+    
+    def add_products_bulk(self, records):
+        with self._locked(self.inventory_file):
+            products = self._load_rows(self.inventory_file)
+            before = self._signature(self.inventory_file)
+            new_id = self._next_id(self.inventory_file, len(records))
+            new_products = [Product(new_id + i, record["name"], record["quantity"], record["price"])
+                            for i, record in enumerate(records)]
+            if new_products:
+                self._append_rows(self.inventory_file, products, new_products)
+                self._written(self.inventory_file, before, added=new_products)
+            return [p.id for p in new_products]
+    
+    def update_product(self, product_id, name=None, quantity=None, price=None):
+        with self._locked(self.inventory_file):
+            products = self._load_rows(self.inventory_file)
+            before = self._signature(self.inventory_file)
+            position = self._id_index(self.inventory_file).get(product_id)
+            if position is None:
+                return False
+            old = products[position]
+            product = old.copy()
+            if name is not None:
+                product.name = name
+            if quantity is not None:
+                product.quantity = quantity
+            if price is not None:
+                product.price = price
+            self._replace_row(products, position, product)
+            self._written(self.inventory_file, before, updated=(position, old, product))
+            return True
+    
+    def delete_product(self, product_id):
+        with self._locked(self.inventory_file):
+            products = self._load_rows(self.inventory_file)
+            before = self._signature(self.inventory_file)
+            position = self._id_index(self.inventory_file).get(product_id)
+            if position is None:
+                return False
+            # Tombstone giữ nguyên vị trí các sản phẩm khác; compact() dọn sau
+            old = products[position]
+            self._replace_row(products, position, Product.tombstone(product_id))
+            self._written(self.inventory_file, before, updated=(position, old, products[position]))
+            table = self._tables.get(self.inventory_file)
+            if table is not None and table["id_index"] is not None:
+                tombstones = len(products) - len(table["id_index"])
+                if tombstones >= self.COMPACT_MIN_TOMBSTONES and tombstones > self.COMPACT_RATIO * len(products):
+                    self.compact(self.inventory_file)
+            return True
+    
+    def _replace_row(self, products, position, product):
+        # Ghi bản sao danh sách; chỉ thay vào danh sách đã cache khi ghi xong, ghi lỗi thì cache vẫn khớp file
+        rows = list(products)
+        rows[position] = product
+        self._write_data(self.inventory_file, rows)
+        products[position] = product
+    
+    def search_products(self, keyword=""):
+        return list(self._cached(self.inventory_file, ("search", fold(keyword)),
+                                 lambda: self._matching(self.inventory_file, keyword)))
+    
+    # Truy vấn theo trang cho Treeview: trả về (tổng số dòng, các dòng của trang)
+    def query_invoices(self, offset=0, limit=100, sort_by="id", descending=False,
+                       keyword="", start_date="", end_date=""):
+        invoices = self._sorted_query(self.invoices_file, sort_by, descending, keyword, start_date, end_date)
+        page = invoices[offset:offset + limit]
+        return len(invoices), [(inv.id, inv.date, inv.customer, inv.total) for inv in page]
+    
+    def query_transactions(self, offset=0, limit=100, sort_by="id", descending=False,
+                           t_type="", keyword="", start_date="", end_date=""):
+        if self.binary is not None:
+            lower, upper = date_bounds(start_date, end_date)
+            return self.binary.query(offset, limit, sort_by, descending, t_type, keyword, lower, upper)
+        transactions = self._sorted_query(self.transactions_file, sort_by, descending,
+                                          keyword, start_date, end_date, t_type)
+        page = transactions[offset:offset + limit]
+        return len(transactions), [
+            (t.id, t.date, t.type, t.amount, t.description) for t in page
+        ]
+    
+    # Xuất theo luồng: (số dòng, iterator các dòng) với cùng bộ lọc như query_*
+    def stream_invoices(self, keyword="", start_date="", end_date=""):
+        lower, upper = date_bounds(start_date, end_date)
+        invoices = self._matching(self.invoices_file, keyword, lower, upper)
+        return len(invoices), ((inv.id, inv.date, inv.customer, inv.total) for inv in invoices)
+    
+    def stream_transactions(self, t_type="", keyword="", start_date="", end_date=""):
+        lower, upper = date_bounds(start_date, end_date)
+        if self.binary is not None:
+            return self.binary.stream(t_type, keyword, lower, upper)
+        transactions = self._matching(self.transactions_file, keyword, lower, upper)
+        if t_type:
+            transactions = [t for t in transactions if t.type.lower() == t_type.lower()]
+        return len(transactions), (
+            (t.id, t.date, t.type, t.amount, t.description) for t in transactions
+        )
+    
+    # Phân trang theo keyset (pagination.py): trả về (các dòng của trang, cursor của trang sau hoặc None)
+    def page_invoices(self, limit=50, cursor=None, sort_by="id", descending=False,
+                      keyword="", start_date="", end_date=""):
+        rows, cursor = self._page(self.invoices_file, limit, cursor, sort_by, descending,
+                                  keyword, start_date, end_date)
+        return [tuple(row) for row in rows], cursor
+    
+    def page_transactions(self, limit=50, cursor=None, sort_by="id", descending=False,
+                          t_type="", keyword="", start_date="", end_date=""):
+        if self.binary is not None and sort_by == "id" and not (t_type or keyword or start_date or end_date):
+            pagination.validate(sort_by, Transaction.FIELDS, limit)
+            after = pagination.decode_cursor(cursor, sort_by, descending)[1] if cursor is not None else None
+            rows = self.binary.after(after, limit + 1, descending)
+            if len(rows) <= limit:
+                return rows, None
+            return rows[:limit], pagination.encode_cursor(sort_by, descending, rows[limit - 1][0], rows[limit - 1][0])
+        rows, cursor = self._page(self.transactions_file, limit, cursor, sort_by, descending,
+                                  keyword, start_date, end_date, t_type)
+        return [tuple(row) for row in rows], cursor
+    
+    def page_products(self, limit=50, cursor=None, sort_by="id", descending=False, keyword=""):
+        rows, cursor = self._page(self.inventory_file, limit, cursor, sort_by, descending, keyword, "", "")
+        return [tuple(row) for row in rows], cursor
+    
+    def _page(self, filename, limit, cursor, sort_by, descending, keyword, start_date, end_date, t_type=""):
+        pagination.validate(sort_by, self._record_types[filename].FIELDS, limit)
+        with self._lock:
+            if sort_by == "id" and not (keyword or start_date or end_date or t_type):
+                # Các dòng luôn được nối theo ID tăng dần: trang đầu chỉ cần bisect, không lọc/sắp xếp
+                rows = self._load_rows(filename)
+            else:
+                # Danh sách đã lọc/sắp xếp tăng dần được cache như query_*; trang giảm dần duyệt ngược
+                rows = self._sorted_query(filename, sort_by, False, keyword, start_date, end_date, t_type)
+            return pagination.page(rows, sort_by, limit, cursor, descending)
+    
+    def _sorted_query(self, filename, sort_by, descending, keyword, start_date, end_date, t_type=""):
+        lower, upper = date_bounds(start_date, end_date)
+        
+        def query():
+            with self._lock:
+                rows = self._matching(filename, keyword, lower, upper)
+                if t_type:
+                    rows = [row for row in rows if row.type.lower() == t_type.lower()]
+                if sort_by != "id" or descending:
+                    rows.sort(key=lambda row: pagination.sort_value(getattr(row, sort_by)), reverse=descending)
+                return rows
+        
+        # Giữ kết quả đã lọc/sắp xếp để cuộn qua các trang không phải làm lại
+        key = ("sorted", sort_by, descending, fold(keyword), lower, upper, t_type.lower())
+        return self._cached(filename, key, query)
+    
+    # Các hàm thống kê (đọc từ tổng cộng dồn trong aggregates.json)
     def get_inventory_summary(self):
-        # Giả lập dữ liệu tồn kho
-        return 150, 45000000  # (số lượng, giá trị)
+        totals = self._totals(self.inventory_file)
+        return totals["quantity"], totals["value"]
     
     def get_sales_summary(self):
-        invoices = self.get_invoices()
-        return sum(inv["total"] for inv in invoices)
+        return self._totals(self.invoices_file)["total"]
     
     def get_accounting_summary(self):
-        transactions = self.get_transactions()
-        income = sum(t["amount"] for t in transactions if t["type"].lower() == "thu")
-        expense = sum(t["amount"] for t in transactions if t["type"].lower() == "chi")
-        return income, expense
+        totals = self._totals(self.transactions_file)
+        return totals["income"], totals["expense"]
+    
+    # Dữ liệu dạng cột cho báo cáo theo ngày/tháng/khách hàng (cần numpy)
+    def sales_columns(self):
+        return self._columns(self.invoices_file, lambda inv: (inv.date, inv.customer, inv.total))
+    
+    def accounting_columns(self):
+        if self.binary is not None:
+            return self.binary.columns(str.lower)
+        return self._columns(self.transactions_file, lambda t: (t.date, t.type, t.amount), str.lower)
+    
+    def _columns(self, filename, fields, normalize=None):
+        from analytics import Columns
+        with self._lock:
+            table = self._table(filename)
+            cached = table.get("columns")
+            if cached is not None and cached[0] == table["signature"]:
+                return cached[1]
+            signature, rows = table["signature"], list(table["rows"])
+        # Dựng cột ngoài khóa để không chặn các lệnh ghi
+        columns = Columns.from_records(map(fields, rows), normalize)
+        with self._lock:
+            if table["signature"] == signature:
+                table["columns"] = (signature, columns)
+        return columns
+    
+    def verify_summaries(self, repair=False):
+        """Tính lại các tổng từ dữ liệu gốc và báo những tổng bị lệch"""
+        report = {}
+        with self._lock:
+            for filename in (self.inventory_file, self.invoices_file, self.transactions_file):
+                signature = self._signature(filename)
+                stored = self._aggregates.get(filename, signature)
+                actual = self._sum_totals(filename, self._replay(filename))
+                if stored is None:
+                    report[filename] = {"status": "missing", "actual": actual}
+                else:
+                    differences = drift(stored, actual)
+                    report[filename] = {"status": "drift" if differences else "ok", "drift": differences}
+                if repair and report[filename]["status"] != "ok":
+                    self._aggregates.put(filename, signature, actual)
+        return report
+    
+    def _total_fields(self, filename):
+        if filename == self.inventory_file:
+            return ("quantity", "value")
+        if filename == self.invoices_file:
+            return ("total",)
+        return ("income", "expense")
+    
+    def _row_totals(self, filename, row):
+        if filename == self.inventory_file:
+            return {"quantity": row.quantity, "value": row.quantity * row.price}
+        if filename == self.invoices_file:
+            return {"total": row.total}
+        if row.type.lower() == "thu":
+            return {"income": row.amount}
+        if row.type.lower() == "chi":
+            return {"expense": row.amount}
+        return {}
+    
+    def _sum_totals(self, filename, rows):
+        totals = dict.fromkeys(self._total_fields(filename), 0)
+        for row in rows:
+            if row.deleted:
+                continue
+            for field, value in self._row_totals(filename, row).items():
+                totals[field] += value
+        return totals
+    
+    def _totals(self, filename):
+        return self._cached(filename, ("totals",), lambda: self._stored_totals(filename))
+    
+    def _stored_totals(self, filename):
+        with self._lock:
+            signature = self._signature(filename)
+            totals = self._aggregates.get(filename, signature)
+            if totals is None:
+                if self._is_binary(filename):
+                    totals = self.binary.totals()
+                else:
+                    totals = self._sum_totals(filename, self._load_rows(filename))
+                self._aggregates.put(filename, signature, totals)
+            return totals
+    
+    # Bộ nhớ đệm kết quả truy vấn: mỗi lần ghi tăng thế hệ của bảng (xem _written)
+    def _cached(self, filename, key, compute):
+        return self._cache.cached(filename, key, compute, version=self._signature(filename))
+    
+    def cache_stats(self):
+        return self._cache.stats()
+    
+    def _update_totals(self, filename, before, added=(), removed=()):
+        delta = self._sum_totals(filename, added)
+        for field, value in self._sum_totals(filename, removed).items():
+            delta[field] -= value
+        self._aggregates.apply(filename, before, self._signature(filename), delta)
+    
+    def _signature(self, filename):
+        if self._is_binary(filename):
+            return self.binary.signature()
+        journal = self._journal_file(filename)
+        signature = []
+        for path in (filename, journal, journal + ".old"):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except FileNotFoundError:
+                signature.append(None)
+        return signature
     
     # Hàm hỗ trợ
+    @contextmanager
+    def _locked(self, filename):
+        # Khóa trong tiến trình trước rồi mới khóa file, luôn theo thứ tự này để không deadlock
+        with self._lock, file_lock(filename):
+            yield
+    
     def _read_data(self, filename):
+        if not os.path.exists(filename):
+            return []
+        return retry(self._read_json, filename)
+    
+    def _read_json(self, filename):
         with open(filename, 'r') as f:
-            return json.load(f)
+            profiling.count_read(os.fstat(f.fileno()).st_size)
+            return json.load(f, object_hook=self._record_types[filename].from_dict)
     
     def _write_data(self, filename, data):
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Ghi file tạm rồi thay thế: máy khác không bao giờ đọc phải file ghi dở
+        with atomic_write(filename) as f:
+            json.dump(data, f, indent=2, default=to_json)
+            profiling.count_written(f.tell())
+    
+    def _is_binary(self, filename):
+        return self.binary is not None and filename == self.binary.path
+    
+    # Journal cho hóa đơn và giao dịch
+    def _journal_file(self, filename):
+        return os.path.splitext(filename)[0] + ".journal.jsonl"
+    
+    def _journaled(self, filename):
+        # Sản phẩm còn sửa/xóa nên vẫn ghi cả file, không qua journal
+        return self.journal and filename != self.inventory_file
+    
+    def _table(self, filename):
+        """Dữ liệu đã đọc của một file, dùng lại cho tới khi file bị thay đổi từ bên ngoài"""
+        with self._lock:
+            signature = self._signature(filename)
+            table = self._tables.get(filename)
+            if table is None or table["signature"] != signature:
+                for _ in range(5):
+                    rows = self._replay(filename)
+                    # Máy khác vừa nén journal trong lúc đọc thì có thể thiếu dòng: đọc lại
+                    current = self._signature(filename)
+                    if current == signature:
+                        break
+                    signature = current
+                else:
+                    # Vẫn đang bị ghi liên tục: dùng tạm, lần sau đọc lại
+                    signature = None
+                table = {"signature": signature, "rows": rows,
+                         "date_index": None, "text_index": None, "id_index": None}
+                self._tables[filename] = table
+            return table
+    
+    def _load_rows(self, filename):
+        return self._table(filename)["rows"]
+    
+    def _id_index(self, filename):
+        """Ánh xạ id -> vị trí dòng, dựng một lần cho mỗi lần đọc file"""
+        with self._lock:
+            table = self._table(filename)
+            if table["id_index"] is None:
+                table["id_index"] = {row.id: position for position, row in enumerate(table["rows"])
+                                     if not row.deleted}
+            return table["id_index"]
+    
+    def _next_id(self, filename, count):
+        # ID lấy từ sequence đã lưu nên không bị trùng sau khi xóa; lần đầu lấy theo ID lớn nhất
+        if self._is_binary(filename):
+            return self._sequences.allocate(filename, count, floor=self.binary.last_id)
+        return self._sequences.allocate(filename, count, floor=lambda: max(
+            (row.id for row in self._load_rows(filename)), default=0))
+    
+    def _text_field(self, filename):
+        # Trường được đánh chỉ mục tìm kiếm không dấu
+        if filename == self.inventory_file:
+            return "name"
+        if filename == self.invoices_file:
+            return "customer"
+        return "description"
+    
+    def _matching(self, filename, keyword="", lower=None, upper=None):
+        """Các dòng khớp khoảng ngày (qua bisect) và keyword (qua chỉ mục trigram)"""
+        with self._lock:
+            table = self._table(filename)
+            rows = table["rows"]
+            positions = None
+            if lower is not None or upper is not None:
+                if table["date_index"] is None:
+                    table["date_index"] = DateIndex(row.date for row in rows)
+                positions = table["date_index"].positions(lower, upper)
+            if keyword:
+                if table["text_index"] is None:
+                    field = self._text_field(filename)
+                    table["text_index"] = NgramIndex(getattr(row, field) for row in rows)
+                if positions is None:
+                    positions = table["text_index"].search(keyword)
+                else:
+                    positions = table["text_index"].filter(positions, keyword)
+            # Số dòng phải xét: cả bảng, hoặc chỉ các vị trí chỉ mục trả về
+            profiling.count_rows(len(rows) if positions is None else len(positions))
+            if positions is None:
+                return [row for row in rows if not row.deleted]
+            return [rows[i] for i in positions]
+    
+    def _written(self, filename, before, added=(), removed=(), updated=None):
+        # Sau khi chính instance này ghi: giữ cache nếu nó khớp với file trước lúc ghi.
+        # updated = (vị trí, bản ghi cũ, bản ghi mới) khi sửa một dòng tại chỗ
+        self._cache.bump(filename)
+        if updated is not None:
+            position, old, new = updated
+            added, removed = [new], [old]
+        table = self._tables.get(filename)
+        if table is not None:
+            if table["signature"] != before:
+                del self._tables[filename]
+            else:
+                table["signature"] = self._signature(filename)
+                if updated is not None and new.deleted:
+                    if table["text_index"] is not None:
+                        table["text_index"].remove(position)
+                    if table["id_index"] is not None:
+                        table["id_index"].pop(old.id, None)
+                elif updated is not None:
+                    if table["text_index"] is not None:
+                        table["text_index"].update(position, getattr(new, self._text_field(filename)))
+                elif removed:
+                    table["date_index"] = table["text_index"] = table["id_index"] = None
+        self._update_totals(filename, before, added=added, removed=removed)
+        self._publish(filename, added, removed, updated)
+    
+    def _publish(self, filename, added, removed, updated):
+        table = {self.inventory_file: "products", self.invoices_file: "invoices"}.get(filename, "transactions")
+        # Sản phẩm được sửa tại chỗ nên phát bản sao: giao diện có thể đọc sự kiện sau lần sửa kế tiếp
+        if updated is None:
+            self.events.publish(table, INSERTED, [p.copy() for p in added] if table == "products" else added)
+        elif updated[2].deleted:
+            self.events.publish(table, DELETED, [updated[1]])
+        else:
+            self.events.publish(table, UPDATED, [updated[2].copy()], old=[updated[1]])
+    
+    def _extend(self, filename, rows, records):
+        table = self._tables.get(filename)
+        if table is None or table["rows"] is not rows:
+            rows.extend(records)
+            return
+        field = self._text_field(filename)
+        for record in records:
+            if table["date_index"] is not None:
+                table["date_index"].add(record.date, len(rows))
+            if table["text_index"] is not None:
+                table["text_index"].add(len(rows), getattr(record, field))
+            if table["id_index"] is not None:
+                table["id_index"][record.id] = len(rows)
+            rows.append(record)
+    
+    def _replay(self, filename):
+        """Đọc snapshot rồi phát lại journal (kể cả journal đang nén dở)"""
+        if self._is_binary(filename):
+            return self.binary.records()
+        rows = self._read_data(filename)
+        record_type = self._record_types[filename]
+        seen = {row.id for row in rows}
+        journal = self._journal_file(filename)
+        for path in (journal + ".old", journal):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            profiling.count_read(len(data))
+            # Dòng cuối chưa có "\n" là đang được ghi (hoặc ghi dở do mất điện): bỏ qua
+            complete = data.rfind(b"\n") + 1
+            for line in data[:complete].splitlines():
+                if not line.strip():
+                    continue
+                record = record_type.from_dict(json.loads(line))
+                if record.id not in seen:
+                    seen.add(record.id)
+                    rows.append(record)
+        return rows
+    
+    def _append_rows(self, filename, rows, records):
+        if not records:
+            return
+        with self._lock:
+            if self._is_binary(filename):
+                self.binary.append(records)
+                table = self._tables.get(filename)
+                if table is not None:
+                    self._extend(filename, table["rows"], records)
+                return
+            if not self._journaled(filename):
+                self._extend(filename, rows, records)
+                self._write_data(filename, rows)
+                self._drop_journal(filename)
+                return
+            journal = self._journal_file(filename)
+            self._repair_journal(journal)
+            lines = "".join(json.dumps(record.to_dict(), ensure_ascii=False) + "\n" for record in records)
+            with open(journal, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            profiling.count_written(len(lines.encode('utf-8')))
+            self._extend(filename, rows, records)
+            if size >= self.compact_threshold and filename not in self._compacting:
+                self._compacting.add(filename)
+                threading.Thread(target=self.compact, args=(filename,), daemon=True).start()
+    
+    def _repair_journal(self, journal):
+        # Gọi khi đang giữ khóa ghi: dòng cuối ghi dở chắc chắn là do lần ghi bị ngắt
+        try:
+            with open(journal, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                data = f.read()
+        except (FileNotFoundError, OSError):
+            return
+        with open(journal, 'r+b') as f:
+            f.truncate(data.rfind(b"\n") + 1)
+    
+    def _drop_journal(self, filename):
+        journal = self._journal_file(filename)
+        for path in (journal, journal + ".old"):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def compact(self, filename):
+        """Gộp journal vào snapshot JSON; các lần ghi mới vẫn tiếp tục vào journal.
+        Với sản phẩm: ghi lại file bỏ các tombstone."""
+        if filename == self.inventory_file:
+            with self._locked(filename):
+                before = self._signature(filename)
+                self._write_data(filename, self.get_products())
+                self._tables.pop(filename, None)
+                self._written(filename, before)
+            return
+        journal = self._journal_file(filename)
+        old = journal + ".old"
+        try:
+            # Chỉ một tiến trình nén tại một thời điểm; tiến trình khác đang nén thì bỏ qua
+            with file_lock(filename + ".compact", timeout=0):
+                self._compact_journal(filename, journal, old)
+        except LockTimeout:
+            pass
+        finally:
+            self._compacting.discard(filename)
+    
+    def _compact_journal(self, filename, journal, old):
+        with self._locked(filename):
+            if not os.path.exists(journal) and not os.path.exists(old):
+                return
+            # Nếu lần nén trước bị dừng giữa chừng thì giữ nguyên file .old
+            if not os.path.exists(old):
+                before = self._signature(filename)
+                os.replace(journal, old)
+                self._written(filename, before)
+            snapshot = list(self._load_rows(filename))
+        # Ghi snapshot ngoài khóa để các lần ghi mới vào journal không phải chờ
+        tmp = temp_path(filename)
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(snapshot, f, indent=2, default=to_json)
+                f.flush()
+                os.fsync(f.fileno())
+                profiling.count_written(f.tell())
+            with self._locked(filename):
+                # Nén không làm đổi tổng: chỉ cập nhật chữ ký
+                before = self._signature(filename)
+                replace(tmp, filename)
+                os.remove(old)
+                self._written(filename, before)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+# Đo hiệu năng các hàm công khai khi bật MISA_PROFILE=1
+profiling.instrument(Database)
 
 # Tạo instance database toàn cục
-database = Database()
+if os.environ.get("MISA_BACKEND") == "sqlite":
+    from sqlite_store import SqliteDatabase
+    database = SqliteDatabase()
+elif os.environ.get("MISA_BACKEND") == "journal":
+    # Ghi nối thêm vào *.journal.jsonl thay vì ghi lại cả file JSON (người dùng tự bật)
+    database = Database(journal=True)
+elif os.environ.get("MISA_BACKEND") == "binary":
+    database = Database(journal=True, binary=True)
+elif os.environ.get("MISA_BACKEND") == "service":
+    # Dữ liệu nằm trong dataservice.py (MISA_SERVICE=host:cổng), các máy dùng chung một bản trong bộ nhớ
+    from dataservice import DatabaseClient
+    database = DatabaseClient()
+else:
+    database = Database()
+
+def _add_to_series(series, label, amount, keep=None):
+    # series: các cặp (nhãn, tổng) sắp theo nhãn như analytics trả về; keep giữ lại keep nhãn mới nhất
+    i = bisect_left(series, (label,))
+    if i < len(series) and series[i][0] == label:
+        series[i] = (label, series[i][1] + amount)
+    else:
+        series.insert(i, (label, amount))
+        if keep is not None and len(series) > keep:
+            del series[:len(series) - keep]
+
+def format_money(value):
+    # Số tiền lạ trong file (chuỗi, ô trống) hiển thị nguyên giá trị thay vì làm hỏng cả trang
+    try:
+        return f"{float(value):,.0f} VND"
+    except (TypeError, ValueError):
+        return value
+
+# Cột của dòng trong Treeview theo bảng, cùng thứ tự với query_*
+PAGE_COLUMNS = {
+    "invoices": ("id", "date", "customer", "total"),
+    "transactions": ("id", "date", "type", "amount", "description"),
+}
 
 # Phần GUI (giữ nguyên như code trước)
 class MisaApp:
+    TOP_CUSTOMERS = 10
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Phần mềm quản lý bán hàng Misa")
@@ -138,14 +772,67 @@ class MisaApp:
         # Cấu hình style
         self.configure_styles()
         
+        # Thanh trạng thái: báo đang đọc/ghi dữ liệu trên luồng nền
+        status_bar = ttk.Frame(root)
+        status_bar.pack(side="bottom", fill="x", padx=10, pady=(0, 5))
+        self.busy_bar = ttk.Progressbar(status_bar, mode="indeterminate", length=120)
+        self.busy_bar.pack(side="right")
+        self.busy_label = ttk.Label(status_bar, text="")
+        self.busy_label.pack(side="right", padx=5)
+        # Tiến độ xuất file, chỉ hiện khi đang xuất
+        self.export_label = ttk.Label(status_bar, text="")
+        self.export_label.pack(side="left", padx=5)
+        self.export_bar = ttk.Progressbar(status_bar, mode="determinate", length=200)
+        self.export_progress = None
+        
+        # Mọi thao tác với database chạy qua dispatcher để không khóa giao diện
+        self.dispatcher = Dispatcher(root, on_busy=self.show_busy)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        
+        # Sự kiện thay đổi đến từ luồng ghi, chuyển về luồng Tk rồi chỉ vá phần bị ảnh hưởng
+        self.stats = None
+        self._unsubscribe = database.events.subscribe(lambda event: self.dispatcher.post(self.on_change, event))
+        
         # Tạo notebook (tabs)
         self.tabs = ttk.Notebook(root)
         self.tabs.pack(expand=True, fill="both", padx=10, pady=10)
         
-        # Xây dựng các tab
-        self.build_sales_tab()
-        self.build_accounting_tab()
-        self.build_statistics_tab()
+        # Chỉ tạo khung tab; nội dung và dữ liệu được dựng khi tab được chọn lần đầu
+        self._tab_builders = {}
+        self.sales_tab = self.add_tab("Bán hàng", self.build_sales_tab)
+        self.accounting_tab = self.add_tab("Kế toán", self.build_accounting_tab)
+        self.stats_tab = self.add_tab("Thống kê", self.build_statistics_tab)
+        self.perf_tab = self.add_tab("Hiệu năng", self.build_performance_tab)
+        self.tabs.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        # Tab đầu tiên được dựng sau khi cửa sổ đã hiện
+        self.root.after_idle(self.on_tab_changed)
+    
+    def add_tab(self, text, builder):
+        frame = ttk.Frame(self.tabs)
+        self.tabs.add(frame, text=text)
+        self._tab_builders[str(frame)] = builder
+        return frame
+    
+    def on_tab_changed(self, event=None):
+        builder = self._tab_builders.pop(self.tabs.select(), None)
+        if builder is not None:
+            builder()
+    
+    def show_busy(self, busy):
+        if busy:
+            self.busy_label.configure(text="Đang xử lý...")
+            self.busy_bar.start(10)
+        else:
+            self.busy_label.configure(text="")
+            self.busy_bar.stop()
+    
+    def close(self):
+        self._unsubscribe()
+        self.dispatcher.shutdown()
+        self.root.destroy()
+    
+    def show_error(self, error):
+        messagebox.showerror("Lỗi", f"Không thao tác được với dữ liệu: {error}")
     
     def configure_styles(self):
         style = ttk.Style()
@@ -163,61 +850,7 @@ class MisaApp:
         style.configure('Treeview.Heading', font=self.default_font)
         style.map('TButton', foreground=[('active', 'black')], background=[('active', '#e6e6e6')])
     
-    def get_products(self):
-        return self._read_data(self.inventory_file)
-    
-    def add_product(self, name, quantity, price):
-        products = self._read_data(self.inventory_file)
-        new_id = max([p['id'] for p in products], default=0) + 1
-        products.append({
-            "id": new_id,
-            "name": name,
-            "quantity": quantity,
-            "price": price
-        })
-        self._write_data(self.inventory_file, products)
-        return new_id
-    
-    def update_product(self, product_id, name=None, quantity=None, price=None):
-        products = self._read_data(self.inventory_file)
-        for product in products:
-            if product['id'] == product_id:
-                if name is not None:
-                    product['name'] = name
-                if quantity is not None:
-                    product['quantity'] = quantity
-                if price is not None:
-                    product['price'] = price
-                self._write_data(self.inventory_file, products)
-                return True
-        return False
-    
-    def delete_product(self, product_id):
-        products = self._read_data(self.inventory_file)
-        products = [p for p in products if p['id'] != product_id]
-        self._write_data(self.inventory_file, products)
-    
-    def search_products(self, keyword=""):
-        products = self.get_products()
-        if not keyword:
-            return products
-        
-        results = []
-        for product in products:
-            if keyword.lower() in product['name'].lower():
-                results.append(product)
-        return results
-    
-    def get_inventory_summary(self):
-        products = self.get_products()
-        total_quantity = sum(p['quantity'] for p in products)
-        total_value = sum(p['quantity'] * p['price'] for p in products)
-        return total_quantity, total_value
-    
     def build_sales_tab(self):
-        self.sales_tab = ttk.Frame(self.tabs)
-        self.tabs.add(self.sales_tab, text="Bán hàng")
-        
         form_frame = ttk.LabelFrame(self.sales_tab, text="Tạo hóa đơn mới", padding=(15, 10))
         form_frame.pack(fill="x", padx=15, pady=(10, 5))
         
@@ -247,9 +880,18 @@ class MisaApp:
         for col in ("ID", "Ngày", "Khách", "Tổng"):
             self.invoice_tree.heading(col, text=col)
         
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.invoice_tree.yview)
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        self.invoice_tree.configure(yscrollcommand=scrollbar.set)
+        
+        # Chỉ dựng các dòng đang hiển thị, tải thêm theo trang khi cuộn
+        self.invoice_filters = {}
+        self.invoice_pager = PagedTreeview(
+            self.invoice_tree, scrollbar,
+            fetch=lambda offset, limit, sort_by, descending: database.query_invoices(
+                offset, limit, sort_by or "id", descending, **self.invoice_filters),
+            sort_keys={"ID": "id", "Ngày": "date", "Khách": "customer", "Tổng": "total"},
+            format_row=lambda row: (row[0], row[1], row[2], format_money(row[3])),
+            dispatcher=self.dispatcher)
         
         search_frame = ttk.LabelFrame(self.sales_tab, text="Tìm kiếm hóa đơn", padding=(15, 10))
         search_frame.pack(fill="x", padx=15, pady=(5, 10))
@@ -267,13 +909,12 @@ class MisaApp:
         self.invoice_end_entry.grid(row=0, column=5, padx=5, pady=5)
         
         ttk.Button(search_frame, text="Lọc", command=self.filter_invoices).grid(row=0, column=6, padx=10, pady=5)
+        ttk.Button(search_frame, text="Xuất file", command=lambda: self.export_data("invoices")
+                   ).grid(row=0, column=7, padx=5, pady=5)
         
         self.load_invoices()
     
     def build_accounting_tab(self):
-        self.accounting_tab = ttk.Frame(self.tabs)
-        self.tabs.add(self.accounting_tab, text="Kế toán")
-        
         form_frame = ttk.LabelFrame(self.accounting_tab, text="Thêm giao dịch mới", padding=(15, 10))
         form_frame.pack(fill="x", padx=15, pady=(10, 5))
         
@@ -308,9 +949,17 @@ class MisaApp:
         for col in ("ID", "Ngày", "Loại", "Số tiền", "Mô tả"):
             self.trans_tree.heading(col, text=col)
         
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.trans_tree.yview)
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        self.trans_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.trans_filters = {}
+        self.trans_pager = PagedTreeview(
+            self.trans_tree, scrollbar,
+            fetch=lambda offset, limit, sort_by, descending: database.query_transactions(
+                offset, limit, sort_by or "id", descending, **self.trans_filters),
+            sort_keys={"ID": "id", "Ngày": "date", "Loại": "type", "Số tiền": "amount", "Mô tả": "description"},
+            format_row=lambda row: (row[0], row[1], row[2], format_money(row[3]), row[4]),
+            dispatcher=self.dispatcher)
         
         search_frame = ttk.LabelFrame(self.accounting_tab, text="Tìm kiếm giao dịch", padding=(15, 10))
         search_frame.pack(fill="x", padx=15, pady=(5, 10))
@@ -332,17 +981,17 @@ class MisaApp:
         self.trans_keyword_entry.grid(row=0, column=7, padx=5, pady=5)
         
         ttk.Button(search_frame, text="Lọc", command=self.filter_transactions).grid(row=0, column=8, padx=10, pady=5)
+        ttk.Button(search_frame, text="Xuất file", command=lambda: self.export_data("transactions")
+                   ).grid(row=0, column=9, padx=5, pady=5)
         
         self.load_transactions()
     
     def build_statistics_tab(self):
-        self.stats_tab = ttk.Frame(self.tabs)
-        self.tabs.add(self.stats_tab, text="Thống kê")
-        
         btn_frame = ttk.Frame(self.stats_tab)
         btn_frame.pack(fill="x", padx=15, pady=(10, 5))
         
-        ttk.Button(btn_frame, text="Làm mới thống kê", command=self.load_statistics, style='Accent.TButton').pack(pady=5)
+        ttk.Button(btn_frame, text="Làm mới thống kê", command=self.load_statistics, style='Accent.TButton').pack(side="left", pady=5)
+        ttk.Button(btn_frame, text="Kiểm tra số liệu", command=self.verify_statistics).pack(side="left", padx=10, pady=5)
         
         stats_frame = ttk.LabelFrame(self.stats_tab, text="Thống kê tổng quan", padding=(15, 10))
         stats_frame.pack(fill="both", expand=True, padx=15, pady=5)
@@ -362,38 +1011,133 @@ class MisaApp:
         start_date = self.invoice_start_entry.get()
         end_date = self.invoice_end_entry.get()
 
-        results = database.search_invoices(keyword, start_date, end_date)
+        try:
+            date_bounds(start_date, end_date)
+        except ValueError:
+            messagebox.showerror("Lỗi", "Ngày phải có dạng YYYY-MM-DD!")
+            return
 
-        self.invoice_tree.delete(*self.invoice_tree.get_children())
-        for row in results:
-            self.invoice_tree.insert("", "end", values=row)
+        self.invoice_filters = {"keyword": keyword, "start_date": start_date, "end_date": end_date}
+        self.invoice_pager.first = 0
+        self.invoice_pager.refresh()
 
+    def export_data(self, kind):
+        """Xuất các dòng đang lọc ra xlsx/CSV trên luồng nền, tiến độ hiện ở thanh trạng thái"""
+        if self.export_progress is not None:
+            messagebox.showwarning("Cảnh báo", "Đang xuất một file khác, vui lòng chờ!")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Xuất dữ liệu", defaultextension=".xlsx",
+            initialfile="hoa_don.xlsx" if kind == "invoices" else "giao_dich.xlsx",
+            filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv")])
+        if not path:
+            return
+        filters = dict(self.invoice_filters if kind == "invoices" else self.trans_filters)
+        # Luồng xuất chỉ ghi vào dict này; luồng giao diện đọc lại theo chu kỳ
+        self.export_progress = progress = {"done": 0, "total": 0}
+        
+        def report(done, total):
+            progress["done"], progress["total"] = done, total
+        
+        def finish():
+            self.export_progress = None
+            self.export_bar.pack_forget()
+            self.export_label.configure(text="")
+        
+        def done(count):
+            finish()
+            messagebox.showinfo("Thành công", f"Đã xuất {count:,} dòng vào {path}")
+        
+        def failed(error):
+            finish()
+            self.show_error(error)
+        
+        self.export_bar.configure(value=0, maximum=1)
+        self.export_bar.pack(side="left")
+        self.dispatcher.read(export.export, database, kind, path, filters, report,
+                             on_done=done, on_error=failed)
+        self.show_export_progress()
+    
+    def show_export_progress(self):
+        progress = self.export_progress
+        if progress is None:
+            return
+        self.export_bar.configure(value=progress["done"], maximum=max(progress["total"], 1))
+        self.export_label.configure(text=f"Đang xuất {progress['done']:,}/{progress['total']:,} dòng")
+        self.root.after(200, self.show_export_progress)
+    
+    def build_performance_tab(self):
+        btn_frame = ttk.Frame(self.perf_tab)
+        btn_frame.pack(fill="x", padx=15, pady=(10, 5))
+        
+        ttk.Button(btn_frame, text="Đặt lại số liệu", command=self.reset_performance).pack(side="left", pady=5)
+        if not profiling.ENABLED:
+            ttk.Label(btn_frame, text="Đo hiệu năng đang tắt: chạy lại với biến môi trường MISA_PROFILE=1"
+                      ).pack(side="left", padx=10)
+        
+        self.cache_label = ttk.Label(self.perf_tab, text="")
+        self.cache_label.pack(fill="x", padx=15)
+        
+        tree_frame = ttk.LabelFrame(self.perf_tab, text="Thao tác chậm nhất", padding=(15, 10))
+        tree_frame.pack(fill="both", expand=True, padx=15, pady=5)
+        
+        columns = ("Thao tác", "Số lần", "TB (ms)", "Max (ms)", "Tổng (ms)", "Dòng quét", "Đọc (KB)", "Ghi (KB)")
+        self.perf_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        self.perf_tree.pack(side="left", fill="both", expand=True)
+        for col in columns:
+            self.perf_tree.heading(col, text=col)
+            self.perf_tree.column(col, width=90, anchor="e")
+        self.perf_tree.column("Thao tác", width=260, anchor="w")
+        
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.perf_tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.perf_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.refresh_performance()
+    
+    def refresh_performance(self):
+        # Số liệu nằm sẵn trong bộ nhớ nên đọc trực tiếp trên luồng giao diện, mỗi giây một lần
+        if self.tabs.select() == str(self.perf_tab):
+            self.perf_tree.delete(*self.perf_tree.get_children())
+            for stats in profiling.snapshot()[:50]:
+                self.perf_tree.insert("", "end", values=(
+                    stats["op"], stats["calls"], f"{stats['mean_ms']:.2f}", f"{stats['max_ms']:.2f}",
+                    f"{stats['total_ms']:.0f}", stats["rows"], f"{stats['bytes_read'] / 1024:,.0f}",
+                    f"{stats['bytes_written'] / 1024:,.0f}"))
+            cache = database.cache_stats()
+            self.cache_label.configure(
+                text=f"Bộ nhớ đệm truy vấn: trúng {cache['hit_rate']:.0%} ({cache['hits']:,}/"
+                     f"{cache['hits'] + cache['misses']:,} lần), {cache['entries']} kết quả, "
+                     f"{cache['rows']:,} dòng, đã loại {cache['evictions']:,}")
+        self.root.after(1000, self.refresh_performance)
+    
+    def reset_performance(self):
+        profiling.reset()
+        self.perf_tree.delete(*self.perf_tree.get_children())
+    
     def add_invoice(self):
         customer = self.customer_entry.get()
         total = self.total_entry.get()
         if customer and total:
             try:
                 total = float(total)
-                database.add_invoice(customer, total)
-                messagebox.showinfo("Thành công", "Hóa đơn đã được tạo thành công!")
-                self.load_invoices()
-                self.customer_entry.delete(0, tk.END)
-                self.total_entry.delete(0, tk.END)
             except ValueError:
                 messagebox.showerror("Lỗi", "Tổng tiền phải là số hợp lệ!")
+                return
+            
+            # Danh sách và thống kê tự cập nhật qua sự kiện thay đổi (on_change)
+            def done(_):
+                messagebox.showinfo("Thành công", "Hóa đơn đã được tạo thành công!")
+            
+            self.dispatcher.write(database.add_invoice, customer, total, on_done=done, on_error=self.show_error)
+            self.customer_entry.delete(0, tk.END)
+            self.total_entry.delete(0, tk.END)
         else:
             messagebox.showwarning("Cảnh báo", "Vui lòng nhập đầy đủ thông tin khách hàng và tổng tiền!")
 
     def load_invoices(self):
-        for row in self.invoice_tree.get_children():
-            self.invoice_tree.delete(row)
-        for invoice in database.get_invoices():
-            self.invoice_tree.insert("", "end", values=(
-                invoice["id"],
-                invoice["date"],
-                invoice["customer"],
-                f"{invoice['total']:,.0f} VND"
-            ))
+        self.invoice_filters = {}
+        self.invoice_pager.refresh()
 
     def filter_transactions(self):
         t_type = self.trans_type_filter.get()
@@ -401,11 +1145,15 @@ class MisaApp:
         start = self.trans_start_entry.get()
         end = self.trans_end_entry.get()
 
-        results = database.search_transactions(t_type, keyword, start, end)
+        try:
+            date_bounds(start, end)
+        except ValueError:
+            messagebox.showerror("Lỗi", "Ngày phải có dạng YYYY-MM-DD!")
+            return
 
-        self.trans_tree.delete(*self.trans_tree.get_children())
-        for row in results:
-            self.trans_tree.insert("", "end", values=row)
+        self.trans_filters = {"t_type": t_type, "keyword": keyword, "start_date": start, "end_date": end}
+        self.trans_pager.first = 0
+        self.trans_pager.refresh()
 
     def add_transaction(self):
         t_type = self.type_entry.get()
@@ -414,33 +1162,68 @@ class MisaApp:
         if t_type and amount and desc:
             try:
                 amount = float(amount)
-                database.add_transaction(t_type, amount, desc)
-                messagebox.showinfo("Thành công", "Giao dịch đã được thêm thành công!")
-                self.load_transactions()
-                self.type_entry.delete(0, tk.END)
-                self.amount_entry.delete(0, tk.END)
-                self.desc_entry.delete(0, tk.END)
             except ValueError:
                 messagebox.showerror("Lỗi", "Số tiền phải là số hợp lệ!")
+                return
+            
+            def done(_):
+                messagebox.showinfo("Thành công", "Giao dịch đã được thêm thành công!")
+            
+            self.dispatcher.write(database.add_transaction, t_type, amount, desc, on_done=done, on_error=self.show_error)
+            self.type_entry.delete(0, tk.END)
+            self.amount_entry.delete(0, tk.END)
+            self.desc_entry.delete(0, tk.END)
         else:
             messagebox.showwarning("Cảnh báo", "Vui lòng nhập đầy đủ thông tin giao dịch!")
 
     def load_transactions(self):
-        for row in self.trans_tree.get_children():
-            self.trans_tree.delete(row)
-        for trans in database.get_transactions():
-            self.trans_tree.insert("", "end", values=(
-                trans["id"],
-                trans["date"],
-                trans["type"],
-                f"{trans['amount']:,.0f} VND",
-                trans["description"]
-            ))
+        self.trans_filters = {}
+        self.trans_pager.refresh()
+
+    def verify_statistics(self):
+        def done(report):
+            problems = [f"{name}: {result['status']}" for name, result in report.items() if result["status"] != "ok"]
+            if problems:
+                messagebox.showwarning("Kiểm tra số liệu", "Đã tính lại các tổng bị lệch:\n" + "\n".join(problems))
+            else:
+                messagebox.showinfo("Kiểm tra số liệu", "Số liệu thống kê khớp với dữ liệu gốc.")
+            self.load_statistics()
+        
+        # Sửa lại tổng là thao tác ghi nên đi chung hàng đợi ghi
+        self.dispatcher.write(database.verify_summaries, repair=True, on_done=done, on_error=self.show_error)
 
     def load_statistics(self):
-        inventory_qty, inventory_value = database.get_inventory_summary()
-        sales_total = database.get_sales_summary()
-        income, expense = database.get_accounting_summary()
+        def summaries():
+            return (database.get_inventory_summary(), database.get_sales_summary(),
+                    database.get_accounting_summary(), self.build_reports())
+        
+        self.dispatcher.read(summaries, key="statistics", on_done=self.show_statistics, on_error=self.show_error)
+
+    def build_reports(self):
+        # Báo cáo chi tiết cần numpy; thiếu thì chỉ hiển thị các tổng
+        try:
+            import analytics
+        except ImportError:
+            return None
+        sales = database.sales_columns()
+        accounting = database.accounting_columns()
+        return {
+            "months": analytics.revenue_by_month(sales),
+            "days": analytics.revenue_by_day(sales)[-31:],
+            "customers": analytics.revenue_by_customer(sales, top=self.TOP_CUSTOMERS),
+            "cash_flow": analytics.cash_flow_by_month(accounting)
+        }
+
+    def show_statistics(self, summaries):
+        (inventory_qty, inventory_value), sales_total, (income, expense), reports = summaries
+        self.stats = {"quantity": inventory_qty, "value": inventory_value, "sales": sales_total,
+                      "income": income, "expense": expense, "reports": reports}
+        self.render_statistics()
+
+    def render_statistics(self):
+        stats = self.stats
+        inventory_qty, inventory_value, sales_total = stats["quantity"], stats["value"], stats["sales"]
+        income, expense = stats["income"], stats["expense"]
 
         self.stats_text.delete(1.0, tk.END)
         self.stats_text.insert(tk.END, "═"*50 + " TỒN KHO " + "═"*50 + "\n\n")
@@ -466,6 +1249,109 @@ class MisaApp:
             self.stats_text.tag_add("positive", last_line_start, last_line_end)
         else:
             self.stats_text.tag_add("negative", last_line_start, last_line_end)
+        
+        self.show_reports(stats["reports"])
+
+    def show_reports(self, reports):
+        self.stats_text.insert(tk.END, "\n")
+        if reports is None:
+            self.stats_text.insert(tk.END, " (Cài đặt numpy để xem báo cáo theo ngày, tháng và khách hàng)\n")
+            return
+        
+        self.stats_text.insert(tk.END, "═"*45 + " DOANH THU THEO THÁNG " + "═"*40 + "\n\n")
+        for month, total in reports["months"]:
+            self.stats_text.insert(tk.END, f" {month}   {total:>20,.0f} VND\n")
+        
+        self.stats_text.insert(tk.END, "\n" + "═"*45 + " THU/CHI THEO THÁNG " + "═"*42 + "\n\n")
+        self.stats_text.insert(tk.END, f" {'Tháng':<9}{'THU':>20}{'CHI':>20}{'Chênh lệch':>20}\n")
+        for month, month_income, month_expense in reports["cash_flow"]:
+            self.stats_text.insert(tk.END, f" {month:<9}{month_income:>20,.0f}{month_expense:>20,.0f}"
+                                           f"{month_income - month_expense:>20,.0f}\n")
+        
+        self.stats_text.insert(tk.END, "\n" + "═"*45 + " KHÁCH HÀNG HÀNG ĐẦU " + "═"*41 + "\n\n")
+        for customer, total, count in reports["customers"]:
+            self.stats_text.insert(tk.END, f" {str(customer)[:30]:<30} {count:>6} HĐ {total:>20,.0f} VND\n")
+        
+        self.stats_text.insert(tk.END, "\n" + "═"*45 + " DOANH THU 31 NGÀY GẦN NHẤT " + "═"*34 + "\n\n")
+        for day, total in reports["days"]:
+            self.stats_text.insert(tk.END, f" {day}   {total:>20,.0f} VND\n")
+
+    def on_change(self, event):
+        """Một lần ghi vào database (đã về luồng Tk): cập nhật danh sách và thống kê đang hiển thị"""
+        if event.table == "invoices" and hasattr(self, "invoice_pager"):
+            self.patch_pager(self.invoice_pager, self.invoice_filters, event)
+        elif event.table == "transactions" and hasattr(self, "trans_pager"):
+            self.patch_pager(self.trans_pager, self.trans_filters, event)
+        if self.dispatcher.pending("statistics"):
+            # Số liệu đang tính có thể đã hoặc chưa gồm lần ghi này: tính lại
+            self.load_statistics()
+        elif self.stats is not None:
+            self.patch_statistics(event)
+
+    def patch_pager(self, pager, filters, event):
+        # Dòng mới chỉ nằm cuối danh sách khi sắp theo id tăng dần và không lọc; còn lại tải lại trang
+        if (event.kind == INSERTED and pager.sort_by in (None, "id") and not pager.descending
+                and not any(filters.values()) and len(event.records) <= pager.page_size):
+            columns = PAGE_COLUMNS[event.table]
+            pager.append([tuple(record[name] for name in columns) for record in event.records])
+        else:
+            pager.refresh()
+
+    def patch_statistics(self, event):
+        """Cộng phần chênh lệch của lần ghi vào số liệu đang hiển thị thay vì tính lại toàn bộ"""
+        stats, reports = self.stats, self.stats["reports"]
+        if event.kind == DELETED:
+            changes = [(-1, record) for record in event.records]
+        else:
+            changes = [(1, record) for record in event.records] + [(-1, record) for record in event.old or ()]
+        for sign, record in changes:
+            if event.table == "products":
+                stats["quantity"] += sign * record["quantity"]
+                stats["value"] += sign * record["quantity"] * record["price"]
+            elif event.table == "invoices":
+                amount = sign * record["total"]
+                stats["sales"] += amount
+                if reports is None:
+                    continue
+                _add_to_series(reports["months"], record["date"][:7], amount)
+                _add_to_series(reports["days"], record["date"][:10], amount, keep=31)
+                if not self.patch_customers(reports["customers"], record["customer"], amount, sign):
+                    # Khách ngoài nhóm đầu có thể vượt lên nhưng không biết tổng cũ của họ
+                    self.load_statistics()
+                    return
+            else:
+                t_type = str(record["type"]).lower()
+                if t_type not in ("thu", "chi"):
+                    continue
+                amount = sign * record["amount"]
+                stats["income" if t_type == "thu" else "expense"] += amount
+                if reports is None:
+                    continue
+                cash_flow = reports["cash_flow"]
+                month = record["date"][:7]
+                i = bisect_left(cash_flow, (month,))
+                if i == len(cash_flow) or cash_flow[i][0] != month:
+                    cash_flow.insert(i, (month, 0, 0))
+                _, month_income, month_expense = cash_flow[i]
+                if t_type == "thu":
+                    month_income += amount
+                else:
+                    month_expense += amount
+                cash_flow[i] = (month, month_income, month_expense)
+        self.render_statistics()
+
+    def patch_customers(self, customers, customer, amount, sign):
+        for i, (name, total, count) in enumerate(customers):
+            if name == customer:
+                customers[i] = (name, total + amount, count + sign)
+                customers.sort(key=lambda item: -item[1])
+                return True
+        if len(customers) < self.TOP_CUSTOMERS:
+            # Danh sách chưa đủ nghĩa là nó đang chứa mọi khách hàng: đây là khách mới
+            customers.append((customer, amount, sign))
+            customers.sort(key=lambda item: -item[1])
+            return True
+        return False
 
 if __name__ == "__main__":
     # Khởi tạo database
@@ -0,0 +1,222 @@
+"""Nhập hàng loạt hóa đơn / giao dịch từ file CSV hoặc JSONL của máy bán hàng (POS).
+
+    python importer.py invoices pos_2024-06-01.csv --rejects loi.csv
+    python importer.py transactions pos_2024-06-01.jsonl --workers 4
+
+Cột (CSV có dòng tiêu đề) hoặc khóa (JSONL, mỗi dòng một object):
+    invoices:     ref, date, customer, total
+    transactions: ref, date, type, amount, description
+ref là mã tham chiếu của POS: dòng có ref đã nhập trước đó (hoặc trùng trong file) bị bỏ qua.
+
+File được chia thành các khối CHUNK dòng, phân tích và kiểm tra song song trên một process pool,
+rồi toàn bộ dòng hợp lệ được lưu bằng một lần add_*_bulk. CSV không hỗ trợ ô nhiều dòng.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from locking import atomic_write, file_lock
+
+CHUNK = 10000
+REFS_FILE = "imported_refs.json"
+
+FIELDS = {
+    "invoices": ("ref", "date", "customer", "total"),
+    "transactions": ("ref", "date", "type", "amount", "description"),
+}
+
+# Các dạng ngày thường gặp trong file POS: YYYY-MM-DD[ HH:MM[:SS]] (cả dạng ISO có T, phần lẻ giây,
+# múi giờ) và DD/MM/YYYY[ HH:MM[:SS]]. Đều được đổi về "YYYY-MM-DD HH:MM:SS" như database.
+# Dùng regex thay cho strptime: strptime chậm hơn nhiều lần và là phần tốn nhất khi nhập.
+_TIME = r"(?:[ T](\d{1,2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+_ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})" + _TIME)
+_DMY_DATE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})" + _TIME)
+TYPES = {"thu": "Thu", "chi": "Chi"}
+
+def normalize_date(value):
+    value = str(value or "").strip()
+    match = _ISO_DATE.fullmatch(value)
+    if match is not None:
+        year, month, day, hour, minute, second = match.groups()
+    else:
+        match = _DMY_DATE.fullmatch(value)
+        if match is None:
+            return None
+        day, month, year, hour, minute, second = match.groups()
+    try:
+        moment = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    except ValueError:
+        return None
+    return moment.isoformat(" ")
+
+def _amount(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(str(value).strip().replace(" ", ""))
+    except ValueError:
+        return None
+
+def validate(kind, item):
+    """(bản ghi cho add_*_bulk, None) nếu hợp lệ, ngược lại (None, lý do)"""
+    ref = str(item.get("ref") or "").strip()
+    if not ref:
+        return None, "Thiếu mã tham chiếu (ref)"
+    date = normalize_date(item.get("date"))
+    if date is None:
+        return None, f"Ngày không hợp lệ: {item.get('date')!r}"
+    if kind == "invoices":
+        customer = str(item.get("customer") or "").strip()
+        if not customer:
+            return None, "Thiếu tên khách hàng"
+        total = _amount(item.get("total"))
+        if total is None or total < 0:
+            return None, f"Tổng tiền không hợp lệ: {item.get('total')!r}"
+        return {"ref": ref, "date": date, "customer": customer, "total": total}, None
+    t_type = TYPES.get(str(item.get("type") or "").strip().lower())
+    if t_type is None:
+        return None, f"Loại giao dịch phải là Thu hoặc Chi: {item.get('type')!r}"
+    amount = _amount(item.get("amount"))
+    if amount is None or amount < 0:
+        return None, f"Số tiền không hợp lệ: {item.get('amount')!r}"
+    description = str(item.get("description") or "").strip()
+    return {"ref": ref, "date": date, "type": t_type, "amount": amount, "description": description}, None
+
+def parse_chunk(kind, fmt, header, first_line, lines):
+    """Chạy trong process con: trả về ((số dòng, bản ghi) hợp lệ, (số dòng, lý do, nội dung) bị loại)"""
+    records, rejected = [], []
+    if fmt == "csv":
+        items = (dict(zip(header, row)) for row in csv.reader(lines))
+    else:
+        items = map(_json_item, lines)
+    for line_no, (line, item) in enumerate(zip(lines, items), start=first_line):
+        if isinstance(item, str):
+            rejected.append((line_no, item, line.rstrip("\r\n")))
+            continue
+        record, reason = validate(kind, item)
+        if reason is not None:
+            rejected.append((line_no, reason, line.rstrip("\r\n")))
+        else:
+            records.append((line_no, record))
+    return records, rejected
+
+def _json_item(line):
+    # Lỗi trả về dạng chuỗi để parse_chunk ghi vào danh sách dòng lỗi
+    try:
+        item = json.loads(line)
+    except ValueError as error:
+        return f"JSON không hợp lệ: {error}"
+    return item if isinstance(item, dict) else "Mỗi dòng JSONL phải là một object"
+
+def _chunks(f, size):
+    while True:
+        lines = list(islice(f, size))
+        if not lines:
+            return
+        yield lines
+
+class ImportedRefs:
+    """Mã tham chiếu POS đã nhập của từng bảng, để nhập lại cùng một file không bị trùng"""
+
+    def __init__(self, path=REFS_FILE):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, data):
+        with atomic_write(self.path) as f:
+            json.dump(data, f)
+
+def import_file(db, kind, path, workers=None, chunk=CHUNK, refs_file=REFS_FILE):
+    """Nhập path vào db (gui.Database hoặc SqliteDatabase) bằng một lần ghi.
+
+    Trả về dict: imported, rejected [(số dòng, lý do, nội dung)], seconds, rows_per_second.
+    """
+    if kind not in FIELDS:
+        raise ValueError(f"Không nhập được {kind}")
+    fmt = "jsonl" if path.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+    start = time.perf_counter()
+    records, rejected = [], []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        header, first_line = None, 1
+        if fmt == "csv":
+            header = [name.strip().lower() for name in next(csv.reader([f.readline()]), [])]
+            missing = [name for name in FIELDS[kind] if name not in header and name != "description"]
+            if missing:
+                raise ValueError(f"File thiếu cột: {', '.join(missing)}")
+            first_line = 2
+        jobs = []
+        for lines in _chunks(f, chunk):
+            jobs.append((kind, fmt, header, first_line, lines))
+            first_line += len(lines)
+        workers = workers or os.cpu_count() or 1
+        if len(jobs) > 1 and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(parse_chunk, *zip(*jobs)))
+        else:
+            # File nhỏ: khởi động process pool còn tốn hơn tự phân tích
+            results = [parse_chunk(*job) for job in jobs]
+    for chunk_records, chunk_rejected in results:
+        records.extend(chunk_records)
+        rejected.extend(chunk_rejected)
+
+    table = ImportedRefs(refs_file)
+    # Giữ khóa từ lúc lọc trùng tới khi lưu xong để hai lần nhập song song không cùng thêm một ref
+    with file_lock(refs_file):
+        data = table.load()
+        seen = set(data.get(kind, ()))
+        fresh = []
+        for line_no, record in records:
+            if record["ref"] in seen:
+                rejected.append((line_no, f"Trùng mã tham chiếu {record['ref']}", record["ref"]))
+                continue
+            seen.add(record["ref"])
+            fresh.append(record)
+        if fresh:
+            bulk = db.add_invoices_bulk if kind == "invoices" else db.add_transactions_bulk
+            bulk(fresh)
+            data[kind] = data.get(kind, []) + [record["ref"] for record in fresh]
+            table.save(data)
+    rejected.sort(key=lambda item: item[0])
+    seconds = time.perf_counter() - start
+    total = len(fresh) + len(rejected)
+    return {"imported": len(fresh), "rejected": rejected, "seconds": seconds,
+            "rows_per_second": total / seconds if seconds else 0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(FIELDS))
+    parser.add_argument("path", help="file .csv hoặc .jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="số process phân tích (mặc định: số CPU)")
+    parser.add_argument("--rejects", help="ghi các dòng bị loại ra file CSV")
+    args = parser.parse_args()
+
+    from gui import database
+    database.create_files()
+    report = import_file(database, args.kind, args.path, args.workers)
+    print(f"Đã nhập {report['imported']:,} dòng, loại {len(report['rejected']):,} dòng trong "
+          f"{report['seconds']:.2f}s ({report['rows_per_second']:,.0f} dòng/s)")
+    for line_no, reason, content in report["rejected"][:20]:
+        print(f"  dòng {line_no}: {reason}")
+    if len(report["rejected"]) > 20:
+        print(f"  ... và {len(report['rejected']) - 20:,} dòng khác")
+    if args.rejects:
+        with open(args.rejects, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Dòng", "Lý do", "Nội dung"])
+            writer.writerows(report["rejected"])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
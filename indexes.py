@@ -0,0 +1,150 @@
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+
+_DAY = re.compile(r"\d{4}-\d{2}-\d{2}(?!\d)")
+
+@lru_cache(maxsize=4096)
+def _valid_day(text):
+    try:
+        datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+def date_key(value):
+    # Ngày lưu dạng chuỗi "YYYY-MM-DD HH:MM[:SS]" nên so sánh chuỗi là đúng thứ tự thời gian;
+    # chuỗi không bắt đầu bằng ngày hợp lệ ("không rõ", "2024-13-45") coi như không có ngày
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, str) and _DAY.match(value) and _valid_day(value[:10]):
+        return value
+    return None
+
+def date_bounds(start_date="", end_date=""):
+    """Kiểm tra khoảng ngày lọc (YYYY-MM-DD) một lần và trả về cận dưới/cận trên dạng chuỗi"""
+    start_date = (start_date or "").strip()
+    end_date = (end_date or "").strip()
+    lower = upper = None
+    if start_date:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        lower = start_date
+    if end_date:
+        datetime.strptime(end_date, "%Y-%m-%d")
+        upper = end_date + " 23:59:59"
+    return lower, upper
+
+class DateIndex:
+    """Danh sách ngày đã sắp xếp kèm vị trí dòng, lọc khoảng ngày bằng bisect"""
+
+    def __init__(self, dates=()):
+        pairs = sorted((key, position) for position, key in enumerate(map(date_key, dates)) if key is not None)
+        self._dates = [key for key, _ in pairs]
+        self._positions = [position for _, position in pairs]
+
+    def __len__(self):
+        return len(self._dates)
+
+    def add(self, date, position):
+        key = date_key(date)
+        if key is None:
+            return
+        # Bản ghi mới thường có ngày lớn nhất nên chỉ cần nối vào cuối
+        if not self._dates or key >= self._dates[-1]:
+            self._dates.append(key)
+            self._positions.append(position)
+        else:
+            i = bisect_right(self._dates, key)
+            self._dates.insert(i, key)
+            self._positions.insert(i, position)
+
+    def positions(self, lower=None, upper=None):
+        """Vị trí các dòng có ngày trong [lower, upper], theo thứ tự dòng trong file"""
+        lo = bisect_left(self._dates, lower) if lower is not None else 0
+        hi = bisect_right(self._dates, upper) if upper is not None else len(self._dates)
+        return sorted(self._positions[lo:hi])
+
+@lru_cache(maxsize=65536)
+def fold(text):
+    """Bỏ dấu tiếng Việt và chữ hoa: "Nguyễn Đức" -> "nguyen duc" """
+    text = unicodedata.normalize("NFD", str(text)).replace("đ", "d").replace("Đ", "D")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+class NgramIndex:
+    """Chỉ mục trigram trên chuỗi đã bỏ dấu, tìm chuỗi con không phân biệt dấu và chữ hoa.
+
+    Các chuỗi giống nhau (tên khách hàng lặp lại) chỉ được đánh chỉ mục một lần;
+    mỗi chuỗi giữ tập vị trí các dòng có chuỗi đó.
+    """
+
+    N = 3
+
+    def __init__(self, texts=()):
+        self._text_ids = {}
+        self._texts = []
+        self._positions = []
+        self._row_text = []
+        self._postings = {}
+        for position, text in enumerate(texts):
+            self.add(position, text)
+
+    def _grams(self, folded):
+        return {folded[i:i + self.N] for i in range(len(folded) - self.N + 1)}
+
+    def add(self, position, text):
+        folded = fold(text) if text is not None else ""
+        text_id = self._text_ids.get(folded)
+        if text_id is None:
+            text_id = len(self._texts)
+            self._text_ids[folded] = text_id
+            self._texts.append(folded)
+            self._positions.append(set())
+            for gram in self._grams(folded):
+                self._postings.setdefault(gram, set()).add(text_id)
+        self._positions[text_id].add(position)
+        if position >= len(self._row_text):
+            self._row_text.extend([None] * (position + 1 - len(self._row_text)))
+        self._row_text[position] = text_id
+
+    def remove(self, position):
+        if position < len(self._row_text) and self._row_text[position] is not None:
+            self._positions[self._row_text[position]].discard(position)
+            self._row_text[position] = None
+
+    def update(self, position, text):
+        self.remove(position)
+        self.add(position, text)
+
+    def _matching_texts(self, query):
+        if len(query) < self.N:
+            return [text_id for text_id, text in enumerate(self._texts) if query in text]
+        grams = sorted(self._grams(query), key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = self._postings.get(grams[0])
+        if not candidates:
+            return []
+        for gram in grams[1:]:
+            candidates = candidates & self._postings.get(gram, set())
+            if not candidates:
+                return []
+        # Trigram khớp chưa đủ: kiểm tra lại chuỗi con trên chuỗi gốc đã bỏ dấu
+        return [text_id for text_id in candidates if query in self._texts[text_id]]
+
+    def search(self, keyword):
+        """Vị trí (tăng dần) các dòng chứa keyword"""
+        query = fold(keyword)
+        if not query:
+            return [position for position, text_id in enumerate(self._row_text) if text_id is not None]
+        positions = []
+        for text_id in self._matching_texts(query):
+            positions.extend(self._positions[text_id])
+        positions.sort()
+        return positions
+
+    def filter(self, positions, keyword):
+        """Giữ lại các vị trí (trong danh sách cho trước) có chứa keyword"""
+        query = fold(keyword)
+        row_text, texts = self._row_text, self._texts
+        return [position for position in positions
+                if row_text[position] is not None and query in texts[row_text[position]]]
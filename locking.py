@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class LockTimeout(TimeoutError):
+    pass
+
+# Khóa đang giữ của từng luồng: khóa lồng nhau trên cùng file không tự chặn chính mình
+_held = threading.local()
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def file_lock(path, timeout=30.0, delay=0.005, max_delay=0.2):
+    """Khóa ghi (advisory) giữa các tiến trình qua file path + ".lock".
+
+    Chờ với thời gian tăng dần (backoff) tới timeout rồi báo LockTimeout;
+    timeout=0 chỉ thử một lần.
+    """
+    lock_path = os.path.abspath(path) + ".lock"
+    counts = getattr(_held, "counts", None)
+    if counts is None:
+        counts = _held.counts = {}
+    if counts.get(lock_path):
+        counts[lock_path] += 1
+        try:
+            yield
+        finally:
+            counts[lock_path] -= 1
+        return
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"Không khóa được {path} sau {timeout} giây")
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        counts[lock_path] = 1
+        try:
+            yield
+        finally:
+            counts[lock_path] = 0
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+def retry(fn, *args, attempts=5, delay=0.05, exceptions=(PermissionError,), **kwargs):
+    """Gọi lại fn khi gặp lỗi tạm thời (Windows không cho thay file đang được mở để đọc)"""
+    for attempt in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except exceptions:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay * 2 ** attempt)
+
+def temp_path(path):
+    # Tên tạm riêng cho từng tiến trình/luồng, cùng thư mục để os.replace là thao tác nguyên tử
+    base, ext = os.path.splitext(path)
+    return f"{base}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+
+def replace(tmp, path):
+    retry(os.replace, tmp, path)
+
+@contextmanager
+def atomic_write(path, mode='w', **kwargs):
+    """Ghi vào file tạm, fsync rồi os.replace: người đọc chỉ thấy file cũ hoặc file mới hoàn chỉnh"""
+    tmp = temp_path(path)
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -1,16 +1,20 @@
 import tkinter as tk
 from tkinter import messagebox
-import openpyxl
 
 def check_credentials(username, password):
-    wb = openpyxl.load_workbook("users.xlsx")
-    ws = wb.active
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if row[0] == username and row[1] == password:
-            return True
+    import openpyxl
+    wb = openpyxl.load_workbook("users.xlsx", read_only=True)
+    try:
+        ws = wb.active
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            if row[0] == username and row[1] == password:
+                return True
+    finally:
+        wb.close()
     return False
 
-def show_login_window(on_success):
+def create_login_window(on_success, wait=None):
+    # wait(): chờ khởi tạo file dữ liệu (chạy nền) xong trước khi kiểm tra mật khẩu
     login = tk.Tk()
     login.title("Đăng nhập")
 
@@ -25,6 +29,12 @@ def show_login_window(on_success):
     def login_action():
         u = username_entry.get()
         p = password_entry.get()
+        if wait is not None:
+            try:
+                wait()
+            except Exception as e:
+                messagebox.showerror("Lỗi", f"Không khởi tạo được dữ liệu: {e}")
+                return
         if check_credentials(u, p):
             login.destroy()
             on_success()
@@ -32,4 +42,7 @@ def show_login_window(on_success):
             messagebox.showerror("Lỗi", "Sai tài khoản hoặc mật khẩu")
 
     tk.Button(login, text="Đăng nhập", command=login_action).grid(row=2, column=0, columnspan=2, pady=10)
-    login.mainloop()
\ No newline at end of file
+    return login
+
+def show_login_window(on_success, wait=None):
+    create_login_window(on_success, wait).mainloop()
\ No newline at end of file
@@ -1,15 +1,48 @@
+import threading
 import tkinter as tk
-import database
 import login
-from gui import MisaApp
 
-database.create_files()
-database.init_user_file()
+def init_files():
+    import database
+    database.create_files()
+    database.init_user_file()
+    # Nạp sẵn giao diện chính trong lúc người dùng nhập mật khẩu
+    import gui
 
-def run_app():
+class InitThread(threading.Thread):
+    """Chạy init_files ở nền; lỗi trong luồng được giữ lại và ném lại khi join()"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.error = None
+
+    def run(self):
+        try:
+            init_files()
+        except BaseException as e:
+            self.error = e
+
+    def join(self, timeout=None):
+        super().join(timeout)
+        if self.error is not None:
+            raise self.error
+
+def start_init():
+    # Khởi tạo file chạy nền để cửa sổ đăng nhập hiện ngay
+    thread = InitThread()
+    thread.start()
+    return thread
+
+def create_app():
+    from gui import MisaApp
     root = tk.Tk()
     app = MisaApp(root)
+    return root, app
+
+def run_app():
+    root, app = create_app()
     root.mainloop()
 
 if __name__ == "__main__":
-    login.show_login_window(run_app)
\ No newline at end of file
+    init = start_init()
+    login.show_login_window(run_app, wait=init.join)
\ No newline at end of file
@@ -0,0 +1,201 @@
+class PagedTreeview:
+    """Treeview ảo: chỉ dựng các dòng đang hiển thị, dữ liệu được tải theo trang khi cuộn.
+
+    fetch(offset, limit, sort_by, descending) phải trả về (tổng số dòng, danh sách dòng).
+    sort_keys ánh xạ tên cột của Treeview sang khóa sắp xếp của truy vấn.
+    Nếu có dispatcher, các trang được tải trên luồng nền; dòng chưa tải hiển thị "…".
+    """
+
+    PLACEHOLDER = ("…",)
+
+    def __init__(self, tree, scrollbar, fetch, sort_keys, format_row=None,
+                 page_size=200, cached_pages=8, row_height=25, dispatcher=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch = fetch
+        self.sort_keys = sort_keys
+        self.format_row = format_row or (lambda row: row)
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.row_height = row_height
+        self.dispatcher = dispatcher
+        self.sort_by = None
+        self.descending = False
+        self.first = 0
+        self.total = 0
+        self._pages = {}
+        self._loading = set()
+        self._generation = 0
+        self._headings = {col: tree.heading(col, "text") for col in sort_keys}
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", lambda e: self.render())
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows()))
+        tree.bind("<Next>", lambda e: self.scroll(self.visible_rows()))
+        for col in sort_keys:
+            tree.heading(col, command=lambda c=col: self.toggle_sort(c))
+
+    @property
+    def loading(self):
+        """Còn trang đang được tải trên luồng nền"""
+        return bool(self._loading)
+
+    def visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget("height"))
+        # Trừ phần tiêu đề cột
+        return max(1, (height - self.row_height) // self.row_height)
+
+    def refresh(self):
+        """Bỏ các trang đã tải và vẽ lại (sau khi dữ liệu hoặc bộ lọc thay đổi)"""
+        self._generation += 1
+        self._pages.clear()
+        self._loading.clear()
+        number = self.first // self.page_size
+        if self.dispatcher is None:
+            self._store(number, self.fetch(number * self.page_size, self.page_size,
+                                           self.sort_by, self.descending))
+            self._clamp()
+            return
+        generation = self._generation
+        self._loading.add(number)
+        self.dispatcher.read(self.fetch, number * self.page_size, self.page_size,
+                             self.sort_by, self.descending, key=("refresh", id(self)),
+                             on_done=lambda result: self._loaded(generation, number, result, True))
+
+    def append(self, rows):
+        """Thêm các dòng vừa ghi vào cuối danh sách mà không tải lại (chỉ đúng khi đang sắp theo id tăng dần).
+
+        Trang cuối đã tải thì nối thêm tại chỗ; đang xem cuối danh sách thì cuộn theo dòng mới.
+        """
+        if self._loading:
+            # Trang đang tải có thể đã hoặc chưa có các dòng này: tải lại cho chắc
+            self.refresh()
+            return
+        at_end = self.first + self.visible_rows() >= self.total
+        for row in rows:
+            number, offset = divmod(self.total, self.page_size)
+            page = self._pages.get(number)
+            if page is not None:
+                if len(page) == offset:
+                    # Tạo list mới: trang có thể là kết quả đang nằm trong bộ nhớ đệm của database
+                    self._pages[number] = [*page, row]
+                else:
+                    del self._pages[number]
+            self.total += 1
+        if at_end:
+            self.first = max(0, self.total - self.visible_rows())
+        self.render()
+
+    def _clamp(self):
+        self.first = min(self.first, max(0, self.total - self.visible_rows()))
+        self.render()
+
+    def _store(self, number, result):
+        self.total, page = result
+        while len(self._pages) >= self.cached_pages:
+            self._pages.pop(next(iter(self._pages)))
+        self._pages[number] = page
+        return page
+
+    def _loaded(self, generation, number, result, refreshed=False):
+        if generation != self._generation:
+            return
+        self._loading.discard(number)
+        self._store(number, result)
+        if refreshed:
+            self._clamp()
+        else:
+            self.render()
+
+    def toggle_sort(self, col):
+        key = self.sort_keys[col]
+        if self.sort_by == key:
+            self.descending = not self.descending
+        else:
+            self.sort_by, self.descending = key, False
+        for name, text in self._headings.items():
+            arrow = (" ▼" if self.descending else " ▲") if self.sort_keys[name] == key else ""
+            self.tree.heading(name, text=text + arrow)
+        self.first = 0
+        self.refresh()
+
+    def _page(self, number):
+        page = self._pages.pop(number, None)
+        if page is not None:
+            # Đưa trang vừa dùng về cuối để loại trang cũ nhất trước (LRU)
+            self._pages[number] = page
+            return page
+        args = (number * self.page_size, self.page_size, self.sort_by, self.descending)
+        if self.dispatcher is None:
+            return self._store(number, self.fetch(*args))
+        if number not in self._loading:
+            self._loading.add(number)
+            generation = self._generation
+            self.dispatcher.read(self.fetch, *args,
+                                 on_done=lambda result: self._loaded(generation, number, result))
+        return None
+
+    def rows(self, start, count):
+        result = []
+        while count > 0 and start < self.total:
+            number, offset = divmod(start, self.page_size)
+            page = self._page(number)
+            if page is None:
+                # Trang đang tải: giữ chỗ, vẽ lại khi có dữ liệu
+                size = min(count, self.page_size - offset, self.total - start)
+                result.extend([None] * size)
+                start += size
+                count -= size
+                continue
+            chunk = page[offset:offset + count]
+            if not chunk:
+                break
+            result.extend(chunk)
+            start += len(chunk)
+            count -= len(chunk)
+        return result
+
+    def render(self):
+        visible = self.visible_rows()
+        rows = [self.PLACEHOLDER if row is None else self.format_row(row)
+                for row in self.rows(self.first, visible)]
+        items = self.tree.get_children()
+        # Dùng lại các item sẵn có thay vì xóa rồi tạo lại
+        for item, values in zip(items, rows):
+            self.tree.item(item, values=values)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        for values in rows[len(items):]:
+            self.tree.insert("", "end", values=values)
+        if self.total:
+            self.scrollbar.set(self.first / self.total, min(1.0, (self.first + visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def move_to(self, first):
+        first = max(0, min(first, self.total - self.visible_rows()))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def scroll(self, delta):
+        self.move_to(self.first + delta)
+        return "break"
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.move_to(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_rows()
+            self.scroll(amount)
+
+    def _on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
@@ -0,0 +1,98 @@
+"""Phân trang theo keyset cho page_* của database.py, gui.Database và sqlite_store.
+
+Mỗi trang trả về (các dòng, cursor); cursor là chuỗi base64 mờ chứa giá trị cột sắp xếp và ID
+của dòng cuối trang, trang sau bắt đầu ngay sau dòng đó. Khác với offset, thêm/xóa dòng giữa
+hai lần gọi không làm lặp hay sót dòng, và không phải đếm lại từ đầu bảng. Thứ tự luôn là
+(giá trị cột, ID), giảm dần thì đảo cả hai; cursor là None khi đã hết dòng.
+"""
+import base64
+import heapq
+import json
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from indexes import fold
+
+def sort_value(value):
+    # Sắp xếp chuỗi theo dạng bỏ dấu; số đứng trước chuỗi, ô trống đứng cuối
+    if value is None:
+        return (2, 0)
+    if isinstance(value, str):
+        return (1, fold(value))
+    return (0, value)
+
+def sort_key(sort_by):
+    return lambda row: (sort_value(getattr(row, sort_by)), row.id)
+
+def encode_cursor(sort_by, descending, value, record_id):
+    data = json.dumps([sort_by, bool(descending), value, record_id], ensure_ascii=False,
+                      separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, sort_by, descending):
+    """(giá trị cột, ID) của dòng cuối trang trước; ValueError nếu cursor hỏng hoặc khác thứ tự"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, value, record_id = json.loads(data)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor không hợp lệ") from None
+    if not isinstance(record_id, int):
+        raise ValueError("Cursor không hợp lệ")
+    if cursor_sort != sort_by or cursor_descending != bool(descending):
+        raise ValueError("Cursor thuộc một thứ tự sắp xếp khác")
+    return value, record_id
+
+def validate(sort_by, fields, limit):
+    if sort_by not in fields:
+        raise ValueError(f"Không sắp xếp được theo cột {sort_by}")
+    if limit < 1:
+        raise ValueError("limit phải lớn hơn 0")
+
+def _result(rows, sort_by, limit, descending):
+    # rows có thêm một dòng nếu còn trang sau
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort_by, descending, getattr(last, sort_by), last.id)
+
+def after(rows, sort_by, limit, cursor=None, descending=False, keep=None):
+    """Tối đa limit + 1 dòng ngay sau cursor, theo thứ tự trang, của danh sách đã xếp tăng dần
+    theo (sort_value(cột), id): tìm vị trí bằng bisect. Bỏ qua tombstone (.deleted) và các dòng
+    keep(row) trả về False."""
+    key = sort_key(sort_by)
+    if cursor is None:
+        start = len(rows) if descending else 0
+    else:
+        value, record_id = decode_cursor(cursor, sort_by, descending)
+        mark = (sort_value(value), record_id)
+        start = bisect_left(rows, mark, key=key) if descending else bisect_right(rows, mark, key=key)
+    chosen = []
+    for i in (range(start - 1, -1, -1) if descending else range(start, len(rows))):
+        if not rows[i].deleted and (keep is None or keep(rows[i])):
+            chosen.append(rows[i])
+            if len(chosen) > limit:
+                break
+    return chosen
+
+def scan(rows, sort_by, limit, cursor=None, descending=False):
+    """Như after() cho các dòng chưa sắp xếp (có thể là luồng): một lượt duyệt, chỉ giữ limit + 1 dòng"""
+    key = sort_key(sort_by)
+    if cursor is not None:
+        value, record_id = decode_cursor(cursor, sort_by, descending)
+        mark = (sort_value(value), record_id)
+        rows = (row for row in rows if (key(row) < mark if descending else key(row) > mark))
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    return pick(limit + 1, rows, key=key)
+
+def page(rows, sort_by, limit, cursor=None, descending=False):
+    """Trang của danh sách đã xếp tăng dần theo (sort_value(cột), id), xem after()"""
+    return _result(after(rows, sort_by, limit, cursor, descending), sort_by, limit, descending)
+
+def scan_page(rows, sort_by, limit, cursor=None, descending=False):
+    """Trang của các dòng chưa sắp xếp, xem scan()"""
+    return _result(scan(rows, sort_by, limit, cursor, descending), sort_by, limit, descending)
+
+def merge_page(runs, sort_by, limit, descending=False):
+    """Trang ghép từ nhiều dãy (mỗi phân vùng một dãy từ after() hoặc scan(), cùng thứ tự trang)"""
+    rows = heapq.merge(*runs, key=sort_key(sort_by), reverse=descending)
+    return _result(list(islice(rows, limit + 1)), sort_by, limit, descending)
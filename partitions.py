@@ -0,0 +1,91 @@
+import json
+import os
+import re
+from indexes import date_key
+from locking import atomic_write, file_lock
+
+MANIFEST_FILE = "partitions.json"
+
+# Phân vùng của các dòng không có ngày hợp lệ; luôn được đọc vì không biết chúng thuộc tháng nào
+UNDATED = "khac"
+
+_MONTH = re.compile(r"\d{4}-\d{2}(?=-|$)")
+
+_instances = {}
+
+def open_manifest(path=MANIFEST_FILE):
+    # Dùng chung một đối tượng cho mỗi file như aggregates.open_aggregates
+    key = os.path.abspath(path)
+    if key not in _instances:
+        _instances[key] = Manifest(path)
+    return _instances[key]
+
+def month_of(date):
+    """Tháng "YYYY-MM" của một ngày (chuỗi hoặc datetime), UNDATED nếu không đọc được"""
+    key = date_key(date)
+    match = _MONTH.match(key) if key else None
+    return match.group(0) if match else UNDATED
+
+def partition_file(base, month):
+    """sales.xlsx, "2025-04" -> sales_2025-04.xlsx"""
+    root, ext = os.path.splitext(base)
+    return f"{root}_{month}{ext}"
+
+def overlaps(month, lower=None, upper=None):
+    # lower/upper như indexes.date_bounds: "YYYY-MM-DD" và "YYYY-MM-DD 23:59:59"
+    if month == UNDATED:
+        return True
+    return (lower is None or month >= lower[:7]) and (upper is None or month <= upper[:7])
+
+class Manifest:
+    """Các phân vùng theo tháng của từng bảng (khóa là tên file gốc, vd. "sales.xlsx").
+
+    Tổng của mỗi phân vùng nằm trong aggregates.json theo tên file phân vùng, nên phân vùng
+    đã đóng (không còn được ghi) luôn có sẵn tổng và không phải mở lại khi thống kê.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._stamp = None
+
+    def _load(self):
+        # Đọc lại khi tiến trình khác đã thêm phân vùng
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if self._data is None or stamp != self._stamp:
+            try:
+                with open(self.path, 'r') as f:
+                    self._data = json.load(f)
+            except (FileNotFoundError, PermissionError, ValueError):
+                self._data = {}
+            self._stamp = stamp
+        return self._data
+
+    def _save(self):
+        with atomic_write(self.path) as f:
+            json.dump(self._data, f, indent=1, sort_keys=True)
+        st = os.stat(self.path)
+        self._stamp = (st.st_mtime_ns, st.st_size)
+
+    def months(self, table):
+        """{tháng: file phân vùng} của bảng"""
+        return dict(self._load().get(table, {}))
+
+    def files(self, table, lower=None, upper=None):
+        """File các phân vùng giao với khoảng ngày, theo thứ tự tháng"""
+        return [file for month, file in sorted(self._load().get(table, {}).items())
+                if overlaps(month, lower, upper)]
+
+    def register(self, table, months):
+        """Ghi nhận các phân vùng (tháng -> file) chưa có; trả về {tháng: file} đầy đủ của bảng"""
+        with file_lock(self.path):
+            entries = self._load().setdefault(table, {})
+            missing = {month: file for month, file in months.items() if month not in entries}
+            if missing:
+                entries.update(missing)
+                self._save()
+            return dict(entries)
@@ -0,0 +1,131 @@
+"""Đo thời gian và khối lượng I/O của từng thao tác dữ liệu.
+
+Bật bằng biến môi trường MISA_PROFILE=1. Khi tắt, instrument() không bọc hàm nào
+và các hàm count_* không làm gì, nên gần như không tốn chi phí.
+Mỗi lần gọi được ghi một dòng JSON vào operations.jsonl (xoay vòng theo kích thước).
+"""
+import inspect
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+ENABLED = os.environ.get("MISA_PROFILE", "") not in ("", "0")
+LOG_FILE = os.environ.get("MISA_PROFILE_LOG", "operations.jsonl")
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+_local = threading.local()
+_lock = threading.Lock()
+_stats = {}
+_log = None
+
+def _frames():
+    return getattr(_local, "frames", None)
+
+if ENABLED:
+    def count_rows(n):
+        # Cộng cho mọi thao tác đang chạy (thao tác lồng nhau cũng tính dòng của thao tác con)
+        for frame in _frames() or ():
+            frame["rows"] += n
+
+    def count_read(n):
+        for frame in _frames() or ():
+            frame["bytes_read"] += n
+
+    def count_written(n):
+        for frame in _frames() or ():
+            frame["bytes_written"] += n
+else:
+    def count_rows(n):
+        pass
+
+    def count_read(n):
+        pass
+
+    def count_written(n):
+        pass
+
+def _write_log(record):
+    global _log
+    if _log is None:
+        _log = open(LOG_FILE, 'a', encoding='utf-8')
+    _log.write(json.dumps(record, ensure_ascii=False) + "\n")
+    _log.flush()
+    if _log.tell() >= LOG_MAX_BYTES:
+        _log.close()
+        _log = None
+        for i in range(LOG_BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{LOG_FILE}.{i}"):
+                os.replace(f"{LOG_FILE}.{i}", f"{LOG_FILE}.{i + 1}")
+        os.replace(LOG_FILE, f"{LOG_FILE}.1")
+
+def _record(name, frame, elapsed_ms):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = {"op": name, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                    "rows": 0, "bytes_read": 0, "bytes_written": 0}
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        for field in ("rows", "bytes_read", "bytes_written"):
+            stats[field] += frame[field]
+        try:
+            _write_log(dict(frame, op=name, ts=time.time(), ms=round(elapsed_ms, 3),
+                            thread=threading.current_thread().name))
+        except OSError:
+            # Không ghi được log thì vẫn giữ số liệu trong bộ nhớ
+            pass
+
+def profiled(fn, name):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        frames = _frames()
+        if frames is None:
+            frames = _local.frames = []
+        frame = {"rows": 0, "bytes_read": 0, "bytes_written": 0}
+        frames.append(frame)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            frames.pop()
+            _record(name, frame, elapsed_ms)
+    return wrapper
+
+def _wrappable(fn):
+    # Bỏ qua context manager (batch): bọc chỉ đo được lúc tạo đối tượng
+    return inspect.isfunction(fn) and not inspect.isgeneratorfunction(getattr(fn, "__wrapped__", None))
+
+def instrument(target, sources=None):
+    """Bọc mọi hàm công khai của một module hoặc class; không làm gì khi đang tắt"""
+    if not ENABLED:
+        return target
+    if inspect.isclass(target):
+        for attr, fn in list(vars(target).items()):
+            if not attr.startswith("_") and _wrappable(fn):
+                setattr(target, attr, profiled(fn, f"{target.__name__}.{attr}"))
+        return target
+    sources = sources or (target.__name__,)
+    prefix = target.__name__.rsplit(".", 1)[-1]
+    for attr, fn in list(vars(target).items()):
+        # iter_* trả về generator: thời gian thật nằm ở nơi duyệt, không ở lúc gọi
+        if attr.startswith(("_", "iter_")):
+            continue
+        if _wrappable(fn) and fn.__module__ in sources:
+            setattr(target, attr, profiled(fn, f"{prefix}.{attr}"))
+    return target
+
+def snapshot():
+    """Số liệu cộng dồn của từng thao tác, chậm nhất (theo thời gian tối đa) trước"""
+    with _lock:
+        rows = [dict(stats, mean_ms=stats["total_ms"] / stats["calls"]) for stats in _stats.values()]
+    rows.sort(key=lambda stats: stats["max_ms"], reverse=True)
+    return rows
+
+def reset():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+class QueryCache:
+    """LRU kết quả truy vấn đọc (search_*, tổng, truy vấn theo trang).
+
+    Mỗi bảng có một thế hệ tăng sau mỗi lần ghi (bump). Một kết quả chỉ được dùng lại khi
+    thế hệ và phiên bản bảng (chữ ký file, do nơi gọi truyền vào để nhận ra tiến trình khác ghi)
+    vẫn y như lúc tính, nên không bao giờ trả về dữ liệu cũ.
+    Giới hạn theo số kết quả (max_entries) và tổng số dòng đang giữ (max_rows).
+    """
+
+    def __init__(self, max_entries=128, max_rows=2000000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._rows = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def generation(self, table):
+        return self._generations.get(table, 0)
+
+    def bump(self, table):
+        """Gọi sau mỗi lần ghi vào table: bỏ ngay các kết quả của bảng đó"""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [key for key in self._entries if key[0] == table]:
+                self._remove(key)
+
+    def cached(self, table, key, compute, version=None):
+        """Kết quả của compute() cho khóa (table, *key), tính lại khi bảng đã đổi"""
+        key = (table,) + tuple(key)
+        # Lấy thế hệ trước khi tính: bảng bị ghi trong lúc tính thì kết quả không được dùng lại
+        stamp = (self.generation(table), version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        self._put(key, stamp, value)
+        return value
+
+    def _put(self, key, stamp, value):
+        size = len(value) if isinstance(value, (list, tuple)) else 1
+        if size > self.max_rows:
+            return
+        with self._lock:
+            if stamp[0] != self.generation(key[0]):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (stamp, value, size)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self._rows -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "entries": len(self._entries), "rows": self._rows, "evictions": self.evictions,
+                    "max_entries": self.max_entries, "max_rows": self.max_rows}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,145 @@
+"""Bản ghi hóa đơn, giao dịch, sản phẩm dùng chung cho gui.Database và database.py.
+
+Mỗi bản ghi dùng __slots__ thay cho dict (gui.Database) hay tuple trần (database.py), nên nhẹ hơn
+dict nhiều lần khi giữ cả bảng trong bộ nhớ (xem bench_memory.py). Để không phải sửa nơi gọi,
+bản ghi vẫn đọc được như dict (r["customer"], r.get("deleted"), dict(r)) và như tuple
+(r[0], id, date, *_ = r, len(r)). Tên khách hàng và loại giao dịch được intern: các dòng
+trùng giá trị dùng chung một chuỗi.
+"""
+import sys
+
+_intern = sys.intern
+
+def _interned(value):
+    return _intern(value) if type(value) is str else value
+
+class Record:
+    __slots__ = ()
+    # Thứ tự các cột, cũng là thứ tự khi đọc như tuple
+    FIELDS = ()
+    # Chỉ sản phẩm có tombstone; các loại khác luôn đọc được .deleted là False
+    deleted = False
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return getattr(self, self.FIELDS[key])
+        if isinstance(key, slice):
+            return tuple(self)[key]
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.FIELDS
+
+    def __iter__(self):
+        return (getattr(self, field) for field in self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, tuple):
+            return tuple(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(map(repr, self))})"
+
+    def copy(self):
+        new = object.__new__(type(self))
+        for name in type(self).__slots__:
+            setattr(new, name, getattr(self, name))
+        return new
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Dựng từ dict (cũng dùng làm object_hook khi đọc JSON)"""
+        return cls(*map(data.get, cls.FIELDS))
+
+    @classmethod
+    def from_row(cls, row):
+        """Dựng từ một dòng Excel; thiếu cột thì để None, thừa cột thì bỏ"""
+        values = tuple(row[:len(cls.FIELDS)])
+        return cls(*values, *(None,) * (len(cls.FIELDS) - len(values)))
+
+class Invoice(Record):
+    __slots__ = ("id", "date", "customer", "total")
+    FIELDS = __slots__
+
+    def __init__(self, id, date, customer, total):
+        self.id = id
+        self.date = date
+        self.customer = _interned(customer)
+        self.total = total
+
+    @classmethod
+    def from_dict(cls, data):
+        get = data.get
+        return cls(get("id"), get("date"), get("customer"), get("total"))
+
+class Transaction(Record):
+    __slots__ = ("id", "date", "type", "amount", "description")
+    FIELDS = __slots__
+
+    def __init__(self, id, date, type, amount, description):
+        self.id = id
+        self.date = date
+        self.type = _interned(type)
+        self.amount = amount
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data):
+        get = data.get
+        return cls(get("id"), get("date"), get("type"), get("amount"), get("description"))
+
+class Product(Record):
+    __slots__ = ("id", "name", "quantity", "price", "supplier", "deleted")
+    FIELDS = ("id", "name", "quantity", "price", "supplier")
+
+    def __init__(self, id, name, quantity, price, supplier=None, deleted=False):
+        self.id = id
+        self.name = name
+        self.quantity = quantity
+        self.price = price
+        self.supplier = _interned(supplier)
+        self.deleted = deleted
+
+    @classmethod
+    def tombstone(cls, product_id):
+        return cls(product_id, None, None, None, deleted=True)
+
+    def to_dict(self):
+        # Giữ dạng JSON cũ: tombstone chỉ có id, không ghi supplier khi trống
+        if self.deleted:
+            return {"id": self.id, "deleted": True}
+        data = {"id": self.id, "name": self.name, "quantity": self.quantity, "price": self.price}
+        if self.supplier is not None:
+            data["supplier"] = self.supplier
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        get = data.get
+        return cls(get("id"), get("name"), get("quantity"), get("price"), get("supplier"), bool(get("deleted")))
+
+def to_json(value):
+    """Hàm default= cho json.dump/json.dumps"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
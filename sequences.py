@@ -0,0 +1,47 @@
+import json
+import os
+from locking import atomic_write, file_lock
+
+SEQUENCES_FILE = "sequences.json"
+
+_instances = {}
+
+def open_sequences(path=SEQUENCES_FILE):
+    # Dùng chung một đối tượng cho mỗi file như aggregates.open_aggregates
+    key = os.path.abspath(path)
+    if key not in _instances:
+        _instances[key] = Sequences(path)
+    return _instances[key]
+
+class Sequences:
+    """ID cuối cùng đã cấp của từng bảng; ID đã cấp không bao giờ bị dùng lại kể cả sau khi xóa"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, data):
+        with atomic_write(self.path) as f:
+            json.dump(data, f)
+
+    def allocate(self, table, count=1, floor=None):
+        """Cấp count ID liên tiếp và trả về ID đầu tiên.
+
+        floor() trả về ID lớn nhất đang có trong dữ liệu; chỉ được gọi khi bảng chưa có
+        sequence (lần đầu hoặc mất file), để không cấp trùng ID cũ.
+        """
+        # Luôn đọc lại trong khóa: nhiều máy bán hàng dùng chung một sequences.json
+        with file_lock(self.path):
+            data = self._load()
+            last = data.get(table)
+            if last is None:
+                last = floor() if floor is not None else 0
+            data[table] = last + count
+            self._save(data)
+        return last + 1
@@ -0,0 +1,735 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime
+from indexes import date_bounds, fold
+import pagination
+import profiling
+from events import ChangeBus, DELETED, INSERTED, UPDATED
+from partitions import open_manifest
+from querycache import QueryCache
+
+DB_FILE = "misa.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    quantity NUMERIC,
+    price NUMERIC,
+    supplier TEXT,
+    name_folded TEXT,
+    supplier_folded TEXT
+);
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    customer TEXT,
+    total NUMERIC,
+    customer_folded TEXT
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    type TEXT,
+    amount NUMERIC,
+    description TEXT,
+    type_folded TEXT,
+    description_folded TEXT
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    migrated_at TEXT NOT NULL,
+    row_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices(date);
+CREATE INDEX IF NOT EXISTS idx_invoices_customer ON invoices(customer);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+"""
+
+# Cột bỏ dấu (indexes.fold) lưu sẵn cạnh cột gốc, ghi cùng lúc với cột gốc;
+# tìm kiếm và sắp xếp đọc cột này thay vì gọi py_fold trên từng dòng
+FOLDED = {
+    "products": ("name", "supplier"),
+    "invoices": ("customer",),
+    "transactions": ("type", "description"),
+}
+
+# Cột tìm theo từ khóa: bảng FTS5 trigram trên cột bỏ dấu, các trigger giữ bảng này
+# khớp với bảng gốc khi thêm, sửa, xóa
+SEARCHED = {"products": "name", "invoices": "customer", "transactions": "description"}
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+    {column}_folded, content='{table}', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {table}_fts (rowid, {column}_folded) VALUES (new.id, new.{column}_folded);
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, {column}_folded) VALUES ('delete', old.id, old.{column}_folded);
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column}_folded ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, {column}_folded) VALUES ('delete', old.id, old.{column}_folded);
+    INSERT INTO {table}_fts (rowid, {column}_folded) VALUES (new.id, new.{column}_folded);
+END;
+"""
+
+# Chỉ mục (cột, id) cho từng cột sắp xếp được của page_*: trang nào cũng là một lần tìm trên
+# chỉ mục. Chỉ mục SQLite luôn kèm rowid (= id) nên idx_invoices_date, idx_transactions_date đã đủ.
+SORT_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_products_sort_name ON products(name_folded, id);
+CREATE INDEX IF NOT EXISTS idx_products_sort_quantity ON products(quantity, id);
+CREATE INDEX IF NOT EXISTS idx_products_sort_price ON products(price, id);
+CREATE INDEX IF NOT EXISTS idx_products_sort_supplier ON products(supplier_folded, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_sort_customer ON invoices(customer_folded, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_sort_total ON invoices(total, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_sort_type ON transactions(type_folded, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_sort_amount ON transactions(amount, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_sort_description ON transactions(description_folded, id);
+"""
+
+# Trigram cần FTS5 và SQLite >= 3.34; thiếu thì từ khóa được tìm bằng instr trên cột bỏ dấu
+@lru_cache(maxsize=None)
+def has_trigram():
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+# Mỗi luồng một kết nối: luồng giao diện và các luồng nền không dùng chung con trỏ
+_local = threading.local()
+
+def _connections():
+    if not hasattr(_local, "connections"):
+        _local.connections = {}
+    return _local.connections
+
+def _fold(value):
+    # lower() của SQLite chỉ xử lý ASCII; tìm kiếm bỏ dấu giống chỉ mục trigram
+    return fold(value) if value is not None else None
+
+def _upgrade(conn):
+    # CSDL tạo trước khi có cột bỏ dấu: thêm cột, điền giá trị, dựng lại bảng FTS
+    for table, columns in FOLDED.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        missing = [col for col in columns if col + "_folded" not in existing]
+        with conn:
+            for col in missing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {col}_folded TEXT")
+            if missing:
+                conn.execute(f"UPDATE {table} SET " + ", ".join(f"{col}_folded = py_fold({col})" for col in missing))
+    conn.executescript(SORT_INDEXES)
+    if not has_trigram():
+        return
+    for table, column in SEARCHED.items():
+        created = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table + "_fts",)).fetchone()
+        conn.executescript(FTS_SCHEMA.format(table=table, column=column))
+        if not created:
+            with conn:
+                conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+def connect(db_file=None):
+    db_file = db_file or DB_FILE
+    conn = _connections().get(db_file)
+    if conn is None:
+        conn = sqlite3.connect(db_file, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.create_function("py_fold", 1, _fold, deterministic=True)
+        conn.executescript(SCHEMA)
+        _upgrade(conn)
+        _connections()[db_file] = conn
+    return conn
+
+def close(db_file=None):
+    conn = _connections().pop(db_file or DB_FILE, None)
+    if conn is not None:
+        conn.close()
+
+# Truy vấn dùng chung cho cả hai API
+def _search_products(conn, keyword, columns):
+    sql, params = _product_filters(keyword, columns)
+    return conn.execute(sql + " ORDER BY id", params).fetchall()
+
+def _keyword_filter(table, keyword, clauses, params):
+    # Từ khóa từ 3 ký tự: tra bảng FTS5 trigram (chuỗi con, không quét bảng);
+    # ngắn hơn thì trigram không dùng được, so chuỗi con trên cột bỏ dấu
+    column = SEARCHED[table] + "_folded"
+    keyword = fold(keyword)
+    if len(keyword) >= 3 and has_trigram():
+        clauses.append(f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)")
+        params.append('"' + keyword.replace('"', '""') + '"')
+    else:
+        clauses.append(f"instr({column}, ?) > 0")
+        params.append(keyword)
+
+def _product_filters(keyword, columns):
+    clauses, params = [], []
+    if keyword:
+        _keyword_filter("products", keyword, clauses, params)
+    return _filtered_sql("products", columns, clauses), params
+
+def _date_filters(start_date, end_date):
+    lower, upper = date_bounds(start_date, end_date)
+    clauses, params = [], []
+    if lower is not None:
+        clauses.append("date >= ?")
+        params.append(lower)
+    if upper is not None:
+        clauses.append("date <= ?")
+        params.append(upper)
+    return clauses, params
+
+def _invoice_filters(keyword, start_date, end_date):
+    clauses, params = _date_filters(start_date, end_date)
+    if keyword:
+        _keyword_filter("invoices", keyword, clauses, params)
+    return _filtered_sql("invoices", "id, date, customer, total", clauses), params
+
+def _transaction_filters(trans_type, keyword, start_date, end_date):
+    clauses, params = _date_filters(start_date, end_date)
+    if trans_type:
+        clauses.append("type = ? COLLATE NOCASE")
+        params.append(trans_type)
+    if keyword:
+        _keyword_filter("transactions", keyword, clauses, params)
+    return _filtered_sql("transactions", "id, date, type, amount, description", clauses), params
+
+def _search_invoices(conn, keyword, start_date, end_date):
+    sql, params = _invoice_filters(keyword, start_date, end_date)
+    return conn.execute(sql + " ORDER BY date, id", params).fetchall()
+
+def _search_transactions(conn, trans_type, keyword, start_date, end_date):
+    sql, params = _transaction_filters(trans_type, keyword, start_date, end_date)
+    return conn.execute(sql + " ORDER BY date, id", params).fetchall()
+
+# Cột được phép sắp xếp cho truy vấn theo trang; chuỗi sắp theo cột bỏ dấu lưu sẵn (có chỉ mục)
+SORT_COLUMNS = {
+    "products": {"id": "id", "name": "name_folded", "quantity": "quantity", "price": "price",
+                 "supplier": "supplier_folded"},
+    "invoices": {"id": "id", "date": "date", "customer": "customer_folded", "total": "total"},
+    "transactions": {"id": "id", "date": "date", "type": "type_folded", "amount": "amount",
+                     "description": "description_folded"},
+}
+
+def _page(conn, sql, params, table, sort_by, descending, offset, limit):
+    total = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    order = SORT_COLUMNS[table][sort_by] + (" DESC" if descending else "")
+    rows = conn.execute(f"{sql} ORDER BY {order}, id LIMIT ? OFFSET ?",
+                        list(params) + [limit, offset]).fetchall()
+    return total, rows
+
+def _where(sql, clause):
+    # sql luôn do _filtered_sql dựng
+    return sql + (" AND " if " WHERE " in sql else " WHERE ") + clause
+
+def _keyset_page(conn, sql, params, table, columns, sort_by, descending, limit, cursor):
+    # Phân trang theo keyset (pagination.py): WHERE (cột, id) > (dòng cuối trang trước), dùng chỉ mục (cột, id).
+    # Ô trống xếp cuối như pagination.sort_value (đầu tiên khi giảm dần), còn so sánh với NULL thì
+    # luôn sai: các dòng có giá trị và các dòng NULL (xếp theo id) là hai đoạn truy vấn riêng.
+    pagination.validate(sort_by, columns, limit)
+    order = SORT_COLUMNS[table][sort_by]
+    op, direction = ("<", " DESC") if descending else (">", "")
+    filled = (f"{order} IS NOT NULL", [])
+    empty = (f"{order} IS NULL", []) if sort_by != "id" else None
+    if cursor is not None:
+        value, record_id = pagination.decode_cursor(cursor, sort_by, descending)
+        if value is None:
+            empty = (f"{order} IS NULL AND id {op} ?", [record_id])
+            filled = filled if descending else None
+        else:
+            mark = _fold(value) if order.endswith("_folded") else value
+            filled = (f"{order} IS NOT NULL AND ({order}, id) {op} (?, ?)", [mark, record_id])
+            empty = empty if not descending else None
+    segments = ((empty, f"id{direction}"), (filled, f"{order}{direction}, id{direction}"))
+    rows = []
+    for segment, order_by in (segments if descending else segments[::-1]):
+        if segment is None or len(rows) > limit:
+            continue
+        clause, extra = segment
+        rows += conn.execute(f"{_where(sql, clause)} ORDER BY {order_by} LIMIT ?",
+                             list(params) + extra + [limit + 1 - len(rows)]).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], pagination.encode_cursor(sort_by, descending, last[columns.index(sort_by)], last[0])
+
+def _filtered_sql(table, columns, clauses):
+    sql = f"SELECT {columns} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql
+
+def _inventory_summary(conn):
+    quantity, value = conn.execute(
+        "SELECT COALESCE(SUM(quantity), 0), COALESCE(SUM(quantity * price), 0) FROM products"
+    ).fetchone()
+    return quantity, value
+
+def _sales_summary(conn):
+    return conn.execute("SELECT COALESCE(SUM(total), 0) FROM invoices").fetchone()[0]
+
+def _accounting_summary(conn):
+    income, expense = conn.execute(
+        "SELECT COALESCE(SUM(CASE WHEN type = 'thu' COLLATE NOCASE THEN amount END), 0), "
+        "COALESCE(SUM(CASE WHEN type = 'chi' COLLATE NOCASE THEN amount END), 0) "
+        "FROM transactions"
+    ).fetchone()
+    return income, expense
+
+def _with_folded(table, columns, rows):
+    # Thêm giá trị các cột bỏ dấu vào cuối mỗi dòng
+    positions = [i for i, col in enumerate(columns) if col in FOLDED[table]]
+    columns = tuple(columns) + tuple(columns[i] + "_folded" for i in positions)
+    rows = (tuple(row) + tuple(_fold(row[i]) for i in positions) for row in rows)
+    return columns, rows
+
+def _insert_rows(conn, table, columns, rows):
+    columns, rows = _with_folded(table, columns, rows)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    with conn:
+        return [conn.execute(sql, row).lastrowid for row in rows]
+
+# API tương thích database.py (trả về tuple)
+_batch = None
+
+def _add(kind, record):
+    if _batch is not None:
+        _batch.setdefault(kind, []).append(record)
+    else:
+        _BULK[kind]([record])
+
+@contextmanager
+def batch():
+    global _batch
+    if _batch is not None:
+        yield
+        return
+    _batch = {}
+    try:
+        yield
+        pending = _batch
+    finally:
+        _batch = None
+    for kind, records in pending.items():
+        _BULK[kind](records)
+
+def add_products_bulk(records):
+    return _insert_rows(connect(), "products", ("name", "quantity", "price", "supplier"),
+                        (tuple(record) for record in records))
+
+def add_invoices_bulk(records):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    rows = ((date[0] if date else now, customer, total_amount)
+            for customer, total_amount, *date in records)
+    return _insert_rows(connect(), "invoices", ("date", "customer", "total"), rows)
+
+def add_transactions_bulk(records):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    rows = ((date[0] if date else now, transaction_type, amount, description)
+            for transaction_type, amount, description, *date in records)
+    return _insert_rows(connect(), "transactions", ("date", "type", "amount", "description"), rows)
+
+_BULK = {
+    "products": add_products_bulk,
+    "invoices": add_invoices_bulk,
+    "transactions": add_transactions_bulk
+}
+
+def create_files():
+    connect()
+
+def add_product(name, quantity, price, supplier):
+    _add("products", (name, quantity, price, supplier))
+
+def iter_products():
+    # Con trỏ SQLite trả từng dòng, không dựng cả danh sách
+    return connect().execute("SELECT id, name, quantity, price, supplier FROM products ORDER BY id")
+
+def get_products():
+    return iter_products().fetchall()
+
+def update_product(product_id, name, quantity, price, supplier):
+    conn = connect()
+    with conn:
+        conn.execute("UPDATE products SET name = ?, quantity = ?, price = ?, supplier = ?, "
+                     "name_folded = ?, supplier_folded = ? WHERE id = ?",
+                     (name, quantity, price, supplier, _fold(name), _fold(supplier), product_id))
+
+def delete_product(product_id):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+
+def search_products(keyword):
+    return _search_products(connect(), keyword, "id, name, quantity, price, supplier")
+
+def add_invoice(customer, total_amount):
+    _add("invoices", (customer, total_amount))
+
+def iter_invoices():
+    return connect().execute("SELECT id, date, customer, total FROM invoices ORDER BY id")
+
+def get_invoices():
+    return iter_invoices().fetchall()
+
+def add_transaction(transaction_type, amount, description):
+    _add("transactions", (transaction_type, amount, description))
+
+def iter_transactions():
+    return connect().execute("SELECT id, date, type, amount, description FROM transactions ORDER BY id")
+
+def get_transactions():
+    return iter_transactions().fetchall()
+
+def get_inventory_summary():
+    return _inventory_summary(connect())
+
+def get_sales_summary():
+    return _sales_summary(connect())
+
+def get_accounting_summary():
+    return _accounting_summary(connect())
+
+def verify_summaries(repair=False):
+    # Tổng được tính trực tiếp bằng SUM nên không thể bị lệch
+    return {}
+
+def search_invoices(keyword="", start_date="", end_date=""):
+    return _search_invoices(connect(), keyword, start_date, end_date)
+
+def search_transactions(trans_type="", keyword="", start_date="", end_date=""):
+    return _search_transactions(connect(), trans_type, keyword, start_date, end_date)
+
+_PRODUCT_COLUMNS = ("id", "name", "quantity", "price", "supplier")
+_INVOICE_COLUMNS = ("id", "date", "customer", "total")
+_TRANSACTION_COLUMNS = ("id", "date", "type", "amount", "description")
+
+def page_products(limit=50, cursor=None, sort_by="id", descending=False, keyword=""):
+    sql, params = _product_filters(keyword, ", ".join(_PRODUCT_COLUMNS))
+    return _keyset_page(connect(), sql, params, "products", _PRODUCT_COLUMNS, sort_by, descending, limit, cursor)
+
+def page_invoices(limit=50, cursor=None, sort_by="id", descending=False, keyword="", start_date="", end_date=""):
+    sql, params = _invoice_filters(keyword, start_date, end_date)
+    return _keyset_page(connect(), sql, params, "invoices", _INVOICE_COLUMNS, sort_by, descending, limit, cursor)
+
+def page_transactions(limit=50, cursor=None, sort_by="id", descending=False,
+                      trans_type="", keyword="", start_date="", end_date=""):
+    sql, params = _transaction_filters(trans_type, keyword, start_date, end_date)
+    return _keyset_page(connect(), sql, params, "transactions", _TRANSACTION_COLUMNS,
+                        sort_by, descending, limit, cursor)
+
+# API tương thích gui.Database (trả về dict)
+class SqliteDatabase:
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._batch = None
+        self._cache = QueryCache()
+        self.events = ChangeBus()
+
+    @property
+    def conn(self):
+        return connect(self.db_file)
+
+    def create_files(self):
+        connect(self.db_file)
+
+    def _dicts(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        keys = [col[0] for col in cursor.description]
+        return [dict(zip(keys, row)) for row in cursor]
+
+    def _version(self):
+        # Tiến trình khác ghi thì file -wal đổi; lần ghi của chính instance này tăng thế hệ của bảng
+        version = []
+        for path in (self.db_file, self.db_file + "-wal"):
+            try:
+                st = os.stat(path)
+                version.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except FileNotFoundError:
+                version.append(None)
+        return version
+
+    def _cached(self, table, key, compute):
+        return self._cache.cached(table, key, compute, version=self._version())
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+    def _add(self, bulk, record):
+        if self._batch is not None:
+            self._batch.setdefault(bulk, []).append(record)
+            return None
+        return bulk([record])[0]
+
+    @contextmanager
+    def batch(self):
+        if self._batch is not None:
+            yield
+            return
+        self._batch = {}
+        try:
+            yield
+            pending = self._batch
+        finally:
+            self._batch = None
+        for bulk, records in pending.items():
+            bulk(records)
+
+    # Các hàm xử lý hóa đơn
+    def add_invoice(self, customer, total):
+        self._add(self.add_invoices_bulk, {"customer": customer, "total": total})
+
+    def add_invoices_bulk(self, records):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(r.get("date") or now, r["customer"], r["total"]) for r in records]
+        try:
+            ids = _insert_rows(self.conn, "invoices", ("date", "customer", "total"), rows)
+        finally:
+            self._cache.bump("invoices")
+        self._inserted("invoices", ("id", "date", "customer", "total"), ids, rows)
+        return ids
+
+    def get_invoices(self):
+        return self._dicts("SELECT id, date, customer, total FROM invoices ORDER BY id")
+
+    def search_invoices(self, keyword="", start_date="", end_date=""):
+        key = ("search", fold(keyword), date_bounds(start_date, end_date))
+        return list(self._cached("invoices", key,
+                                 lambda: _search_invoices(self.conn, keyword, start_date, end_date)))
+
+    # Các hàm xử lý giao dịch
+    def add_transaction(self, t_type, amount, description):
+        self._add(self.add_transactions_bulk, {"type": t_type, "amount": amount, "description": description})
+
+    def add_transactions_bulk(self, records):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(r.get("date") or now, r["type"], r["amount"], r["description"]) for r in records]
+        try:
+            ids = _insert_rows(self.conn, "transactions", ("date", "type", "amount", "description"), rows)
+        finally:
+            self._cache.bump("transactions")
+        self._inserted("transactions", ("id", "date", "type", "amount", "description"), ids, rows)
+        return ids
+
+    def get_transactions(self):
+        return self._dicts("SELECT id, date, type, amount, description FROM transactions ORDER BY id")
+
+    def search_transactions(self, t_type="", keyword="", start_date="", end_date=""):
+        key = ("search", t_type.lower(), fold(keyword), date_bounds(start_date, end_date))
+        return list(self._cached("transactions", key,
+                                 lambda: _search_transactions(self.conn, t_type, keyword, start_date, end_date)))
+
+    # Các hàm xử lý sản phẩm
+    def get_products(self):
+        return self._dicts("SELECT id, name, quantity, price FROM products ORDER BY id")
+
+    def add_product(self, name, quantity, price):
+        return self._add(self.add_products_bulk, {"name": name, "quantity": quantity, "price": price})
+
+    def add_products_bulk(self, records):
+        rows = [(r["name"], r["quantity"], r["price"]) for r in records]
+        try:
+            ids = _insert_rows(self.conn, "products", ("name", "quantity", "price"), rows)
+        finally:
+            self._cache.bump("products")
+        self._inserted("products", ("id", "name", "quantity", "price"), ids, rows)
+        return ids
+
+    def update_product(self, product_id, name=None, quantity=None, price=None):
+        with self.conn:
+            old = self._product(product_id)
+            cursor = self.conn.execute(
+                "UPDATE products SET name = COALESCE(?, name), quantity = COALESCE(?, quantity), "
+                "price = COALESCE(?, price), name_folded = COALESCE(?, name_folded) WHERE id = ?",
+                (name, quantity, price, _fold(name), product_id))
+            new = self._product(product_id)
+        self._cache.bump("products")
+        if old is not None:
+            self.events.publish("products", UPDATED, [new], old=[old])
+        return cursor.rowcount > 0
+
+    def delete_product(self, product_id):
+        with self.conn:
+            old = self._product(product_id)
+            self.conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+        self._cache.bump("products")
+        if old is not None:
+            self.events.publish("products", DELETED, [old])
+
+    def _product(self, product_id):
+        rows = self._dicts("SELECT id, name, quantity, price FROM products WHERE id = ?", (product_id,))
+        return rows[0] if rows else None
+
+    def _inserted(self, table, columns, ids, rows):
+        self.events.publish(table, INSERTED, (dict(zip(columns, (row_id,) + row)) for row_id, row in zip(ids, rows)))
+
+    def search_products(self, keyword=""):
+        def search():
+            cursor = _search_products(self.conn, keyword, "id, name, quantity, price")
+            return [dict(zip(("id", "name", "quantity", "price"), row)) for row in cursor]
+        return list(self._cached("products", ("search", fold(keyword)), search))
+
+    # Truy vấn theo trang cho Treeview
+    def query_invoices(self, offset=0, limit=100, sort_by="id", descending=False,
+                       keyword="", start_date="", end_date=""):
+        sql, params = _invoice_filters(keyword, start_date, end_date)
+        return _page(self.conn, sql, params, "invoices", sort_by, descending, offset, limit)
+
+    def query_transactions(self, offset=0, limit=100, sort_by="id", descending=False,
+                           t_type="", keyword="", start_date="", end_date=""):
+        sql, params = _transaction_filters(t_type, keyword, start_date, end_date)
+        return _page(self.conn, sql, params, "transactions", sort_by, descending, offset, limit)
+
+    # Phân trang theo keyset: (các dòng của trang, cursor của trang sau hoặc None)
+    def page_invoices(self, limit=50, cursor=None, sort_by="id", descending=False,
+                      keyword="", start_date="", end_date=""):
+        sql, params = _invoice_filters(keyword, start_date, end_date)
+        return _keyset_page(self.conn, sql, params, "invoices", _INVOICE_COLUMNS, sort_by, descending, limit, cursor)
+
+    def page_transactions(self, limit=50, cursor=None, sort_by="id", descending=False,
+                          t_type="", keyword="", start_date="", end_date=""):
+        sql, params = _transaction_filters(t_type, keyword, start_date, end_date)
+        return _keyset_page(self.conn, sql, params, "transactions", _TRANSACTION_COLUMNS,
+                            sort_by, descending, limit, cursor)
+
+    def page_products(self, limit=50, cursor=None, sort_by="id", descending=False, keyword=""):
+        sql, params = _product_filters(keyword, "id, name, quantity, price")
+        return _keyset_page(self.conn, sql, params, "products", _PRODUCT_COLUMNS[:4], sort_by, descending, limit, cursor)
+
+    # Xuất theo luồng: con trỏ được duyệt dần, không fetchall
+    def stream_invoices(self, keyword="", start_date="", end_date=""):
+        sql, params = _invoice_filters(keyword, start_date, end_date)
+        total = self.conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+        return total, self.conn.execute(sql + " ORDER BY id", params)
+
+    def stream_transactions(self, t_type="", keyword="", start_date="", end_date=""):
+        sql, params = _transaction_filters(t_type, keyword, start_date, end_date)
+        total = self.conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+        return total, self.conn.execute(sql + " ORDER BY id", params)
+
+    # Các hàm thống kê
+    def get_inventory_summary(self):
+        return self._cached("products", ("summary",), lambda: _inventory_summary(self.conn))
+
+    def get_sales_summary(self):
+        return self._cached("invoices", ("summary",), lambda: _sales_summary(self.conn))
+
+    def get_accounting_summary(self):
+        return self._cached("transactions", ("summary",), lambda: _accounting_summary(self.conn))
+
+    def verify_summaries(self, repair=False):
+        return verify_summaries(repair)
+
+    def sales_columns(self):
+        from analytics import Columns
+        return Columns.from_records(self.conn.execute("SELECT date, customer, total FROM invoices"))
+
+    def accounting_columns(self):
+        from analytics import Columns
+        return Columns.from_records(self.conn.execute("SELECT date, type, amount FROM transactions"), str.lower)
+
+profiling.instrument(SqliteDatabase)
+
+# Chuyển dữ liệu cũ (xlsx/json) sang SQLite, mỗi nguồn chỉ chuyển một lần
+XLSX_SOURCES = {
+    "products": ("warehouse.xlsx", ("id", "name", "quantity", "price", "supplier")),
+    "invoices": ("sales.xlsx", ("id", "date", "customer", "total")),
+    "transactions": ("accounting.xlsx", ("id", "date", "type", "amount", "description")),
+}
+
+JSON_SOURCES = {
+    "products": ("inventory.json", ("id", "name", "quantity", "price")),
+    "invoices": ("invoices.json", ("id", "date", "customer", "total")),
+    "transactions": ("transactions.json", ("id", "date", "type", "amount", "description")),
+}
+
+def _read_xlsx(file, columns):
+    import openpyxl
+    wb = openpyxl.load_workbook(file, read_only=True)
+    try:
+        for row in wb.active.iter_rows(min_row=2, values_only=True):
+            if all(value is None for value in row):
+                continue
+            record = dict(zip(columns, row))
+            if isinstance(record.get("date"), datetime):
+                record["date"] = record["date"].strftime("%Y-%m-%d %H:%M")
+            yield record
+    finally:
+        wb.close()
+
+# Cột NOT NULL trong SCHEMA: bản ghi JSON thiếu các cột này không chuyển được
+REQUIRED_COLUMNS = ("name", "date")
+
+def _read_json(file, columns):
+    required = [col for col in columns if col in REQUIRED_COLUMNS]
+    with open(file, "r", encoding="utf-8") as f:
+        for item in json.load(f):
+            # Bỏ tombstone {"id": ..., "deleted": true} của sản phẩm đã xóa
+            if item.get("deleted") or any(item.get(col) is None for col in required):
+                continue
+            yield {col: item.get(col) for col in columns}
+
+def _import_rows(conn, table, columns, records):
+    folded = [col for col in columns if col in FOLDED[table]]
+    names = tuple(columns) + tuple(col + "_folded" for col in folded)
+    placeholders = ", ".join("?" for _ in names)
+    insert_sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({placeholders})"
+    taken = {row[0] for row in conn.execute(f"SELECT id FROM {table}")}
+    count = renumbered = 0
+    for record in records:
+        record_id = record.get("id")
+        if not isinstance(record_id, int) or record_id in taken:
+            # Trùng ID với nguồn khác: để SQLite cấp ID mới
+            renumbered += record_id is not None
+            record = dict(record, id=None)
+        else:
+            taken.add(record_id)
+        values = [record.get(col) for col in columns] + [_fold(record.get(col)) for col in folded]
+        cursor = conn.execute(insert_sql, values)
+        taken.add(cursor.lastrowid)
+        count += 1
+    return count, renumbered
+
+def migrate(db_file=DB_FILE, sources=("xlsx", "json")):
+    conn = connect(db_file)
+    report = {}
+    plans = []
+    if "xlsx" in sources:
+        # sales.xlsx/accounting.xlsx đã tách theo tháng: mỗi phân vùng là một nguồn
+        manifest = open_manifest()
+        plans += [(table, source, columns, _read_xlsx) for table, (file, columns) in XLSX_SOURCES.items()
+                  for source in [file] + manifest.files(file)]
+    if "json" in sources:
+        plans += [(table, file, columns, _read_json) for table, (file, columns) in JSON_SOURCES.items()]
+    for table, file, columns, reader in plans:
+        if not os.path.exists(file):
+            continue
+        done = conn.execute("SELECT 1 FROM migrations WHERE source = ?", (file,)).fetchone()
+        if done:
+            report[file] = "skipped"
+            continue
+        with conn:
+            count, renumbered = _import_rows(conn, table, columns, reader(file, columns))
+            conn.execute("INSERT INTO migrations (source, migrated_at, row_count) VALUES (?, ?, ?)",
+                         (file, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), count))
+        report[file] = {"rows": count, "renumbered": renumbered}
+    return report
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Cách dùng: python sqlite_store.py migrate [xlsx|json ...]")
+        sys.exit(1)
+    for source, result in migrate(sources=tuple(sys.argv[2:]) or ("xlsx", "json")).items():
+        print(f"{source}: {result}")
@@ -0,0 +1,75 @@
+"""Kiểm tra ghi đồng thời từ nhiều tiến trình (nhiều máy bán hàng dùng chung thư mục dữ liệu).
+
+    python stress_concurrency.py --processes 8 --count 200 --backend journal
+
+Mỗi tiến trình thêm --count giao dịch, sau đó kiểm tra không mất giao dịch nào,
+ID không trùng và tổng cộng dồn khớp với dữ liệu.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def _open(backend):
+    if backend == "xlsx":
+        import database
+        database.create_files()
+        return database
+    from gui import Database
+    db = Database(journal=backend == "journal", compact_threshold=16 * 1024, binary=backend == "binary")
+    db.create_files()
+    return db
+
+def _worker(folder, backend, worker, count):
+    os.chdir(folder)
+    db = _open(backend)
+    for i in range(count):
+        db.add_transaction("Thu" if i % 2 else "Chi", 1000 + i, f"w{worker}-{i}")
+    # Chờ luồng nén journal chạy xong trước khi thoát
+    while getattr(db, "_compacting", None):
+        time.sleep(0.01)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--backend", choices=("journal", "json", "xlsx", "binary"), default="journal")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="misa-stress-")
+    start = time.perf_counter()
+    workers = [multiprocessing.Process(target=_worker, args=(folder, args.backend, w, args.count))
+               for w in range(args.processes)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    os.chdir(folder)
+    db = _open(args.backend)
+    rows = db.get_transactions()
+    expected = {f"w{w}-{i}" for w in range(args.processes) for i in range(args.count)}
+    descriptions = [row["description"] for row in rows]
+    ids = [row["id"] for row in rows]
+    missing = expected - set(descriptions)
+    duplicated_ids = len(ids) - len(set(ids))
+    duplicated_rows = len(descriptions) - len(set(descriptions))
+    drift = {name: result for name, result in db.verify_summaries().items()
+             if result["status"] == "drift"}
+    failed_workers = [p.exitcode for p in workers if p.exitcode != 0]
+
+    print(f"{args.backend}: {len(rows)} giao dịch từ {args.processes} tiến trình trong {elapsed:.2f}s "
+          f"({len(rows) / elapsed:.0f} dòng/s) tại {folder}")
+    print(f"  thiếu: {len(missing)}, ID trùng: {duplicated_ids}, dòng trùng: {duplicated_rows}, "
+          f"tổng lệch: {drift or 0}, tiến trình lỗi: {len(failed_workers)}")
+    ok = not (missing or duplicated_ids or duplicated_rows or drift or failed_workers)
+    print("  OK" if ok else "  LỖI")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
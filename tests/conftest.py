@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # Các file dữ liệu dùng đường dẫn tương đối: mỗi test chạy trong thư mục riêng
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def warehouse(data_dir):
+    # warehouse.xlsx của database.py với 30 sản phẩm, sản phẩm lẻ có nhà cung cấp
+    import database
+    database.create_files()
+    database.add_products_bulk([(f"Sản phẩm {i}", i, 1000 * i, "NCC A" if i % 2 else None) for i in range(1, 31)])
+    return data_dir
@@ -0,0 +1,43 @@
+import json
+import os
+import aggregates
+from aggregates import Aggregates, drift
+from gui import Database
+
+def test_apply_adds_delta_only_when_signature_matches(data_dir):
+    store = Aggregates("aggregates.json")
+    store.put("sales", [1, 2], {"total": 10})
+    store.apply("sales", [1, 2], [3, 4], {"total": 5})
+    assert store.get("sales", [3, 4]) == {"total": 15}
+    assert store.get("sales", [1, 2]) is None
+    # File đã bị ghi ở nơi khác: bỏ tổng để lần sau tính lại
+    store.apply("sales", [9, 9], [10, 10], {"total": 1})
+    assert store.get("sales", [10, 10]) is None
+
+def test_drift_reports_only_changed_fields():
+    assert drift({"income": 10, "expense": 5}, {"income": 10, "expense": 6}) == \
+        {"expense": {"stored": 5, "actual": 6}}
+    assert drift({"total": 1.0}, {"total": 1.0 + 1e-9}) == {}
+
+def test_verify_summaries_detects_and_repairs_drift(data_dir):
+    db = Database()
+    db.create_files()
+    db.add_invoices_bulk([{"customer": "A", "total": 100}, {"customer": "B", "total": 50}])
+    assert db.get_sales_summary() == 150
+    assert db.verify_summaries()["invoices.json"]["status"] == "ok"
+    with open("aggregates.json") as f:
+        data = json.load(f)
+    data["invoices.json"]["totals"]["total"] = 999
+    with open("aggregates.json", "w") as f:
+        json.dump(data, f)
+    report = Database().verify_summaries(repair=True)
+    assert report["invoices.json"]["drift"] == {"total": {"stored": 999, "actual": 150}}
+    assert Database().verify_summaries()["invoices.json"]["status"] == "ok"
+
+def test_database_module_opens_state_files_lazily(data_dir):
+    import database
+    aggregates._instances.clear()
+    database.create_files()
+    assert not os.path.exists("aggregates.json")
+    assert database.get_inventory_summary() == (0, 0)
+    assert os.path.abspath("aggregates.json") in aggregates._instances
@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+import analytics
+from analytics import Columns
+from indexes import date_key
+
+# (ngày, khách/loại, số tiền): có ngày trống, ngày hỏng và số tiền không phải số
+INVOICES = [
+    ("2024-01-05 09:00", "An", 100000),
+    ("2024-01-05 17:30:15", "Bình", 250000.5),
+    ("2024-01-31 23:59", "An", 50000),
+    ("2024-02-01 00:00", "Chi", 70000),
+    (None, "Bình", 999),
+    ("không rõ", "An", 1234),
+    ("2024-13-45 10:00", "Chi", 4321),
+    ("2024-02-29 12:00", "An", "lỗi"),
+    ("2023-12-31 08:00", "Dũng", 10),
+]
+TRANSACTIONS = [
+    ("2024-01-02 08:00", "Thu", 500),
+    ("2024-01-20 08:00", "chi", 200),
+    ("2024-03-01 08:00", "THU", 40),
+    ("", "Chi", 77),
+    ("2024-03-15 08:00", "Chi", 5),
+]
+
+def _amount(amount):
+    return amount if isinstance(amount, (int, float)) else 0
+
+def _expected(records, width):
+    # Cộng bằng Python thuần, bỏ dòng không có ngày hợp lệ
+    sums = {}
+    for date, _, amount in records:
+        if date_key(date) is not None:
+            sums[date[:width]] = sums.get(date[:width], 0) + _amount(amount)
+    return sorted(sums.items())
+
+def test_revenue_by_day_and_month_skip_missing_dates():
+    columns = Columns.from_records(INVOICES)
+    assert len(columns) == len(INVOICES)
+    assert analytics.revenue_by_day(columns) == pytest.approx(_expected(INVOICES, 10))
+    assert analytics.revenue_by_month(columns) == pytest.approx(_expected(INVOICES, 7))
+    assert (columns.minutes == analytics.MISSING).sum() == 3
+
+def test_revenue_by_customer_counts_every_invoice():
+    totals = {}
+    for _, customer, amount in INVOICES:
+        total, count = totals.get(customer, (0, 0))
+        totals[customer] = (total + _amount(amount), count + 1)
+    expected = sorted(((name, total, count) for name, (total, count) in totals.items()),
+                      key=lambda item: -item[1])
+    result = analytics.revenue_by_customer(Columns.from_records(INVOICES))
+    assert result == pytest.approx(expected)
+    assert analytics.revenue_by_customer(Columns.from_records(INVOICES), top=2) == pytest.approx(expected[:2])
+
+def test_cash_flow_by_month_matches_plain_sums():
+    flow = {}
+    for date, kind, amount in TRANSACTIONS:
+        if date_key(date) is None:
+            continue
+        income, expense = flow.get(date[:7], (0, 0))
+        if kind.lower() == "thu":
+            income += amount
+        else:
+            expense += amount
+        flow[date[:7]] = (income, expense)
+    expected = [(month, income, expense) for month, (income, expense) in sorted(flow.items())]
+    columns = Columns.from_records(TRANSACTIONS, normalize=str.lower)
+    assert analytics.cash_flow_by_month(columns) == pytest.approx(expected)
+
+def test_all_dates_missing():
+    columns = Columns.from_records([(None, "Thu", 10), ("???", "Chi", 5)], normalize=str.lower)
+    assert analytics.revenue_by_day(columns) == []
+    assert analytics.revenue_by_month(columns) == []
+    assert analytics.cash_flow_by_month(columns) == []
@@ -0,0 +1,82 @@
+import json
+import os
+import struct
+import pytest
+import binstore
+from binstore import HEADER, HEADER_SIZE, MAGIC, RECORD, BinaryTable
+
+def _records(start, count, types=("thu", "chi")):
+    return [{"id": start + i, "date": f"2024-01-{1 + i % 28:02d} 08:30:00", "type": types[i % len(types)],
+             "amount": 1000.0 * i, "description": f"Mô tả {i % 3}"} for i in range(count)]
+
+def test_roundtrip_and_append(data_dir):
+    table = BinaryTable("transactions.bin")
+    table.create(_records(1, 10))
+    table.append(_records(11, 5, types=("thu", "chuyển khoản")))
+    rows = table.records()
+    assert [row.id for row in rows] == list(range(1, 16))
+    assert rows[0].date == "2024-01-01 08:30:00"
+    assert rows[11].type == "chuyển khoản"
+    assert rows[4].description == "Mô tả 1"
+    assert BinaryTable("transactions.bin").get(12).type == "chuyển khoản"
+    assert [row[0] for row in table.after(13, limit=5, descending=True)] == [12, 11, 10, 9, 8]
+    with open("transactions.bin.types", encoding="utf-8") as f:
+        assert json.load(f) == ["thu", "chi", "chuyển khoản"]
+
+def test_many_long_type_names(data_dir):
+    # Phiên bản 1 giới hạn tên loại trong HEADER_SIZE byte
+    types = [f"loại giao dịch rất dài số {i}" for i in range(binstore.MAX_TYPES)]
+    table = BinaryTable("transactions.bin")
+    table.create(_records(1, 10, types=types[:10]))
+    table.append(_records(11, len(types), types=types))
+    assert {row.type for row in BinaryTable("transactions.bin").records()} == set(types)
+    with pytest.raises(ValueError, match="256"):
+        table.append(_records(1000, 1, types=("thêm một loại",)))
+    assert len(BinaryTable("transactions.bin")) == 10 + len(types)
+
+def test_reads_and_upgrades_version_1(data_dir):
+    names = json.dumps(["thu", "chi"]).encode("utf-8")
+    header = (HEADER.pack(MAGIC, 1, RECORD.size, len(names)) + names).ljust(HEADER_SIZE, b"\0")
+    text = "Bán hàng".encode("utf-8")
+    with open("transactions.bin", "wb") as f:
+        f.write(header + RECORD.pack(1, 0, 1, 500.0, 0))
+    with open("transactions.bin.strings", "wb") as f:
+        f.write(struct.pack("<I", len(text)) + text)
+    table = BinaryTable("transactions.bin")
+    assert table.records()[0] == (1, "1970-01-01 00:00:00", "chi", 500.0, "Bán hàng")
+    table.append(_records(2, 3, types=("khác",)))
+    with open("transactions.bin", "rb") as f:
+        assert HEADER.unpack_from(f.read(HEADER_SIZE))[1] == binstore.VERSION
+    assert [row.type for row in BinaryTable("transactions.bin").records()] == ["chi", "khác", "khác", "khác"]
+    assert BinaryTable("transactions.bin").totals() == {"income": 0, "expense": 500.0}
+
+def test_interrupted_append_is_ignored_then_repaired(data_dir):
+    table = BinaryTable("transactions.bin")
+    table.create(_records(1, 3))
+    with open("transactions.bin", "ab") as f:
+        f.write(b"\1" * (RECORD.size // 2))
+    assert len(BinaryTable("transactions.bin")) == 3
+    table.append(_records(4, 1))
+    assert [row.id for row in BinaryTable("transactions.bin").records()] == [1, 2, 3, 4]
+
+def test_repair_overwrites_tail_while_stream_is_open(data_dir):
+    table = BinaryTable("transactions.bin")
+    table.create(_records(1, 50))
+    total, rows = table.stream()
+    first = next(rows)
+    # Lần ghi bị ngắt: một chuỗi dài chưa ghi xong và nửa bản ghi
+    with open("transactions.bin.strings", "ab") as f:
+        f.write(struct.pack("<I", 1000) + b"x" * 500)
+    with open("transactions.bin", "ab") as f:
+        f.write(b"\1" * (RECORD.size // 2))
+    sizes = [os.path.getsize(path) for path in ("transactions.bin", "transactions.bin.strings")]
+    writer = BinaryTable("transactions.bin")
+    writer.append([{"id": 51, "date": "2024-02-01 08:00", "type": "thu", "amount": 5.0, "description": "Mới"}])
+    # Không cắt file: vòng quét đang mở vẫn đọc hết được
+    assert [first] + list(rows) == table.search()[:total]
+    assert all(os.path.getsize(path) >= size for path, size in zip(("transactions.bin", "transactions.bin.strings"), sizes))
+    writer.append(_records(52, 3))
+    fresh = BinaryTable("transactions.bin")
+    assert [row.id for row in fresh.records()] == list(range(1, 55))
+    assert fresh.get(51).description == "Mới"
+    assert fresh.get(53).description == "Mô tả 1"
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from dataservice import DataService, DatabaseClient, is_loopback, serve
+from gui import Database
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def address(data_dir):
+    db = Database(journal=True)
+    db.create_files()
+    ready = threading.Event()
+    bound = []
+    def on_ready(sockname):
+        bound.append(sockname)
+        ready.set()
+    threading.Thread(target=asyncio.run, args=(serve(db, "127.0.0.1", 0, 2, on_ready),), daemon=True).start()
+    assert ready.wait(10)
+    return f"{bound[0][0]}:{bound[0][1]}"
+
+def test_pipelined_calls_resolve_in_any_order(address):
+    client = DatabaseClient(address, subscribe=False)
+    try:
+        ids = client.add_invoices_bulk([{"customer": f"Khách {i}", "total": i} for i in range(200)])
+        futures = [client.call_async("search_invoices", f"Khách {i}") for i in range(0, 200, 10)]
+        futures.append(client.call_async("get_sales_summary"))
+        results = [future.result(10) for future in futures]
+        assert [rows[0][0] for rows in results[:-1]] == ids[::10]
+        assert results[-1] == sum(range(200))
+        assert not client._pending
+    finally:
+        client.close()
+
+def test_concurrent_callers_share_one_connection(address):
+    client = DatabaseClient(address, subscribe=False)
+    errors = []
+    def worker(n):
+        try:
+            for i in range(20):
+                client.add_invoice(f"Luồng {n}", i)
+        except Exception as error:
+            errors.append(error)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert not errors
+        assert len(client.get_invoices()) == 80
+    finally:
+        client.close()
+
+def test_only_loopback_addresses_are_accepted():
+    assert is_loopback("127.0.0.1") and is_loopback("localhost")
+    assert not is_loopback("0.0.0.0")
+    assert not is_loopback("192.168.1.10")
+    with pytest.raises(ValueError):
+        asyncio.run(DataService(Database()).start("0.0.0.0", 0))
+    proc = subprocess.run([sys.executable, os.path.join(HERE, "dataservice.py"), "--host", "0.0.0.0", "--port", "0"],
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 2 and "--host" in proc.stderr
@@ -0,0 +1,25 @@
+from indexes import DateIndex, date_bounds, date_key
+from datetime import datetime
+
+def test_positions_in_range_keep_row_order():
+    dates = ["2024-03-01 10:00", None, "2024-01-15", datetime(2024, 2, 10, 8, 0), "không rõ", "2024-02-29 23:59:59"]
+    index = DateIndex(dates)
+    # Chuỗi không phải ngày bị bỏ khỏi chỉ mục như ô trống
+    assert len(index) == 4
+    assert index.positions(*date_bounds("2024-02-01", "2024-02-29")) == [3, 5]
+    assert index.positions(*date_bounds("", "2024-02-10")) == [2, 3]
+    assert index.positions() == [0, 2, 3, 5]
+    index.add("2024-02-15 12:00", 6)
+    index.add("2023-12-31", 7)
+    assert index.positions(*date_bounds("2024-02-01", "2024-02-29")) == [3, 5, 6]
+    assert index.positions(*date_bounds("2023-01-01", "2023-12-31")) == [7]
+
+
+def test_date_key_rejects_malformed_dates():
+    assert date_key("2024-02-29 23:59:59") == "2024-02-29 23:59:59"
+    assert date_key("2024-03-01") == "2024-03-01"
+    assert date_key(datetime(2024, 2, 10, 8, 0)) == "2024-02-10 08:00:00"
+    for value in ("không rõ", "", "2024-13-01", "2023-02-29", "2024-1-05", "20240105", "02/01/2024", 20240105, None):
+        assert date_key(value) is None
+    index = DateIndex(["2024-13-45", "zzz", "2024-01-02"])
+    assert index.positions() == [2]
@@ -0,0 +1,53 @@
+from events import DELETED, INSERTED, UPDATED, ChangeBus
+from gui import Database
+
+def test_subscribe_order_and_unsubscribe():
+    bus, seen = ChangeBus(), []
+    bus.subscribe(lambda event: seen.append(("all", event.table, event.kind, event.records)))
+    stop = bus.subscribe(lambda event: seen.append(("sales", event.table)), table="invoices")
+    bus.publish("invoices", INSERTED, iter([1, 2]))
+    bus.publish("products", UPDATED, [3], old=[4])
+    bus.publish("invoices", INSERTED, [])
+    assert seen == [("all", "invoices", INSERTED, [1, 2]), ("sales", "invoices"),
+                    ("all", "products", UPDATED, [3])]
+    stop()
+    stop()
+    bus.publish("invoices", DELETED, [5])
+    assert seen[-1] == ("all", "invoices", DELETED, [5])
+    assert len(seen) == 4
+
+def test_failing_subscriber_does_not_stop_others(capsys):
+    bus, seen = ChangeBus(), []
+    def broken(event):
+        raise RuntimeError("lỗi nơi nhận")
+    bus.subscribe(broken)
+    bus.subscribe(seen.append)
+    bus.publish("transactions", INSERTED, [1])
+    assert [event.records for event in seen] == [[1]]
+    assert "lỗi nơi nhận" in capsys.readouterr().err
+
+def test_database_publishes_writes(data_dir):
+    db, events = Database(), []
+    db.create_files()
+    db.events.subscribe(events.append)
+    first = db.add_product("Bút", 1, 1000)
+    db.update_product(first, quantity=5)
+    db.delete_product(first)
+    db.add_invoice("Nguyễn Văn An", 100)
+    db.add_transactions_bulk([{"type": "Thu", "amount": 10, "description": "Bán hàng"},
+                             {"type": "Chi", "amount": 4, "description": "Điện"}])
+    assert [(event.table, event.kind) for event in events] == [
+        ("products", INSERTED), ("products", UPDATED), ("products", DELETED),
+        ("invoices", INSERTED), ("transactions", INSERTED)]
+    inserted, updated, deleted, sale, transactions = events
+    assert [(p.id, p.name, p.quantity) for p in inserted.records] == [(first, "Bút", 1)]
+    assert inserted.old is None
+    assert [p.quantity for p in updated.records] == [5] and [p.quantity for p in updated.old] == [1]
+    # Sự kiện giữ bản sao: lần sửa sau không làm đổi sự kiện đã phát
+    assert inserted.records[0].quantity == 1
+    assert [(p.id, p.deleted, p.quantity) for p in deleted.records] == [(first, False, 5)]
+    assert [(r.id, r.customer, r.total) for r in sale.records] == [(1, "Nguyễn Văn An", 100)]
+    assert [(r.type, r.amount, r.description) for r in transactions.records] == [
+        ("Thu", 10, "Bán hàng"), ("Chi", 4, "Điện")]
+    assert not db.update_product(first, quantity=1) and not db.delete_product(first)
+    assert len(events) == 5
@@ -0,0 +1,41 @@
+import csv
+import openpyxl
+import export
+from gui import Database
+
+def _db():
+    db = Database()
+    db.create_files()
+    db.add_transactions_bulk([{"type": "Thu", "amount": 100, "description": "Bán hàng", "date": "2024-01-05 09:00:00"},
+                              {"type": "Chi", "amount": 40, "description": "Tiền điện", "date": "2024-02-01 08:00:00"},
+                              {"type": "Chi", "amount": 10, "description": "Nước", "date": "2024-03-01 08:00:00"}])
+    return db
+
+def test_csv_export_is_utf8_with_bom_and_filtered(data_dir):
+    progress = []
+    count = export.export(_db(), "transactions", "so_cai.csv", {"t_type": "Chi"},
+                          progress=lambda done, total: progress.append((done, total)), chunk=1)
+    assert count == 2 and progress == [(0, 2), (1, 2), (2, 2)]
+    with open("so_cai.csv", "rb") as f:
+        assert f.read(3) == b"\xef\xbb\xbf"
+    with open("so_cai.csv", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == export.HEADERS["transactions"]
+    assert [row[4] for row in rows[1:]] == ["Tiền điện", "Nước"]
+
+def test_xlsx_export_splits_sheets(data_dir, monkeypatch):
+    monkeypatch.setattr(export, "SHEET_ROWS", 2)
+    assert export.export(_db(), "transactions", "so_cai.xlsx") == 3
+    wb = openpyxl.load_workbook("so_cai.xlsx", read_only=True)
+    sheets = [list(ws.iter_rows(values_only=True)) for ws in wb.worksheets]
+    wb.close()
+    assert [len(rows) for rows in sheets] == [3, 2]
+    assert all(rows[0] == tuple(export.HEADERS["transactions"]) for rows in sheets)
+    assert sheets[1][1][4] == "Nước"
+
+def test_empty_export_still_has_header(data_dir):
+    db = _db()
+    assert export.export(db, "invoices", "hoa_don.xlsx") == 0
+    wb = openpyxl.load_workbook("hoa_don.xlsx", read_only=True)
+    assert list(wb.active.iter_rows(values_only=True)) == [tuple(export.HEADERS["invoices"])]
+    wb.close()
@@ -0,0 +1,30 @@
+import importer
+from gui import Database
+
+CSV = """ref,date,customer,total
+A1,05/01/2024 09:30,Nguyễn Văn An,100
+A2,2024-01-06T10:00:00Z,Trần Bình,"200"
+A3,không phải ngày,Lê Đức,50
+A1,2024-01-07,Trùng ref,10
+A4,2024-01-08,,10
+"""
+
+def test_normalize_date_formats():
+    assert importer.normalize_date("05/01/2024") == "2024-01-05 00:00:00"
+    assert importer.normalize_date("2024-1-5 7:05") == "2024-01-05 07:05:00"
+    assert importer.normalize_date("2024-01-05T07:05:09.123+07:00") == "2024-01-05 07:05:09"
+    assert importer.normalize_date("31/02/2024") is None
+
+def test_import_rejects_bad_rows_and_skips_known_refs(data_dir):
+    with open("pos.csv", "w", encoding="utf-8") as f:
+        f.write(CSV)
+    db = Database()
+    db.create_files()
+    result = importer.import_file(db, "invoices", "pos.csv", workers=1, chunk=2)
+    assert result["imported"] == 2
+    assert [(line, reason.split(":")[0]) for line, reason, _ in result["rejected"]] == [
+        (4, "Ngày không hợp lệ"), (5, "Trùng mã tham chiếu A1"), (6, "Thiếu tên khách hàng")]
+    assert [(row.date, row.customer, row.total) for row in db.get_invoices()] == [
+        ("2024-01-05 09:30:00", "Nguyễn Văn An", 100.0), ("2024-01-06 10:00:00", "Trần Bình", 200.0)]
+    again = importer.import_file(db, "invoices", "pos.csv", workers=1)
+    assert again["imported"] == 0 and len(db.get_invoices()) == 2
@@ -0,0 +1,62 @@
+import json
+from gui import Database
+
+def _open(**kwargs):
+    db = Database(journal=True, **kwargs)
+    db.create_files()
+    return db
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_add_appends_to_journal_not_snapshot(data_dir):
+    db = _open()
+    ids = db.add_invoices_bulk([{"customer": "Nguyễn An", "total": 100}, {"customer": "Lê Bình", "total": 50}])
+    assert ids == [1, 2]
+    with open("invoices.json") as f:
+        assert json.load(f) == []
+    assert [row["id"] for row in _lines("invoices.journal.jsonl")] == [1, 2]
+
+def test_replay_reads_snapshot_and_journal(data_dir):
+    _open().add_invoices_bulk([{"customer": "Nguyễn An", "total": 100}])
+    other = _open()
+    assert [(inv["id"], inv["customer"], inv["total"]) for inv in other.get_invoices()] == [(1, "Nguyễn An", 100)]
+    assert other.get_sales_summary() == 100
+
+def test_partial_last_line_is_ignored_and_repaired(data_dir):
+    db = _open()
+    db.add_invoices_bulk([{"customer": "A", "total": 1}])
+    with open("invoices.journal.jsonl", "a") as f:
+        f.write('{"id": 2, "date": "2025-01-01 00:00:00", "cust')
+    assert [inv["id"] for inv in _open().get_invoices()] == [1]
+    _open().add_invoices_bulk([{"customer": "B", "total": 2}])
+    assert [row["customer"] for row in _lines("invoices.journal.jsonl")] == ["A", "B"]
+
+def test_compact_folds_journal_into_snapshot(data_dir):
+    db = _open(compact_threshold=10 ** 9)
+    db.add_invoices_bulk([{"customer": str(i), "total": i} for i in range(5)])
+    db.compact(db.invoices_file)
+    with open("invoices.json") as f:
+        assert [row["id"] for row in json.load(f)] == [1, 2, 3, 4, 5]
+    assert not (data_dir / "invoices.journal.jsonl").exists()
+    assert not (data_dir / "invoices.journal.jsonl.old").exists()
+    assert len(_open().get_invoices()) == 5
+
+def test_interrupted_compaction_does_not_duplicate_rows(data_dir):
+    db = _open()
+    db.add_invoices_bulk([{"customer": "A", "total": 1}, {"customer": "B", "total": 2}])
+    # Nén bị dừng sau khi đã ghi snapshot nhưng chưa xóa journal .old
+    rows = _lines("invoices.journal.jsonl")
+    with open("invoices.json", "w") as f:
+        json.dump(rows, f)
+    (data_dir / "invoices.journal.jsonl").rename(data_dir / "invoices.journal.jsonl.old")
+    assert [inv["id"] for inv in _open().get_invoices()] == [1, 2]
+
+def test_default_instance_rewrites_json(data_dir):
+    db = Database()
+    db.create_files()
+    db.add_invoices_bulk([{"customer": "A", "total": 1}])
+    with open("invoices.json") as f:
+        assert [row["id"] for row in json.load(f)] == [1]
+    assert not (data_dir / "invoices.journal.jsonl").exists()
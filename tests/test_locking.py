@@ -0,0 +1,31 @@
+import os
+import threading
+import pytest
+from locking import LockTimeout, atomic_write, file_lock
+
+def test_lock_is_reentrant_but_excludes_other_threads(data_dir):
+    results = []
+    def other():
+        try:
+            with file_lock("data.json", timeout=0):
+                results.append("locked")
+        except LockTimeout:
+            results.append("timeout")
+    with file_lock("data.json"):
+        with file_lock("data.json", timeout=0):
+            thread = threading.Thread(target=other)
+            thread.start()
+            thread.join()
+    other()
+    assert results == ["timeout", "locked"]
+
+def test_failed_atomic_write_keeps_old_file_and_no_temp(data_dir):
+    with atomic_write("data.json") as f:
+        f.write("cũ")
+    with pytest.raises(RuntimeError):
+        with atomic_write("data.json") as f:
+            f.write("mới, ghi dở")
+            raise RuntimeError("ngắt giữa chừng")
+    with open("data.json") as f:
+        assert f.read() == "cũ"
+    assert sorted(os.listdir()) == ["data.json"]
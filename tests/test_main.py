@@ -0,0 +1,20 @@
+import os
+import pytest
+import database
+import main
+
+def test_init_files_runs_in_background(data_dir):
+    main.start_init().join()
+    assert os.path.exists("warehouse.xlsx") and os.path.exists("users.xlsx")
+
+def test_init_error_is_raised_on_join(data_dir, monkeypatch):
+    def broken():
+        raise PermissionError("warehouse.xlsx")
+    monkeypatch.setattr(database, "create_files", broken)
+    init = main.start_init()
+    with pytest.raises(PermissionError, match="warehouse.xlsx"):
+        init.join()
+    assert not init.is_alive()
+    # Mỗi lần chờ (mỗi lần bấm đăng nhập) đều thấy lại lỗi
+    with pytest.raises(PermissionError):
+        init.join()
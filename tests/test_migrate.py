@@ -0,0 +1,48 @@
+import json
+import openpyxl
+import sequences
+import sqlite_store
+from gui import Database
+
+def test_migrate_imports_each_source_once(data_dir):
+    wb = openpyxl.Workbook()
+    wb.active.append(["Invoice ID", "Date", "Customer", "Total"])
+    wb.active.append((1, "2024-01-05 09:00", "Nguyễn Văn An", 100))
+    wb.active.append((2, "2024-01-06 10:00", "Trần Bình", 200))
+    wb.save("sales.xlsx")
+    with open("invoices.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": 2, "date": "2024-02-01 08:00", "customer": "Lê Đức", "total": 50},
+                   {"id": 9, "date": "2024-02-02 08:00", "customer": "Phạm Hằng", "total": 70}], f)
+    try:
+        report = sqlite_store.migrate(sources=("xlsx", "json"))
+        assert report["sales.xlsx"] == {"rows": 2, "renumbered": 0}
+        # ID 2 đã có từ sales.xlsx: SQLite cấp ID mới
+        assert report["invoices.json"] == {"rows": 2, "renumbered": 1}
+        rows = sqlite_store.get_invoices()
+        assert sorted(row[2] for row in rows) == ["Lê Đức", "Nguyễn Văn An", "Phạm Hằng", "Trần Bình"]
+        assert {row[0] for row in rows} >= {1, 2, 9}
+        assert sqlite_store.get_sales_summary() == 420
+        assert [row[2] for row in sqlite_store.search_invoices("duc")] == ["Lê Đức"]
+        assert sqlite_store.migrate() == {"sales.xlsx": "skipped", "invoices.json": "skipped"}
+        assert len(sqlite_store.get_invoices()) == 4
+    finally:
+        sqlite_store.close()
+
+def test_migrate_skips_deleted_products(data_dir):
+    sequences._instances.clear()
+    db = Database()
+    db.create_files()
+    kept = db.add_product("Bút", 1, 1000)
+    removed = db.add_product("Vở", 2, 5000)
+    db.delete_product(removed)
+    with open("inventory.json", "r+", encoding="utf-8") as f:
+        items = json.load(f)
+        items.append({"id": 50, "quantity": 1, "price": 10})
+        f.seek(0)
+        json.dump(items, f)
+    try:
+        report = sqlite_store.migrate(sources=("json",))
+        assert report["inventory.json"] == {"rows": 1, "renumbered": 0}
+        assert [(row[0], row[1]) for row in sqlite_store.get_products()] == [(kept, "Bút")]
+    finally:
+        sqlite_store.close()
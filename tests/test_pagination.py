@@ -0,0 +1,122 @@
+import random
+import pytest
+import database
+import pagination
+import sqlite_store
+from gui import Database, format_money
+from records import Invoice, Product
+
+CUSTOMERS = ["Nguyễn Văn An", "nguyen van an", "Trần Bình", "Đặng Thu", "Ánh", None]
+
+def _walk(fetch, limit, **kwargs):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch(limit=limit, cursor=cursor, **kwargs)
+        assert len(page) <= limit
+        rows += page
+        pages += 1
+        if cursor is None:
+            return rows
+        assert pages < 1000
+
+def _expected(records, sort_by, descending):
+    return sorted(records, key=pagination.sort_key(sort_by), reverse=descending)
+
+def test_cursor_round_trip_and_validation():
+    cursor = pagination.encode_cursor("customer", True, "Nguyễn", 42)
+    assert pagination.decode_cursor(cursor, "customer", True) == ("Nguyễn", 42)
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor, "customer", False)
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("không phải cursor", "id", False)
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(pagination.encode_cursor("id", False, 1, "1"), "id", False)
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_page_and_scan_page_walk_in_sort_order(descending):
+    random.seed(2)
+    rows = [Invoice(i, None, random.choice(CUSTOMERS), random.choice([5, 1.5, None, 7])) for i in range(1, 60)]
+    for sort_by in ("customer", "total"):
+        expected = _expected(rows, sort_by, descending)
+        ordered = _expected(rows, sort_by, False)
+        assert _walk(lambda **kw: pagination.page(ordered, sort_by, descending=descending, **kw), 7) == expected
+        assert _walk(lambda **kw: pagination.scan_page(iter(rows), sort_by, descending=descending, **kw), 7) == expected
+    runs = lambda **kw: pagination.merge_page(
+        [pagination.after(_expected(rows[i::3], "total", False), "total", kw["limit"], kw["cursor"], descending)
+         for i in range(3)], "total", kw["limit"], descending)
+    assert _walk(runs, 5) == _expected(rows, "total", descending)
+
+def test_page_skips_tombstones():
+    rows = [Product(1, "a", 1, 1), Product.tombstone(2), Product(3, "c", 1, 1)]
+    assert [row.id for row in _walk(lambda **kw: pagination.page(rows, "id", **kw), 1)] == [1, 3]
+
+@pytest.fixture
+def sqlite_products(data_dir):
+    random.seed(3)
+    records = [(f"{random.choice(CUSTOMERS) or 'Không tên'} {i % 4}", random.choice([1, 2, None]),
+                random.choice([1000, 2500.5, None]), random.choice(CUSTOMERS)) for i in range(80)]
+    ids = sqlite_store.add_products_bulk(records)
+    yield [Product(i, *record) for i, record in zip(ids, records)]
+    sqlite_store.close()
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_by", ["id", "name", "quantity", "price", "supplier"])
+def test_sqlite_keyset_walk_keeps_null_rows(sqlite_products, sort_by, descending):
+    rows = _walk(sqlite_store.page_products, 9, sort_by=sort_by, descending=descending)
+    assert [row[0] for row in rows] == [p.id for p in _expected(sqlite_products, sort_by, descending)]
+
+def test_sqlite_sort_uses_index(sqlite_products):
+    conn = sqlite_store.connect()
+    for column, index in (("name_folded", "name"), ("price", "price"), ("supplier_folded", "supplier")):
+        plan = " ".join(row[3] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT id, name, quantity, price, supplier FROM products "
+            f"WHERE {column} IS NOT NULL AND ({column}, id) > (?, ?) ORDER BY {column}, id LIMIT 10", ("x", 1)))
+        assert f"idx_products_sort_{index}" in plan and "TEMP B-TREE" not in plan, plan
+
+@pytest.fixture
+def xlsx_invoices(data_dir, monkeypatch):
+    # Cache nhỏ: phân vùng lớn được đọc dạng luồng, phân vùng nhỏ dùng thứ tự đã cache
+    monkeypatch.setattr(database, "CACHE_MAX_BYTES", 6000)
+    random.seed(4)
+    records = [(random.choice(CUSTOMERS), random.choice([10, 20.5, None]),
+                f"2024-{random.choice([1, 2, 3]):02d}-{random.randint(1, 28):02d} 08:00") for _ in range(120)]
+    records += [("Khách lẻ", 5, f"2024-04-0{i} 09:00") for i in range(1, 4)]
+    ids = database.add_invoices_bulk(records)
+    return [Invoice(i, date, customer, total) for i, (customer, total, date) in zip(ids, records)]
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_by", ["id", "date", "customer", "total"])
+def test_xlsx_walk_across_partitions(xlsx_invoices, sort_by, descending):
+    rows = _walk(database.page_invoices, 11, sort_by=sort_by, descending=descending)
+    assert [row.id for row in rows] == [r.id for r in _expected(xlsx_invoices, sort_by, descending)]
+    filtered = _walk(database.page_invoices, 4, sort_by=sort_by, descending=descending, keyword="an",
+                     start_date="2024-02-01", end_date="2024-03-31")
+    matching = [r for r in xlsx_invoices if r.customer and "an" in pagination.fold(r.customer)
+                and "2024-02-01" <= r.date[:10] <= "2024-03-31"]
+    assert [row.id for row in filtered] == [r.id for r in _expected(matching, sort_by, descending)]
+
+def test_xlsx_next_page_sees_rows_added_after_cursor(xlsx_invoices):
+    page, cursor = database.page_invoices(limit=5, sort_by="date", descending=True)
+    assert [row.id for row in page] == [r.id for r in _expected(xlsx_invoices, "date", True)[:5]]
+    new_id, = database.add_invoices_bulk([("Khách mới", 1, "2024-01-01 07:00")])
+    rest, cursor = database.page_invoices(limit=200, cursor=cursor, sort_by="date", descending=True)
+    assert cursor is None and len(rest) == len(xlsx_invoices) - 5 + 1
+    assert rest[-1].id == new_id
+
+def test_gui_database_walk(data_dir):
+    db = Database()
+    db.create_files()
+    random.seed(5)
+    db.add_invoices_bulk([{"customer": random.choice(CUSTOMERS), "total": random.choice([1, 2, 2.5])}
+                          for _ in range(40)])
+    records = db.get_invoices()
+    for sort_by in ("id", "customer", "total"):
+        for descending in (False, True):
+            rows = _walk(db.page_invoices, 6, sort_by=sort_by, descending=descending)
+            assert [row[0] for row in rows] == [r.id for r in _expected(records, sort_by, descending)]
+
+def test_format_money_keeps_non_numeric_totals():
+    assert format_money(1234567) == "1,234,567 VND"
+    assert format_money("2500.4") == "2,500 VND"
+    assert format_money("chưa rõ") == "chưa rõ"
+    assert format_money(None) is None
@@ -0,0 +1,57 @@
+import os
+import openpyxl
+import pytest
+import database
+from database import HEADERS
+
+INVOICES = [("Nguyễn Văn An", 100, "2024-01-05 09:00"), ("Trần Bình", 200, "2024-02-10 10:00"),
+            ("Lê Đức Anh", 300, "2024-02-20 11:00"), ("Phạm Hằng", 400, None)]
+
+@pytest.fixture
+def legacy(data_dir):
+    # Dữ liệu kiểu cũ: sales.xlsx một sheet, chưa có partitions.json
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADERS["sales"])
+    for i, (customer, total, date) in enumerate(INVOICES, 1):
+        wb.active.append((i, date, customer, total))
+    wb.save("sales.xlsx")
+    return data_dir
+
+def _ids(rows):
+    return [row.id for row in rows]
+
+def test_reads_and_writes_keep_the_legacy_file(legacy):
+    database.create_files()
+    assert _ids(database.get_invoices()) == [1, 2, 3, 4]
+    assert _ids(database.search_invoices("duc", "2024-02-01", "2024-02-28")) == [3]
+    assert database.get_sales_summary() == 1000
+    assert database.add_invoices_bulk([("Mới", 50, "2024-03-01 08:00")]) == [5]
+    assert os.path.exists("sales.xlsx")
+    assert not any(os.path.exists(name) for name in ("partitions.json", "sales.xlsx.bak", "sales_2024-03.xlsx"))
+    assert _ids(database.get_invoices()) == [1, 2, 3, 4, 5]
+
+def test_split_moves_rows_into_monthly_partitions(legacy, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["database.py", "--split"])
+    assert database.main() == 0
+    assert not os.path.exists("sales.xlsx") and os.path.exists("sales.xlsx.bak")
+    assert sorted(f for f in os.listdir() if f.startswith("sales_") and f.endswith(".xlsx")) == \
+        ["sales_2024-01.xlsx", "sales_2024-02.xlsx", "sales_khac.xlsx"]
+    assert sorted(_ids(database.get_invoices())) == [1, 2, 3, 4]
+    assert database.get_sales_summary() == 1000
+    assert _ids(database.search_invoices("", "2024-02-01", "2024-02-28")) == [2, 3]
+    assert database.add_invoices_bulk([("Mới", 50, "2024-02-25 08:00")]) == [5]
+    assert _ids(database.search_invoices("", "2024-02-01", "2024-02-28")) == [2, 3, 5]
+
+def test_interrupted_split_does_not_duplicate_rows(legacy):
+    database.split_partitions("sales")
+    # Bị ngắt trước khi đổi tên: file cũ vẫn còn, tách lại
+    os.replace("sales.xlsx.bak", "sales.xlsx")
+    assert database.split_partitions("sales") == 0
+    assert sorted(_ids(database.get_invoices())) == [1, 2, 3, 4]
+
+def test_create_files_only_creates_unpartitioned_files(data_dir):
+    database.create_files()
+    assert os.path.exists("warehouse.xlsx")
+    assert not os.path.exists("sales.xlsx") and not os.path.exists("accounting.xlsx")
+    assert database.add_invoices_bulk([("An", 10, "2024-05-01 08:00")]) == [1]
+    assert os.path.exists("sales_2024-05.xlsx")
@@ -0,0 +1,44 @@
+import json
+import pytest
+import sequences
+from gui import Database
+from sequences import Sequences
+
+def test_sequence_allocates_contiguous_blocks(data_dir):
+    store = Sequences("sequences.json")
+    assert store.allocate("invoices.json", 3, floor=lambda: 10) == 11
+    assert store.allocate("invoices.json", 1, floor=lambda: 0) == 14
+    assert Sequences("sequences.json").allocate("invoices.json") == 15
+
+def test_deleted_product_id_is_not_reused(data_dir):
+    sequences._instances.clear()
+    db = Database()
+    db.create_files()
+    first = db.add_product("Bút", 1, 1000)
+    second = db.add_product("Vở", 2, 5000)
+    db.delete_product(second)
+    third = Database().add_product("Thước", 3, 2000)
+    assert third > second > first
+    assert [p["id"] for p in Database().get_products()] == [first, third]
+
+def test_failed_write_leaves_cached_products_untouched(data_dir):
+    db = Database()
+    db.create_files()
+    product_id = db.add_product("Bút", 1, 1000)
+    db.get_products()
+
+    def fail(filename, data):
+        raise OSError("disk full")
+    db._write_data = fail
+    with pytest.raises(OSError):
+        db.update_product(product_id, name="Bút bi", price=1500)
+    with pytest.raises(OSError):
+        db.delete_product(product_id)
+    del db._write_data
+    assert [(p["name"], p["price"]) for p in db.get_products()] == [("Bút", 1000)]
+    assert db.search_products("but")[0]["id"] == product_id
+
+    assert db.update_product(product_id, price=1500)
+    with open(db.inventory_file) as f:
+        assert json.load(f)[0]["price"] == 1500
+    assert db.get_products()[0]["price"] == 1500
@@ -0,0 +1,67 @@
+import importlib
+import json
+import types
+import pytest
+import profiling
+
+class Store:
+    def read(self, n):
+        profiling.count_rows(n)
+        profiling.count_read(10 * n)
+        return n
+
+    def outer(self):
+        return self.read(2) + self.read(3)
+
+    def _private(self):
+        return "x"
+
+@pytest.fixture
+def enabled(data_dir, monkeypatch):
+    # ENABLED và các hàm count_* được chọn lúc import nên phải nạp lại module
+    monkeypatch.setenv("MISA_PROFILE", "1")
+    monkeypatch.setenv("MISA_PROFILE_LOG", str(data_dir / "operations.jsonl"))
+    importlib.reload(profiling)
+    yield data_dir / "operations.jsonl"
+    if profiling._log is not None:
+        profiling._log.close()
+    monkeypatch.delenv("MISA_PROFILE")
+    monkeypatch.delenv("MISA_PROFILE_LOG")
+    importlib.reload(profiling)
+
+def test_disabled_leaves_functions_unwrapped(monkeypatch):
+    monkeypatch.delenv("MISA_PROFILE", raising=False)
+    importlib.reload(profiling)
+    assert not profiling.ENABLED
+    cls = type("Copy", (), dict(vars(Store)))
+    read = cls.read
+    assert profiling.instrument(cls) is cls
+    assert cls.read is read
+    module = types.ModuleType("fake")
+    module.f = lambda: 1
+    f = module.f
+    profiling.instrument(module)
+    assert module.f is f
+    profiling.count_rows(5)
+    assert profiling.snapshot() == []
+
+def test_enabled_records_calls_timings_and_io(enabled):
+    cls = profiling.instrument(type("Store", (), dict(vars(Store))))
+    assert cls.read.__wrapped__ is Store.read
+    assert cls._private is Store._private
+    store = cls()
+    assert store.outer() == 5
+    assert store.read(1) == 1
+    stats = {row["op"]: row for row in profiling.snapshot()}
+    assert set(stats) == {"Store.read", "Store.outer"}
+    read, outer = stats["Store.read"], stats["Store.outer"]
+    assert (read["calls"], read["rows"], read["bytes_read"]) == (3, 6, 60)
+    # Thao tác ngoài cũng tính dòng và byte của thao tác con
+    assert (outer["calls"], outer["rows"], outer["bytes_read"]) == (1, 5, 50)
+    assert read["total_ms"] >= read["max_ms"] >= 0
+    assert read["mean_ms"] == pytest.approx(read["total_ms"] / 3)
+    log = [json.loads(line) for line in enabled.read_text(encoding="utf-8").splitlines()]
+    assert [entry["op"] for entry in log] == ["Store.read", "Store.read", "Store.outer", "Store.read"]
+    assert all(entry["ms"] >= 0 for entry in log)
+    profiling.reset()
+    assert profiling.snapshot() == []
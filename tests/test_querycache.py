@@ -0,0 +1,88 @@
+from gui import Database
+from querycache import QueryCache
+
+def _counter():
+    calls = []
+    def compute(value):
+        def run():
+            calls.append(value)
+            return value
+        return run
+    return calls, compute
+
+def test_hits_until_bump_or_new_version():
+    cache = QueryCache()
+    calls, compute = _counter()
+    assert cache.cached("sales", ("a",), compute([1, 2])) == [1, 2]
+    assert cache.cached("sales", ("a",), compute([9])) == [1, 2]
+    assert cache.cached("accounting", ("a",), compute([3])) == [3]
+    cache.bump("sales")
+    assert cache.cached("sales", ("a",), compute([4])) == [4]
+    assert cache.cached("accounting", ("a",), compute([9])) == [3]
+    # Tiến trình khác ghi: chữ ký file đổi nên tính lại
+    assert cache.cached("sales", ("a",), compute([5]), version=1) == [5]
+    assert cache.cached("sales", ("a",), compute([9]), version=1) == [5]
+    assert calls == [[1, 2], [3], [4], [5]]
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 4
+
+def test_write_during_compute_is_not_cached():
+    cache = QueryCache()
+    def compute():
+        cache.bump("sales")
+        return [1]
+    cache.cached("sales", ("a",), compute)
+    assert cache.stats()["entries"] == 0
+
+def test_lru_eviction_by_entries_and_rows():
+    cache = QueryCache(max_entries=2, max_rows=5)
+    calls, compute = _counter()
+    cache.cached("t", ("a",), compute([1]))
+    cache.cached("t", ("b",), compute([2]))
+    cache.cached("t", ("a",), compute([9]))       # "a" mới dùng nên "b" bị bỏ
+    cache.cached("t", ("c",), compute([3]))
+    assert cache.cached("t", ("a",), compute([9])) == [1]
+    assert cache.cached("t", ("b",), compute([4])) == [4]
+    assert cache.stats()["evictions"] == 2
+    # Quá max_rows: bỏ kết quả cũ nhất ("a") tới khi đủ chỗ
+    cache.cached("t", ("d",), compute([0, 0, 0, 0]))
+    stats = cache.stats()
+    assert (stats["rows"], stats["entries"], stats["evictions"]) == (5, 2, 3)
+    assert cache.cached("t", ("b",), compute([9])) == [4]
+
+def test_results_over_max_rows_are_not_kept():
+    cache = QueryCache(max_rows=3)
+    calls, compute = _counter()
+    cache.cached("t", ("big",), compute([1, 2, 3, 4]))
+    cache.cached("t", ("big",), compute([1, 2, 3, 4]))
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats["entries"], stats["rows"], stats["evictions"]) == (0, 0, 0)
+
+def test_stats_and_reset():
+    cache = QueryCache()
+    assert cache.stats()["hit_rate"] == 0.0
+    cache.cached("t", ("a",), lambda: [1, 2])
+    cache.cached("t", ("a",), lambda: [1, 2])
+    cache.cached("t", ("a",), lambda: [1, 2])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["rows"]) == (2, 1, 1, 2)
+    assert stats["hit_rate"] == 2 / 3
+    cache.reset_stats()
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+    assert cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.stats()["entries"] == cache.stats()["rows"] == 0
+
+def test_two_databases_see_each_others_writes(data_dir):
+    first, second = Database(), Database()
+    first.create_files()
+    first.add_invoice("Nguyễn Văn An", 100)
+    assert [row[2] for row in first.search_invoices("an")] == ["Nguyễn Văn An"]
+    assert first.get_sales_summary() == 100
+    second.add_invoice("Lê Văn Anh", 50)
+    assert sorted(row[2] for row in first.search_invoices("an")) == ["Lê Văn Anh", "Nguyễn Văn An"]
+    assert first.get_sales_summary() == 150
+    second.add_product("Bút", 1, 1000)
+    assert [p["name"] for p in first.search_products("but")] == ["Bút"]
+    first.add_product("Bút chì", 2, 2000)
+    assert [p["name"] for p in second.search_products("but")] == ["Bút", "Bút chì"]
@@ -0,0 +1,44 @@
+import json
+import pytest
+from records import Invoice, Product, Transaction, to_json
+
+def test_record_reads_like_dict_and_tuple():
+    invoice = Invoice(7, "2024-01-05 09:00", "Nguyễn Văn An", 1500)
+    assert invoice["customer"] == invoice.customer == invoice[2] == "Nguyễn Văn An"
+    assert invoice.get("missing", 0) == 0 and invoice.get("deleted") is False
+    record_id, date, *_ = invoice
+    assert (record_id, date, len(invoice)) == (7, "2024-01-05 09:00", 4)
+    assert invoice[1:3] == ("2024-01-05 09:00", "Nguyễn Văn An")
+    assert dict(invoice) == {"id": 7, "date": "2024-01-05 09:00", "customer": "Nguyễn Văn An", "total": 1500}
+    assert invoice == (7, "2024-01-05 09:00", "Nguyễn Văn An", 1500)
+    with pytest.raises(KeyError):
+        invoice["missing"]
+
+def test_repeated_customer_and_type_are_interned():
+    a = Invoice(1, None, "".join(["Công ty ", "ABC"]), 1)
+    b = Invoice(2, None, "".join(["Công ty ", "ABC"]), 2)
+    assert a.customer is b.customer
+    t1 = Transaction(1, None, "".join(["th", "u"]), 1, "")
+    t2 = Transaction(2, None, "".join(["th", "u"]), 1, "")
+    assert t1.type is t2.type
+
+def test_json_round_trip_keeps_legacy_shape():
+    rows = [Invoice(1, "2024-01-05", "An", 10), Transaction(2, "2024-01-06", "chi", 5.5, "Điện"),
+            Product(3, "Bút", 10, 2000), Product(4, "Vở", 1, 5000, "Hồng Hà"), Product.tombstone(5)]
+    data = json.loads(json.dumps(rows, default=to_json))
+    assert data[2] == {"id": 3, "name": "Bút", "quantity": 10, "price": 2000}
+    assert data[3]["supplier"] == "Hồng Hà"
+    assert data[4] == {"id": 5, "deleted": True}
+    restored = [Invoice.from_dict(data[0]), Transaction.from_dict(data[1])] + [Product.from_dict(d) for d in data[2:]]
+    assert restored == rows
+    assert restored[4].deleted and not restored[2].deleted
+
+def test_from_row_pads_and_truncates():
+    assert Product.from_row((1, "Bút", 2)) == Product(1, "Bút", 2, None, None)
+    assert Invoice.from_row((1, "2024-01-01", "An", 10, "cột thừa")) == Invoice(1, "2024-01-01", "An", 10)
+
+def test_copy_is_independent():
+    product = Product(1, "Bút", 2, 3000, "A")
+    other = product.copy()
+    other.name = "Bút bi"
+    assert product.name == "Bút" and other.supplier == "A" and other.deleted is False
@@ -0,0 +1,64 @@
+import random
+import sqlite3
+import pytest
+import sqlite_store
+from indexes import NgramIndex, fold
+
+NAMES = ["Nguyễn Văn An", "Trần Bình", "Lê Đức Anh", "Phạm Thị Hằng", "Công ty ABC", None, 'Cửa hàng "Ngọc"']
+KEYWORDS = ["an", "nguyen", "ĐỨC", "binh", "c", "cong ty", "hang", '"ngoc"', "xyz", "a"]
+
+def _expected(texts, keyword):
+    query = fold(keyword)
+    return [i for i, text in enumerate(texts) if text is not None and query in fold(text)]
+
+def test_ngram_index_add_update_remove():
+    index = NgramIndex(NAMES)
+    for keyword in KEYWORDS:
+        assert index.search(keyword) == _expected(NAMES, keyword)
+    index.update(0, "Hoàng Long")
+    index.remove(1)
+    assert index.search("nguyen") == []
+    assert index.search("long") == [0]
+    assert index.search("binh") == []
+    index.add(7, "Bình Minh")
+    assert index.search("binh") == [7]
+    assert index.filter([0, 2, 7], "anh") == [2]
+
+@pytest.fixture
+def sqlite_db(data_dir):
+    yield sqlite_store
+    sqlite_store.close()
+
+def test_sqlite_search_matches_substring_scan(sqlite_db):
+    random.seed(1)
+    customers = [random.choice(NAMES) for _ in range(200)]
+    sqlite_db.add_invoices_bulk([(customer, i) for i, customer in enumerate(customers)])
+    for keyword in KEYWORDS:
+        ids = [row[0] for row in sqlite_db.search_invoices(keyword)]
+        assert ids == [i + 1 for i in _expected(customers, keyword)], keyword
+
+def test_sqlite_search_follows_update_and_delete(sqlite_db):
+    sqlite_db.add_products_bulk([("Bút bi", 1, 2, "Thiên Long"), ("Vở kẻ ngang", 3, 4, None)])
+    sqlite_db.update_product(1, "Thước kẻ", 1, 2, None)
+    assert sqlite_db.search_products("but") == []
+    assert [row[0] for row in sqlite_db.search_products("ke")] == [1, 2]
+    assert [row[0] for row in sqlite_db.search_products("thuoc")] == [1]
+    sqlite_db.delete_product(1)
+    assert [row[0] for row in sqlite_db.search_products("kẻ")] == [2]
+    db = sqlite_store.SqliteDatabase()
+    db.update_product(2, name="Giấy A4")
+    assert [row["id"] for row in db.search_products("giay")] == [2]
+    assert db.search_products("vo ke") == []
+
+def test_sqlite_upgrades_database_without_folded_columns(data_dir):
+    conn = sqlite3.connect("misa.db")
+    conn.executescript("""
+        CREATE TABLE invoices (id INTEGER PRIMARY KEY, date TEXT NOT NULL, customer TEXT, total NUMERIC);
+        INSERT INTO invoices (date, customer, total) VALUES ('2024-01-01', 'Nguyễn Văn An', 1), ('2024-01-02', NULL, 2);
+    """)
+    conn.close()
+    try:
+        assert [row[0] for row in sqlite_store.search_invoices("nguyen")] == [1]
+        assert [row[0] for row in sqlite_store.search_invoices("an")] == [1]
+    finally:
+        sqlite_store.close()
@@ -0,0 +1,17 @@
+import database
+
+def test_cache_follows_own_and_external_writes(warehouse):
+    assert len(database.get_products()) == 30
+    hits = database._cache_stats["hits"]
+    database.get_products()
+    assert database._cache_stats["hits"] == hits + 1
+    database.update_product(3, "Đổi tên", 9, 9000, None)
+    assert database.get_products()[2].name == "Đổi tên"
+    database.delete_product(4)
+    assert [p.id for p in database.get_products()][:4] == [1, 2, 3, 5]
+    # Máy khác ghi file: chữ ký (mtime, kích thước, inode) đổi nên cache bị bỏ
+    import openpyxl
+    wb = openpyxl.load_workbook("warehouse.xlsx")
+    wb.active.append((99, "Từ máy khác", 1, 1, None))
+    wb.save("warehouse.xlsx")
+    assert database.get_products()[-1].name == "Từ máy khác"
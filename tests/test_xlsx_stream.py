@@ -0,0 +1,12 @@
+import database
+
+def test_streamed_reads_match_cached_reads(warehouse, monkeypatch):
+    cached = (database.get_products(), database.search_products("pham 1"), database.get_inventory_summary())
+    # Giới hạn cache nhỏ hơn file: mọi lần đọc đi qua chế độ read_only theo luồng
+    monkeypatch.setattr(database, "CACHE_MAX_BYTES", 1)
+    database._cache.clear()
+    before = dict(database._cache_stats)
+    streamed = (database.get_products(), database.search_products("pham 1"), database.get_inventory_summary())
+    assert streamed == cached
+    assert database._cache_stats["streamed"] > before["streamed"]
+    assert "warehouse.xlsx" not in database._cache